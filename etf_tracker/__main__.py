@@ -0,0 +1,20 @@
+"""
+Headless command line for batch runs (see src/cli.py).
+
+Usage (from the repository root):
+    python -m etf_tracker sync --prices
+    python -m etf_tracker metrics -o metrics.parquet
+    python -m etf_tracker calendar -f csv
+    python -m etf_tracker export -o portfolio.csv
+    python -m etf_tracker import holdings.csv
+"""
+import os
+import sys
+
+# Modules import each other as `src.*`, as under `streamlit run etf_tracker/app.py`
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src import cli  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(cli.main())
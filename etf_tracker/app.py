@@ -1,5 +1,6 @@
+import os
 import streamlit as st
-from src import database
+from src import database, refresher, warmup, instrumentation
 
 # Page Configuration
 st.set_page_config(
@@ -9,22 +10,35 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+def admin_enabled() -> bool:
+    """The performance page is hidden unless opened with ?admin=1 or ETF_ADMIN=1."""
+    return os.environ.get('ETF_ADMIN') == '1' or st.query_params.get('admin') == '1'
+
 def main():
-    # Initialize basic resources
+    # Initialize basic resources (all run once per process)
     database.init_db()
+    refresher.start()
+    warmup.start()
 
     st.sidebar.title("메뉴")
-    page = st.sidebar.radio("이동", ["대시보드", "배당 캘린더", "ETF 등록/관리"])
+    pages = ["대시보드", "배당 캘린더", "ETF 등록/관리"]
+    if admin_enabled():
+        pages.append("성능")
+    page = st.sidebar.radio("이동", pages)
 
-    if page == "대시보드":
-        from src.views import dashboard
-        dashboard.render()
-    elif page == "배당 캘린더":
-        from src.views import calendar
-        calendar.render()
-    elif page == "ETF 등록/관리":
-        from src.views import portfolio
-        portfolio.render()
+    with instrumentation.timer('page_render_seconds', page=page):
+        if page == "대시보드":
+            from src.views import dashboard
+            dashboard.render()
+        elif page == "배당 캘린더":
+            from src.views import calendar
+            calendar.render()
+        elif page == "ETF 등록/관리":
+            from src.views import portfolio
+            portfolio.render()
+        elif page == "성능":
+            from src.views import admin
+            admin.render()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+"""
+Benchmark for analytics.calculate_portfolio_metrics on synthetic portfolios.
+
+Usage (from the etf_tracker directory):
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --sizes 10 1000 100000 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import analytics, fetcher  # noqa: E402
+
+DEFAULT_SIZES = [10, 1_000, 100_000]
+
+
+def make_portfolio(n: int, seed: int = 42):
+    """Builds n synthetic holdings tuples and matching market data."""
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i:06d}" for i in range(n)]
+    sectors = np.array(list(fetcher.SECTOR_MAP) + ['Unknown', ''], dtype=object)
+    db_categories = np.where(rng.random(n) < 0.3, rng.choice(sectors, n), None)
+    shares = rng.uniform(1, 500, n).round(2)
+    avg_cost = rng.uniform(5, 500, n).round(2)
+    avg_cost[rng.random(n) < 0.01] = 0.0
+
+    holdings = list(zip(range(1, n + 1), tickers, shares, avg_cost, db_categories, ['USD'] * n))
+
+    # ~2% of tickers have no market data (failed fetch)
+    quoted = rng.random(n) >= 0.02
+    market_data = pd.DataFrame({
+        'Ticker': np.array(tickers)[quoted],
+        'Current Price': (avg_cost * rng.uniform(0.5, 1.5, n))[quoted],
+        'Yield': rng.uniform(0, 0.12, n)[quoted],
+        'Sector': rng.choice(sectors, n)[quoted],
+        'Name': np.array(tickers)[quoted]
+    })
+    return holdings, market_data
+
+
+def bench(n: int, repeat: int) -> float:
+    """Returns the median runtime in milliseconds for a portfolio of n holdings."""
+    holdings, market_data = make_portfolio(n)
+    analytics.calculate_portfolio_metrics(holdings, market_data)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analytics.calculate_portfolio_metrics(holdings, market_data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'holdings':>10}  {'median ms':>10}")
+    for n in args.sizes:
+        print(f"{n:>10,}  {bench(n, args.repeat):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
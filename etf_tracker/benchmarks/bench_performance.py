@@ -0,0 +1,70 @@
+"""
+Benchmark for performance.analyze on synthetic price matrices and transaction histories.
+
+Usage (from the etf_tracker directory):
+    python benchmarks/bench_performance.py
+    python benchmarks/bench_performance.py --tickers 500 --years 20 --trades 5000 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import performance  # noqa: E402
+
+
+def make_inputs(n_tickers: int, years: int, n_trades: int, seed: int = 42):
+    """Builds a random-walk price matrix and random BUY/SELL/DIVIDEND transactions."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2026-01-01', periods=252 * years, name='Date')
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    prices = 50 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), n_tickers)), axis=0))
+    # Tickers list at different times, like real ETFs
+    listed = rng.integers(0, len(dates) // 2, n_tickers)
+    prices[np.arange(len(dates))[:, None] < listed] = np.nan
+    matrix = pd.DataFrame(prices, index=dates, columns=pd.Index(tickers, name='Ticker'))
+
+    col = rng.integers(0, n_tickers, n_trades)
+    day = np.maximum(rng.integers(0, len(dates), n_trades), listed[col])
+    kind = rng.choice(['BUY', 'BUY', 'BUY', 'SELL', 'DIVIDEND'], n_trades)
+    transactions = pd.DataFrame({
+        'ID': np.arange(n_trades),
+        'Ticker': np.array(tickers)[col],
+        'Type': kind,
+        'Date': dates[day],
+        'Shares': np.where(kind == 'SELL', 1.0, rng.uniform(1, 20, n_trades)).round(2),
+        'Price': np.where(kind == 'DIVIDEND', 0.25, prices[day, col]),
+        'Fee': 1.0,
+        'Currency': 'USD',
+    })
+    return transactions, matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--trades', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    transactions, matrix = make_inputs(args.tickers, args.years, args.trades)
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = performance.analyze(transactions, matrix)
+        runs.append(time.perf_counter() - start)
+
+    print(f"{matrix.shape[0]} days x {matrix.shape[1]} tickers, {len(transactions)} transactions")
+    print(f"  analyze: {statistics.median(runs) * 1000:.1f} ms (median of {args.repeat})")
+    print(f"  TWR {result.twr * 100:.2f}%, MWR {result.mwr * 100 if result.mwr is not None else float('nan'):.2f}%, "
+          f"max drawdown {result.max_drawdown * 100:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
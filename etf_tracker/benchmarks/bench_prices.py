@@ -0,0 +1,85 @@
+"""
+Benchmark for the daily price store (prices.get_price_matrix) on synthetic data.
+
+Writes synthetic OHLCV bars into a temporary database, then times range reads
+into a (date x ticker) matrix and a portfolio-value-over-time calculation.
+
+Usage (from the etf_tracker directory):
+    python benchmarks/bench_prices.py
+    python benchmarks/bench_prices.py --tickers 500 --years 10 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import database, providers, prices  # noqa: E402
+
+
+def populate(n_tickers: int, years: int, seed: int = 42) -> list:
+    """Stores random-walk daily bars for n_tickers over `years` business-day years."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252 * years, name='Date')
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    for t in tickers:
+        # Tickers list at different times, like real ETFs
+        first = rng.integers(0, len(dates) // 2)
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates) - first)))
+        bars = pd.DataFrame({c: close for c in providers.PRICE_COLUMNS}, index=dates[first:])
+        bars['Volume'] = 1e6
+        prices.save_bars(t, bars, time.time())
+    return tickers
+
+
+def timed(fn, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.init_db()
+
+        start = time.perf_counter()
+        tickers = populate(args.tickers, args.years)
+        print(f"Stored {args.tickers} tickers x {args.years}y in {time.perf_counter() - start:.1f}s")
+
+        shares = pd.Series(np.random.default_rng(0).uniform(1, 100, len(tickers)), index=tickers)
+
+        def read_cold():
+            prices._matrices.clear()
+            return prices.get_price_matrix(tickers, sync=False)
+
+        def portfolio_value():
+            matrix = prices.get_price_matrix(tickers, sync=False)
+            return matrix.ffill().fillna(0.0).to_numpy() @ shares.reindex(matrix.columns).to_numpy()
+
+        matrix = read_cold()
+        print(f"Matrix {matrix.shape[0]} days x {matrix.shape[1]} tickers, {matrix.notna().sum().sum():,} bars")
+        print(f"  range read (cold):       {timed(read_cold, args.repeat) * 1000:8.1f} ms")
+        print(f"  range read (cached):     {timed(lambda: prices.get_price_matrix(tickers, sync=False), args.repeat) * 1000:8.1f} ms")
+        last_year = pd.Timestamp.today() - pd.DateOffset(years=1)
+        print(f"  last 1y read (cold):     {timed(lambda: (prices._matrices.clear(), prices.get_price_matrix(tickers, start=last_year, sync=False)), args.repeat) * 1000:8.1f} ms")
+        print(f"  portfolio value (cached):{timed(portfolio_value, args.repeat) * 1000:8.1f} ms")
+        database.close_db_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Startup benchmark based on `python -X importtime`.
+
+Each scenario imports a set of modules in a fresh interpreter, like a cold
+Cloud Run instance would, and reports the wall time plus the slowest imports.
+
+Usage (from the etf_tracker directory):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 5 --top 20
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from typing import List, Tuple
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What app.py imports before the first render, and what each page adds on top
+SCENARIOS = {
+    'app': ['streamlit', 'src.database', 'src.refresher', 'src.warmup'],
+    'dashboard': ['src.views.dashboard'],
+    'calendar': ['src.views.calendar'],
+    'portfolio': ['src.views.portfolio', 'src.utils'],
+    'fetch': ['yfinance'],
+}
+
+
+def run_importtime(modules: List[str]) -> Tuple[float, List[Tuple[int, int, str]]]:
+    """
+    Imports modules in a fresh interpreter with -X importtime.
+
+    Returns:
+        Tuple of (wall seconds, [(self us, cumulative us, module)] for every import).
+    """
+    code = '; '.join(f'import {m}' for m in modules)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=APP_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        # "import time:       123 |        456 |   package.module"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return wall, entries
+
+
+def top_level(entries: List[Tuple[int, int, str]]) -> List[Tuple[int, str]]:
+    """Cumulative time of imports not nested under another one."""
+    return [(cum, name.strip()) for _, cum, name in entries if not name.startswith('  ')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per scenario')
+    parser.add_argument('--top', type=int, default=10, help='slowest top-level imports to list')
+    args = parser.parse_args()
+
+    baseline, entries = run_importtime(['sys'])
+    print(f"Interpreter startup: {baseline * 1000:.0f} ms\n")
+    # Imports already paid for by the interpreter (and, for pages, by app.py)
+    preloaded = {name for _, name in top_level(entries)}
+
+    app_wall = None
+    for scenario in ['app'] + [s for s in args.scenarios if s != 'app']:
+        modules = SCENARIOS[scenario]
+        # Pages are measured on top of the app imports, as Streamlit loads them
+        if scenario != 'app':
+            modules = SCENARIOS['app'] + modules
+        try:
+            runs = [run_importtime(modules) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{scenario:>10}: skipped ({e})\n")
+            continue
+
+        wall = statistics.median(w for w, _ in runs)
+        imports = [(cum, name) for cum, name in top_level(runs[-1][1]) if name not in preloaded]
+        if scenario == 'app':
+            app_wall = wall
+            preloaded |= {name for _, name in imports}
+        if scenario not in args.scenarios:
+            continue
+
+        total_ms = sum(cum for cum, _ in imports) / 1000
+        extra = f" ({(wall - app_wall) * 1000:+.0f} ms over app)" if scenario != 'app' and app_wall else ''
+        print(f"{scenario:>10}: wall {wall * 1000:7.0f} ms{extra}, imports {total_ms:7.0f} ms (median of {args.repeat})")
+        for cum, name in sorted(imports, reverse=True)[:args.top]:
+            print(f"{'':>12}{cum / 1000:8.1f} ms  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,28 @@
+import numpy as np
 import pandas as pd
 import logging
 from typing import List, Tuple, Any, Optional
-from src import fetcher
+from src import fetcher, instrumentation
 
 # Configure Logger
 logger = logging.getLogger(__name__)
 
-def calculate_portfolio_metrics(holdings: List[Tuple[Any, ...]], market_data: pd.DataFrame) -> pd.DataFrame:
+@instrumentation.timed
+def calculate_portfolio_metrics(holdings: List[Tuple[Any, ...]], market_data: pd.DataFrame,
+                                rates: Optional[pd.Series] = None, cost_rates: Optional[pd.Series] = None) -> pd.DataFrame:
     """
     Combines holdings (DB) with market_data (yfinance) to calculate portfolio metrics.
     
+    Prices and average cost stay in each holding's currency; values (Market Value,
+    Cost Basis, gains and income) are converted to the base currency of `rates`.
+    
     Args:
         holdings: List of tuples from database [(id, ticker, shares, avg_cost, sector, currency), ...]
         market_data: DataFrame with columns ['Ticker', 'Current Price', 'Yield', 'Sector', 'Name']
+        rates: Base currency units per unit of each currency (fx.latest_rates); default: no conversion.
+            Holdings in a currency without a rate get NaN values and drop out of totals
+        cost_rates: Historical rates for the cost basis by ticker (fx.lot_cost_rates);
+            tickers without one use `rates`
         
     Returns:
         DataFrame with calculated metrics (Market Value, Gains, etc.)
@@ -41,24 +51,37 @@ def calculate_portfolio_metrics(holdings: List[Tuple[Any, ...]], market_data: pd
         df['Name'] = df['Name'].fillna(df['Ticker'])
     # Category Logic: 
     # Prioritize DB Category if it exists. yfinance sector is in 'Sector'.
+    category = df['Category']
+    has_category = category.notna() & (category != '')
     if 'Sector' in df.columns:
-        df['Category'] = df['Category'].fillna('').replace('', None).fillna(df['Sector'])
+        category = category.where(has_category, df['Sector'])
     
-    # Map to general categories if it's still yfinance raw sector
-    df['Category'] = df['Category'].fillna('Unknown').replace('', 'Unknown')
-    df['Category'] = df['Category'].apply(fetcher.map_sector_to_category)
+    # Map to general categories if it's still yfinance raw sector.
+    # The mapping runs once per distinct value, not once per row.
+    category = category.where(category.notna() & (category != ''), 'Unknown')
+    codes, uniques = pd.factorize(category)
+    mapped = np.array([fetcher.map_sector_to_category(u) for u in uniques], dtype=object)
+    df['Category'] = mapped[codes]
+
+    # Conversion to the base currency in one pass over all holdings
+    df['Currency'] = df['Currency'].fillna('USD').str.upper()
+    fx_rate = np.ones(len(df)) if rates is None else rates.reindex(df['Currency']).to_numpy(dtype=float)
+    df['FX Rate'] = fx_rate
+    cost_rate = df['FX Rate'].to_numpy()
+    if cost_rates is not None:
+        cost_rate = cost_rates.reindex(df['Ticker']).fillna(pd.Series(cost_rate, index=df['Ticker'])).to_numpy(dtype=float)
 
     # Financial Calculations
     try:
-        df['Market Value'] = df['Shares'] * df['Current Price']
-        df['Cost Basis'] = df['Shares'] * df['Avg Cost']
+        df['Market Value'] = df['Shares'] * df['Current Price'] * df['FX Rate']
+        df['Cost Basis'] = df['Shares'] * df['Avg Cost'] * cost_rate
         df['Total Gain ($)'] = df['Market Value'] - df['Cost Basis']
         
-        # Safe Division for Percentage
-        df['Total Gain (%)'] = df.apply(
-            lambda row: (row['Total Gain ($)'] / row['Cost Basis'] * 100) if row['Cost Basis'] > 0 else 0.0, 
-            axis=1
-        )
+        # Safe Division for Percentage (0.0 where there is no cost basis, NaN without a rate)
+        gain = df['Total Gain ($)'].to_numpy(dtype=float)
+        cost = df['Cost Basis'].to_numpy(dtype=float)
+        out = np.where(np.isnan(cost), np.nan, 0.0)
+        df['Total Gain (%)'] = np.divide(gain, cost, out=out, where=cost > 0) * 100
         
         df['Est. Annual Income'] = df['Market Value'] * df['Yield']
         
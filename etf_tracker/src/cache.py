@@ -0,0 +1,154 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Tuple, Any, Callable, Optional
+from src import database, providers, instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Field groups stored per ticker in the `market_cache` table.
+# Each group has its own TTL; a market data row is split across groups.
+FIELD_GROUPS: Dict[str, Dict[str, Any]] = {
+    'quote': {'ttl': 900, 'columns': ['Current Price']},
+    'fundamentals': {'ttl': 86400, 'columns': ['Yield', 'Sector', 'Name']},
+}
+
+MARKET_GROUPS = providers.MARKET_GROUPS
+
+# Keys of background refreshes currently running
+_refreshing: set = set()
+_refresh_lock = threading.Lock()
+
+
+def read(group: str, tickers: List[str]) -> Dict[str, Tuple[Dict[str, Any], float]]:
+    """
+    Reads cached payloads for a field group.
+
+    Returns:
+        Mapping of ticker -> (payload, fetched_at). Missing tickers are absent.
+        Database errors are logged and treated as cache misses.
+    """
+    if not tickers:
+        return {}
+    placeholders = ','.join('?' * len(tickers))
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'SELECT ticker, payload, fetched_at FROM market_cache '
+                f'WHERE field_group = ? AND ticker IN ({placeholders})',
+                (group, *tickers)
+            )
+            return {t: (json.loads(p), f) for t, p, f in cursor.fetchall()}
+    except (sqlite3.Error, ValueError) as e:
+        logger.error(f"Error reading '{group}' cache: {e}")
+        return {}
+
+
+def write(group: str, payloads: Dict[str, Dict[str, Any]], fetched_at: Optional[float] = None) -> None:
+    """Upserts payloads for a field group in a single transaction."""
+    if not payloads:
+        return
+    fetched_at = fetched_at or time.time()
+    try:
+        with database.get_db_connection() as conn:
+            conn.executemany('''
+                INSERT INTO market_cache (ticker, field_group, payload, fetched_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(ticker, field_group) DO UPDATE SET
+                    payload = excluded.payload,
+                    fetched_at = excluded.fetched_at
+            ''', [(t, group, json.dumps(p), fetched_at) for t, p in payloads.items()])
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error writing '{group}' cache: {e}")
+
+
+def is_stale(group: str, fetched_at: float, now: Optional[float] = None) -> bool:
+    """True if an entry fetched at `fetched_at` is older than its group's TTL."""
+    return (now or time.time()) - fetched_at > FIELD_GROUPS[group]['ttl']
+
+
+def get_quotes_version() -> float:
+    """Returns the time of the most recent quote write; changes whenever quotes refresh."""
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(fetched_at) FROM market_cache WHERE field_group = 'quote'")
+            return cursor.fetchone()[0] or 0.0
+    except sqlite3.Error as e:
+        logger.error(f"Error reading quotes version: {e}")
+        return 0.0
+
+
+def get_quotes_as_of(tickers: List[str]) -> Optional[float]:
+    """Returns the fetch time of the oldest cached quote among tickers, or None if none are cached."""
+    fetched = [f for _, f in read('quote', tickers).values()]
+    return min(fetched) if fetched else None
+
+
+def load_market_rows(tickers: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Assembles market data rows from the quote and fundamentals groups.
+
+    Returns:
+        Tuple of (rows by ticker, stale (ticker, group) keys, missing (ticker, group) keys).
+        Rows hold the columns of every cached group, stale ones included, so they can
+        be served immediately; a row is complete once its missing groups are fetched.
+    """
+    now = time.time()
+    groups = {g: read(g, tickers) for g in MARKET_GROUPS}
+    rows, stale, missing = {}, [], []
+    for t in tickers:
+        for g in MARKET_GROUPS:
+            entry = groups[g].get(t)
+            if entry is None:
+                missing.append((t, g))
+                continue
+            payload, fetched_at = entry
+            rows.setdefault(t, {'Ticker': t}).update(payload)
+            if is_stale(g, fetched_at, now):
+                stale.append((t, g))
+    for g in MARKET_GROUPS:
+        n_stale = sum(1 for _, sg in stale if sg == g)
+        n_missing = sum(1 for _, mg in missing if mg == g)
+        instrumentation.inc('cache_lookups_total', len(tickers) - n_stale - n_missing, group=g, result='hit')
+        instrumentation.inc('cache_lookups_total', n_stale, group=g, result='stale')
+        instrumentation.inc('cache_lookups_total', n_missing, group=g, result='miss')
+    return rows, stale, missing
+
+
+def store_market_rows(rows: List[Dict[str, Any]]) -> None:
+    """Splits market data rows into field groups and persists the groups each row contains."""
+    for g in MARKET_GROUPS:
+        cols = FIELD_GROUPS[g]['columns']
+        write(g, {r['Ticker']: {c: r[c] for c in cols} for r in rows if all(c in r for c in cols)})
+
+
+def refresh_in_background(key: str, fn: Callable[[], None]) -> bool:
+    """
+    Runs `fn` on a daemon thread unless a refresh with the same key is running.
+    Used to revalidate stale entries while they are being served.
+
+    Returns:
+        True if a new refresh was started.
+    """
+    with _refresh_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+
+    def run():
+        try:
+            fn()
+        except Exception as e:
+            logger.error(f"Background refresh '{key}' failed: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name=f"refresh-{key}", daemon=True).start()
+    return True
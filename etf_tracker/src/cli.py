@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+from src import database, fetcher, providers, prices, fx, snapshot, dividend_calendar, columnar, utils
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Exit codes
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2     # Also used by argparse for invalid arguments
+EXIT_PARTIAL = 3   # Finished, but some tickers or rows failed
+
+FORMATS = ['json', 'csv'] + columnar.FORMATS
+
+
+class CliError(Exception):
+    """A user-facing error that ends the command with EXIT_USAGE."""
+
+
+def _output_format(args: argparse.Namespace, default: str = 'json') -> str:
+    """--format, else the --output extension, else `default`."""
+    if args.format:
+        return args.format
+    ext = os.path.splitext(args.output or '')[1].lstrip('.').lower()
+    return ext if ext in FORMATS else default
+
+
+def write_frame(df: pd.DataFrame, fmt: str, output: Optional[str] = None, dataset: Optional[str] = None,
+                metadata: Optional[Dict[str, str]] = None) -> None:
+    """
+    Writes a frame as JSON records or CSV to `output` (stdout if omitted), or as
+    a Parquet/Arrow file with the versioned schema of `dataset` (see columnar).
+    """
+    if fmt in columnar.FORMATS:
+        if not output:
+            raise CliError(f"{fmt} output needs --output")
+        if dataset is None:
+            raise CliError(f"{fmt} output needs a dataset ({', '.join(columnar.DATASETS)})")
+        try:
+            columnar.write(dataset, df, output, fmt, metadata)
+        except ImportError as e:
+            raise CliError(str(e)) from None
+    elif fmt == 'csv':
+        df.to_csv(output or sys.stdout, index=False)
+    else:
+        text = df.to_json(orient='records', date_format='iso', force_ascii=False, indent=2)
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+        else:
+            sys.stdout.write(text + '\n')
+    if output:
+        logger.info(f"Wrote {len(df)} rows to {output}")
+
+
+def _print_summary(summary: dict) -> None:
+    sys.stdout.write(json.dumps(summary, ensure_ascii=False, indent=2) + '\n')
+
+
+def cmd_sync(args: argparse.Namespace) -> int:
+    """Refreshes quotes, dividend histories (and optionally daily prices), then the dividend calendar."""
+    tickers = [t.upper() for t in args.tickers] if args.tickers else database.get_all_tickers()
+    if not tickers:
+        _print_summary({'tickers': 0})
+        return EXIT_OK
+
+    rows = fetcher.refresh_market_data(tickers)
+    market_failed = sorted(set(tickers) - {r['Ticker'] for r in rows})
+
+    with ThreadPoolExecutor(max_workers=providers.DEFAULT_CONCURRENCY, thread_name_prefix='dividends') as executor:
+        counts = dict(zip(tickers, executor.map(lambda t: fetcher.sync_dividend_history(t, args.full), tickers)))
+    dividends_failed = sorted(t for t, n in counts.items() if n < 0)
+
+    # FX rates are always kept current; they're one history per currency
+    holdings = database.get_holdings()
+    currencies = {(h[5] or fx.PIVOT_CURRENCY).upper() for h in holdings} | {fx.get_base_currency()}
+    histories = [fx.fx_symbol(c) for c in sorted(currencies - {fx.PIVOT_CURRENCY})]
+    if args.prices:
+        histories = tickers + histories
+    price_counts = prices.sync_price_histories(histories, full=args.full) if histories else {}
+    prices_failed = sorted(t for t, n in price_counts.items() if n < 0)
+
+    rebuilt = dividend_calendar.refresh(holdings)
+
+    _print_summary({
+        'tickers': len(tickers),
+        'market_failed': market_failed,
+        'dividends_failed': dividends_failed,
+        'prices_failed': prices_failed,
+        'calendar_rebuilt': rebuilt,
+    })
+    return EXIT_PARTIAL if market_failed or dividends_failed or prices_failed else EXIT_OK
+
+
+def cmd_metrics(args: argparse.Namespace) -> int:
+    """Writes portfolio metrics (one row per holding, values in the base currency)."""
+    snap = snapshot.build(snapshot.get_version(), base_currency=args.base_currency)
+    write_frame(snap.metrics, _output_format(args), args.output, 'metrics', {'base_currency': snap.base_currency})
+    return EXIT_OK
+
+
+def cmd_calendar(args: argparse.Namespace) -> int:
+    """Writes the projected 12-month dividend calendar."""
+    df = dividend_calendar.get_calendar(database.get_holdings())
+    write_frame(df, _output_format(args), args.output, 'projections')
+    return EXIT_OK
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """Writes holdings in the Google Sheet format (CSV by default), or one of the columnar datasets."""
+    fmt = _output_format(args, default='csv')
+    dataset = args.dataset or ('holdings' if fmt in columnar.FORMATS else None)
+    if dataset:
+        df, metadata = columnar.load_dataset(dataset, args.base_currency)
+        write_frame(df, fmt, args.output, dataset, metadata)
+    elif fmt != 'csv':
+        write_frame(utils.build_export_frame(), fmt, args.output)
+    elif args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            utils.write_export_csv(f)
+    else:
+        utils.write_export_csv(sys.stdout)
+    return EXIT_OK
+
+
+def cmd_import(args: argparse.Namespace) -> int:
+    """
+    Imports holdings from a CSV file or URL, resuming an interrupted import of the same source,
+    or holdings/dividends from a Parquet or Arrow file.
+    """
+    from src import importer
+
+    if os.path.splitext(args.source)[1].lower() in columnar.EXTENSIONS:
+        try:
+            dataset, count, errors = columnar.import_file(args.source)
+        except (ValueError, ImportError) as e:
+            raise CliError(str(e)) from None
+        _print_summary({
+            'source': os.path.abspath(args.source),
+            'dataset': dataset,
+            'rows_written': count,
+            'errors': len(errors),
+            'first_errors': [{'row': row, 'reason': reason} for row, reason in errors[:20]],
+        })
+        return EXIT_PARTIAL if errors else EXIT_OK
+
+    def log_progress(p: 'importer.ImportProgress') -> None:
+        done = f" ({p.fraction * 100:.0f}%)" if p.fraction is not None else ""
+        logger.info(f"{p.rows_read:,} rows read, {p.rows_written:,} written, {p.error_count:,} errors{done}")
+
+    try:
+        if args.source.startswith(('http://', 'https://')):
+            progress = importer.import_url(utils.to_csv_url(args.source), log_progress, resume=not args.no_resume)
+        else:
+            with open(args.source, 'rb') as f:
+                progress = importer.import_file(f, f"file:{os.path.abspath(args.source)}", log_progress,
+                                                resume=not args.no_resume)
+    except ValueError as e:
+        raise CliError(str(e)) from None
+
+    _print_summary({
+        'source': progress.source,
+        'rows_read': progress.rows_read,
+        'rows_written': progress.rows_written,
+        'errors': progress.error_count,
+        'resumed_from_byte': progress.resumed_from,
+        'first_errors': [{'line': line, 'reason': reason} for line, reason in progress.errors[:20]],
+    })
+    return EXIT_PARTIAL if progress.error_count else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m etf_tracker',
+        description='Headless portfolio pipeline: sync market data and write reports without the UI.',
+        epilog=f'Exit codes: {EXIT_OK} ok, {EXIT_ERROR} error, {EXIT_USAGE} usage, {EXIT_PARTIAL} partial failure'
+    )
+    parser.add_argument('--db', help='SQLite database path (default: data/portfolio.db)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log progress to stderr')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sync = commands.add_parser('sync', help='Refresh quotes, dividends and the dividend calendar')
+    sync.add_argument('tickers', nargs='*', help='Tickers to sync (default: all held)')
+    sync.add_argument('--full', action='store_true', help='Refetch complete histories')
+    sync.add_argument('--prices', action='store_true', help='Also sync daily price histories')
+    sync.set_defaults(func=cmd_sync)
+
+    def add_output(command: argparse.ArgumentParser) -> None:
+        command.add_argument('-f', '--format', choices=FORMATS, help='Output format (default: from --output extension)')
+        command.add_argument('-o', '--output', help='Output file (default: stdout)')
+
+    metrics = commands.add_parser('metrics', help='Write portfolio metrics')
+    add_output(metrics)
+    metrics.add_argument('--base-currency', help="Currency of the values (default: the portfolio's)")
+    metrics.set_defaults(func=cmd_metrics)
+
+    calendar = commands.add_parser('calendar', help='Write the projected dividend calendar')
+    add_output(calendar)
+    calendar.set_defaults(func=cmd_calendar)
+
+    export = commands.add_parser('export', help='Write holdings in the Google Sheet CSV format, or a dataset')
+    add_output(export)
+    export.add_argument('--dataset', choices=list(columnar.DATASETS),
+                        help='Write this dataset with its versioned schema (default for parquet/arrow: holdings)')
+    export.add_argument('--base-currency', help="Currency of metric values (default: the portfolio's)")
+    export.set_defaults(func=cmd_export)
+
+    import_ = commands.add_parser('import', help='Import holdings from a CSV file or URL, or a Parquet/Arrow dataset')
+    import_.add_argument('source', help='CSV path, CSV URL, Google Sheets URL, or holdings/dividends .parquet/.arrow file')
+    import_.add_argument('--no-resume', action='store_true', help='Start over instead of resuming')
+    import_.set_defaults(func=cmd_import)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    # stdout carries the command's output; logs go to stderr
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    if args.db:
+        database.DB_PATH = os.path.abspath(args.db)
+
+    try:
+        database.init_db()
+        return args.func(args)
+    except CliError as e:
+        logger.error(str(e))
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        logger.exception(f"{args.command} failed: {e}")
+        return EXIT_ERROR
+    finally:
+        database.close_db_connection()
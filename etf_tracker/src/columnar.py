@@ -0,0 +1,317 @@
+import io
+import os
+import time
+import logging
+from typing import List, Tuple, Dict, Any, Optional, Iterator, Union, BinaryIO
+
+import pandas as pd
+from src import database, snapshot, dividend_calendar, utils, instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Bump when a dataset's schema changes incompatibly; files with a newer version are rejected
+SCHEMA_VERSION = 1
+
+# Key prefix of the schema metadata stored in every file
+METADATA_PREFIX = 'etf_tracker.'
+
+FORMATS = ['parquet', 'arrow']
+EXTENSIONS = {'.parquet': 'parquet', '.pq': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow'}
+
+# Rows per record batch when importing
+IMPORT_BATCH_ROWS = 50000
+
+# Dataset -> [(field, arrow type, source column in the app's frames)]
+# Field names and types are the stable contract for downstream jobs.
+DATASETS: Dict[str, List[Tuple[str, str, str]]] = {
+    'holdings': [
+        ('ticker', 'string', 'Ticker'),
+        ('shares', 'float64', 'Shares'),
+        ('avg_cost', 'float64', 'Avg Cost'),
+        ('sector', 'string', 'Category'),
+        ('currency', 'string', 'Currency'),
+    ],
+    'metrics': [
+        ('ticker', 'string', 'Ticker'),
+        ('name', 'string', 'Name'),
+        ('category', 'string', 'Category'),
+        ('currency', 'string', 'Currency'),
+        ('shares', 'float64', 'Shares'),
+        ('avg_cost', 'float64', 'Avg Cost'),
+        ('current_price', 'float64', 'Current Price'),
+        ('yield', 'float64', 'Yield'),                  # Fraction, e.g. 0.0374
+        ('fx_rate', 'float64', 'FX Rate'),              # Base currency units per unit of `currency`
+        ('market_value', 'float64', 'Market Value'),    # Values in the base currency (metadata)
+        ('cost_basis', 'float64', 'Cost Basis'),
+        ('total_gain', 'float64', 'Total Gain ($)'),
+        ('total_gain_pct', 'float64', 'Total Gain (%)'),
+        ('annual_income', 'float64', 'Est. Annual Income'),
+        ('weight_pct', 'float64', 'Weight (%)'),
+    ],
+    'dividends': [
+        ('ticker', 'string', 'Ticker'),
+        ('date', 'date32', 'Date'),
+        ('amount', 'float64', 'Dividends'),
+    ],
+    'projections': [
+        ('month', 'string', 'Month'),                   # 'YYYY-MM' of the pay date
+        ('ticker', 'string', 'Ticker'),
+        ('ex_date', 'date32', 'Ex Date'),
+        ('pay_date', 'date32', 'Pay Date'),
+        ('amount_per_share', 'float64', 'Amount Per Share'),
+        ('shares', 'float64', 'Shares'),
+        ('total_amount', 'float64', 'Total Amount'),
+        ('special', 'bool_', 'Special'),
+        ('projected', 'bool_', 'Projected'),            # False for payments already recorded
+    ],
+}
+
+# Datasets that import_file writes to the database; the others are derived
+IMPORTABLE = ['holdings', 'dividends']
+
+# Holdings fields as utils.match_import_columns would map them
+HOLDINGS_IMPORT_MAP = {field: field for field, _, _ in DATASETS['holdings']}
+
+
+def _pa():
+    """Imports pyarrow, which is only needed for columnar files."""
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ImportError("Parquet/Arrow files need pyarrow (pip install pyarrow)") from None
+
+
+def format_for(path: str) -> str:
+    """File format from the extension (parquet or arrow)."""
+    fmt = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unknown columnar file extension: {path} ({', '.join(EXTENSIONS)})")
+    return fmt
+
+
+def schema(dataset: str, metadata: Optional[Dict[str, str]] = None):
+    """Arrow schema of a dataset with its version metadata."""
+    pa = _pa()
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset} ({', '.join(DATASETS)})")
+    meta = {'dataset': dataset, 'schema_version': str(SCHEMA_VERSION), **(metadata or {})}
+    return pa.schema(
+        [pa.field(name, getattr(pa, type_)()) for name, type_, _ in DATASETS[dataset]],
+        metadata={f"{METADATA_PREFIX}{k}": str(v) for k, v in meta.items()}
+    )
+
+
+def to_table(dataset: str, df: pd.DataFrame, metadata: Optional[Dict[str, str]] = None):
+    """
+    Converts an app frame (e.g. snapshot metrics) to an Arrow table with the
+    dataset's schema. Columns missing from `df` are written as nulls.
+    """
+    pa = _pa()
+    target = schema(dataset, metadata)
+    arrays = []
+    for (name, _, column), field in zip(DATASETS[dataset], target):
+        if column in df.columns:
+            values = df[column]
+            if field.type == pa.date32():
+                values = pd.to_datetime(values).dt.date
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.nulls(len(df), type=field.type))
+    return pa.Table.from_arrays(arrays, schema=target)
+
+
+def from_table(table) -> pd.DataFrame:
+    """Converts a dataset table back to the app's column names and dtypes."""
+    dataset = read_metadata(table.schema)['dataset']
+    df = table.to_pandas()
+    for name, type_, _ in DATASETS[dataset]:
+        if type_ == 'date32' and name in df.columns:
+            df[name] = pd.to_datetime(df[name])
+    return df.rename(columns={name: column for name, _, column in DATASETS[dataset]})
+
+
+def read_metadata(file_schema) -> Dict[str, str]:
+    """Schema metadata of a file, checked against the supported datasets and versions."""
+    raw = file_schema.metadata or {}
+    meta = {k.decode()[len(METADATA_PREFIX):]: v.decode() for k, v in raw.items() if k.decode().startswith(METADATA_PREFIX)}
+    dataset = meta.get('dataset')
+    if dataset not in DATASETS:
+        raise ValueError(f"Not an etf_tracker dataset file (dataset: {dataset})")
+    version = int(meta.get('schema_version', 0))
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"{dataset} file has schema v{version}; this version reads up to v{SCHEMA_VERSION}")
+    return meta
+
+
+def load_dataset(dataset: str, base_currency: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Current contents of a dataset from the database.
+
+    Args:
+        dataset: One of DATASETS
+        base_currency: Currency of metric values (default: the portfolio's)
+
+    Returns:
+        Tuple of (app frame, extra schema metadata)
+    """
+    if dataset == 'holdings':
+        rows = database.get_holdings()
+        return pd.DataFrame([r[1:] for r in rows], columns=['Ticker', 'Shares', 'Avg Cost', 'Category', 'Currency']), {}
+    if dataset == 'metrics':
+        snap = snapshot.build(snapshot.get_version(), base_currency=base_currency)
+        return snap.metrics, {'base_currency': snap.base_currency}
+    if dataset == 'dividends':
+        events = database.get_dividend_events_bulk(database.get_all_tickers())
+        df = pd.DataFrame(events, columns=['Ticker', 'Date', 'Dividends'])
+        return df.sort_values(['Ticker', 'Date'], kind='stable').reset_index(drop=True), {}
+    if dataset == 'projections':
+        return dividend_calendar.get_calendar(database.get_holdings()), {}
+    raise ValueError(f"Unknown dataset: {dataset} ({', '.join(DATASETS)})")
+
+
+@instrumentation.timed
+def write(dataset: str, df: pd.DataFrame, dest: Union[str, BinaryIO], fmt: Optional[str] = None,
+          metadata: Optional[Dict[str, str]] = None) -> int:
+    """
+    Writes a dataset as Parquet (zstd) or an uncompressed Arrow IPC file,
+    which downstream jobs can memory-map without copying.
+
+    Args:
+        dataset: One of DATASETS
+        df: App frame with the dataset's source columns
+        dest: Path or binary file object
+        fmt: 'parquet' or 'arrow' (default: from the path's extension)
+        metadata: Extra schema metadata (e.g. base_currency)
+
+    Returns:
+        Number of rows written.
+    """
+    pa = _pa()
+    fmt = fmt or format_for(dest)
+    table = to_table(dataset, df, {'created_at': str(int(time.time())), **(metadata or {})})
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, dest, compression='zstd')
+    else:
+        with pa.ipc.new_file(dest, table.schema) as writer:
+            writer.write_table(table)
+    logger.info(f"Wrote {table.num_rows} {dataset} rows as {fmt}")
+    return table.num_rows
+
+
+def to_bytes(dataset: str, df: pd.DataFrame, fmt: str, metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """Serializes a dataset in memory (e.g. for a download button)."""
+    buffer = io.BytesIO()
+    write(dataset, df, buffer, fmt, metadata)
+    return buffer.getvalue()
+
+
+def _open(source: Union[str, BinaryIO], fmt: str):
+    """Opens a Parquet or Arrow IPC file; paths of Arrow files are memory-mapped."""
+    pa = _pa()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(source)
+    return pa.ipc.open_file(pa.memory_map(source) if isinstance(source, str) else source)
+
+
+def _iter_batches(reader, fmt: str, batch_rows: int) -> Iterator[Any]:
+    if fmt == 'parquet':
+        yield from reader.iter_batches(batch_size=batch_rows)
+    else:
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+
+def _detect_format(source: Union[str, BinaryIO]) -> str:
+    """Parquet files start with 'PAR1', Arrow IPC files with 'ARROW1'."""
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            magic = f.read(6)
+    else:
+        position = source.tell()
+        magic = source.read(6)
+        source.seek(position)
+    if magic[:4] == b'PAR1':
+        return 'parquet'
+    if magic == b'ARROW1':
+        return 'arrow'
+    raise ValueError("Not a Parquet or Arrow IPC file")
+
+
+@instrumentation.timed
+def read(source: Union[str, BinaryIO], dataset: Optional[str] = None) -> Tuple[Dict[str, str], pd.DataFrame]:
+    """
+    Reads a dataset file into a frame with the app's column names.
+
+    Args:
+        source: Path or seekable binary file (format detected from its content)
+        dataset: Expected dataset (default: any)
+
+    Returns:
+        Tuple of (schema metadata, DataFrame)
+
+    Raises:
+        ValueError: Not a dataset file, a different dataset, or a newer schema version.
+    """
+    fmt = _detect_format(source)
+    reader = _open(source, fmt)
+    meta = read_metadata(reader.schema_arrow if fmt == 'parquet' else reader.schema)
+    if dataset and meta['dataset'] != dataset:
+        raise ValueError(f"Expected a {dataset} file, got {meta['dataset']}")
+    table = reader.read() if fmt == 'parquet' else reader.read_all()
+    return meta, from_table(table)
+
+
+@instrumentation.timed
+def import_file(source: Union[str, BinaryIO],
+                batch_rows: int = IMPORT_BATCH_ROWS) -> Tuple[str, int, List[Tuple[int, str]]]:
+    """
+    Loads a holdings or dividends file into the database batch by batch.
+
+    Holdings are validated and upserted like a CSV import, and every row that
+    isn't written is reported with its reason. Dividend events are merged into the
+    local store without advancing the tickers' sync state (see
+    database.merge_dividend_events), so the next sync still fetches anything newer.
+
+    Returns:
+        Tuple of (dataset, number of rows written, [(row number, error message), ...])
+
+    Raises:
+        ValueError: Not an importable dataset file or a newer schema version.
+    """
+    fmt = _detect_format(source)
+    reader = _open(source, fmt)
+    dataset = read_metadata(reader.schema_arrow if fmt == 'parquet' else reader.schema)['dataset']
+    if dataset not in IMPORTABLE:
+        raise ValueError(f"{dataset} files are derived data and can't be imported ({', '.join(IMPORTABLE)} can)")
+
+    written, errors, offset = 0, [], 0
+    for batch in _iter_batches(reader, fmt, batch_rows):
+        df = batch.to_pandas()
+        first_row, offset = offset + 1, offset + len(df)
+        if dataset == 'holdings':
+            # Same validation as a CSV import, numbered by file row (1-based)
+            row_numbers = list(range(first_row, offset + 1))
+            rows, valid_rows, invalid = utils.normalize_import_frame(df, HOLDINGS_IMPORT_MAP, line_numbers=row_numbers)
+            count, failed = database.bulk_upsert_holdings(rows)
+            written += count
+            # Rows a CSV import skips silently (no ticker, no positive shares) are reported too
+            reported = set(valid_rows) | {row for row, _ in invalid}
+            has_ticker = df['ticker'].notna() & (df['ticker'].str.strip() != '')
+            skipped = [(row, '수량 값이 올바르지 않습니다' if ticker else '티커가 없습니다')
+                       for row, ticker in zip(row_numbers, has_ticker) if row not in reported]
+            errors.extend(sorted(invalid + skipped + [(valid_rows[i], reason) for i, reason in failed]))
+        else:
+            df = df.dropna(subset=['ticker', 'date', 'amount'])
+            dates = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+            for ticker, group in df.assign(date=dates).groupby('ticker'):
+                database.merge_dividend_events(ticker, list(zip(group['date'], group['amount'].astype(float))))
+                written += len(group)
+    if errors:
+        logger.warning(f"Skipped {len(errors)} {dataset} rows from {fmt}: "
+                       + ", ".join(f"row {row}: {reason}" for row, reason in errors[:5]))
+    logger.info(f"Imported {written} {dataset} rows from {fmt}")
+    return dataset, written, errors
@@ -1,8 +1,10 @@
 import sqlite3
 import os
 import logging
-from typing import List, Optional, Tuple, Any
+import threading
+from typing import List, Optional, Tuple, Any, Union, Callable
 from contextlib import contextmanager
+from src import instrumentation
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -13,42 +15,327 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 DB_PATH = os.path.join(DATA_DIR, 'portfolio.db')
 
+DEFAULT_PORTFOLIO_ID = 1
+
+UPSERT_HOLDING_SQL = '''
+    INSERT INTO holdings (ticker, shares, avg_cost, sector, currency)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(ticker) DO UPDATE SET
+        shares = excluded.shares,
+        avg_cost = excluded.avg_cost,
+        sector = excluded.sector,
+        currency = excluded.currency
+'''
+
+# Connection tuning applied once per connection
+PRAGMAS = {
+    'journal_mode': 'WAL',       # Readers don't block the writer and vice versa
+    'synchronous': 'NORMAL',     # Safe with WAL; avoids an fsync per commit
+    'cache_size': -16000,        # 16 MB page cache
+    'mmap_size': 268435456,      # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+BUSY_TIMEOUT = 5.0  # Seconds to wait for a lock held by another connection
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_path: Optional[str] = None
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Opens a tuned connection, creating the data directory if needed."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    for name, value in PRAGMAS.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
 @contextmanager
 def get_db_connection():
     """
     Context manager for SQLite database connection.
-    Ensures connection is closed properly even if errors occur.
+    Connections are reused per thread (one per Streamlit script thread) instead of
+    being opened for every call. Any transaction left open by the caller is rolled
+    back, so an error never leaves the shared connection mid-transaction.
     """
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-    
-    conn = sqlite3.connect(DB_PATH)
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _local.conn = _connect(DB_PATH)
+        _local.path = DB_PATH
     try:
         yield conn
     finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+def close_db_connection() -> None:
+    """Closes the calling thread's connection (it is reopened on next use)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
         conn.close()
+        _local.conn = None
+
+def _backfill_currencies(cursor: sqlite3.Cursor) -> None:
+    """
+    Rows created before currencies were tracked all defaulted to USD; give them
+    the listing currency of their exchange suffix (e.g. 069500.KS -> KRW).
+    """
+    from src import fx  # fx imports this module
+    for table in ('holdings', 'lots'):
+        rows = cursor.execute(f"SELECT id, ticker FROM {table} WHERE currency IS NULL OR currency = 'USD'").fetchall()
+        updates = [(fx.infer_currency(ticker), row_id) for row_id, ticker in rows]
+        cursor.executemany(f'UPDATE {table} SET currency = ? WHERE id = ?',
+                           [(c, i) for c, i in updates if c != fx.PIVOT_CURRENCY])
+
+# Schema migrations: (version, description, steps).
+# A step is an SQL statement or a function of the cursor (for data backfills).
+# Applied in order inside one transaction each; the current version is PRAGMA user_version.
+# Never edit a released migration - append a new one instead.
+MIGRATIONS: List[Tuple[int, str, List[Union[str, Callable[[sqlite3.Cursor], None]]]]] = [
+    (1, 'baseline: holdings, meta, market cache, dividend store', [
+        '''
+        CREATE TABLE IF NOT EXISTS holdings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticker TEXT UNIQUE NOT NULL,
+            shares REAL NOT NULL,
+            avg_cost REAL NOT NULL,
+            sector TEXT,
+            currency TEXT DEFAULT 'USD'
+        )
+        ''',
+        # Key/value metadata (e.g. holdings_version)
+        '''
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        ''',
+        # Persistent market data cache (see src/cache.py)
+        '''
+        CREATE TABLE IF NOT EXISTS market_cache (
+            ticker TEXT NOT NULL,
+            field_group TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (ticker, field_group)
+        )
+        ''',
+        # Locally stored dividend events with a per-ticker high-water mark
+        '''
+        CREATE TABLE IF NOT EXISTS dividend_events (
+            ticker TEXT NOT NULL,
+            date TEXT NOT NULL,
+            amount REAL NOT NULL,
+            PRIMARY KEY (ticker, date)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS dividend_sync (
+            ticker TEXT PRIMARY KEY,
+            last_date TEXT,
+            synced_at REAL NOT NULL
+        )
+        ''',
+    ]),
+    (2, 'multiple portfolios with lot-level purchases and a transaction ledger', [
+        '''
+        CREATE TABLE portfolios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            base_currency TEXT NOT NULL DEFAULT 'USD',
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        ''',
+        f"INSERT INTO portfolios (id, name) VALUES ({DEFAULT_PORTFOLIO_ID}, '기본 포트폴리오')",
+        # Open purchase lots; `shares` is what remains after sells (FIFO)
+        '''
+        CREATE TABLE lots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+            ticker TEXT NOT NULL,
+            shares REAL NOT NULL CHECK (shares >= 0),
+            cost_per_share REAL NOT NULL,
+            purchase_date TEXT NOT NULL,
+            currency TEXT NOT NULL DEFAULT 'USD',
+            sector TEXT
+        )
+        ''',
+        'CREATE INDEX idx_lots_portfolio_ticker ON lots (portfolio_id, ticker)',
+        'CREATE INDEX idx_lots_purchase_date ON lots (purchase_date)',
+        '''
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+            lot_id INTEGER REFERENCES lots(id) ON DELETE SET NULL,
+            ticker TEXT NOT NULL,
+            type TEXT NOT NULL CHECK (type IN ('BUY', 'SELL', 'DIVIDEND')),
+            date TEXT NOT NULL,
+            shares REAL NOT NULL DEFAULT 0,
+            price REAL NOT NULL DEFAULT 0,
+            fee REAL NOT NULL DEFAULT 0,
+            currency TEXT NOT NULL DEFAULT 'USD'
+        )
+        ''',
+        'CREATE INDEX idx_transactions_portfolio_ticker ON transactions (portfolio_id, ticker)',
+        'CREATE INDEX idx_transactions_date ON transactions (date)',
+    ]),
+    (3, 'daily OHLCV price history partitioned by ticker and year', [
+        # One row per (ticker, year); each field is a packed little-endian array
+        # aligned with `days` (int32 days since 1970-01-01), see src/prices.py
+        '''
+        CREATE TABLE price_blocks (
+            ticker TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            days BLOB NOT NULL,
+            open BLOB NOT NULL,
+            high BLOB NOT NULL,
+            low BLOB NOT NULL,
+            close BLOB NOT NULL,
+            adj_close BLOB NOT NULL,
+            volume BLOB NOT NULL,
+            PRIMARY KEY (ticker, year)
+        )
+        ''',
+        '''
+        CREATE TABLE price_sync (
+            ticker TEXT PRIMARY KEY,
+            last_date TEXT,
+            synced_at REAL NOT NULL
+        )
+        ''',
+    ]),
+    (4, 'materialized dividend calendar with per-ticker invalidation', [
+        # Bumped whenever a ticker's stored dividend events change
+        'ALTER TABLE dividend_sync ADD COLUMN revision INTEGER NOT NULL DEFAULT 0',
+        # Projected payments per (ticker, month), see src/dividend_calendar.py
+        '''
+        CREATE TABLE dividend_calendar (
+            ticker TEXT NOT NULL,
+            month TEXT NOT NULL,
+            amount_per_share REAL NOT NULL,
+            shares REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            PRIMARY KEY (ticker, month)
+        )
+        ''',
+        # Inputs each ticker's calendar rows were built from
+        '''
+        CREATE TABLE dividend_calendar_state (
+            ticker TEXT PRIMARY KEY,
+            shares REAL NOT NULL,
+            dividend_revision INTEGER NOT NULL,
+            start_month TEXT NOT NULL,
+            built_at REAL NOT NULL
+        )
+        ''',
+    ]),
+    (5, 'resumable streaming imports', [
+        # Progress of the latest import per source, see src/importer.py
+        '''
+        CREATE TABLE import_jobs (
+            source TEXT PRIMARY KEY,
+            fingerprint TEXT,
+            header TEXT NOT NULL,
+            byte_offset INTEGER NOT NULL,
+            rows_read INTEGER NOT NULL,
+            rows_written INTEGER NOT NULL,
+            error_count INTEGER NOT NULL,
+            status TEXT NOT NULL CHECK (status IN ('running', 'done')),
+            updated_at REAL NOT NULL
+        )
+        ''',
+    ]),
+    (6, 'dividend schedules and calendar rows per payment date', [
+        # Detected schedule per ticker, rebuilt when its dividend revision changes
+        '''
+        CREATE TABLE dividend_schedules (
+            ticker TEXT PRIMARY KEY,
+            dividend_revision INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            built_at REAL NOT NULL
+        )
+        ''',
+        # One row per payment instead of per month; rebuilt on next access
+        'DROP TABLE dividend_calendar',
+        '''
+        CREATE TABLE dividend_calendar (
+            ticker TEXT NOT NULL,
+            ex_date TEXT NOT NULL,
+            pay_date TEXT NOT NULL,
+            month TEXT NOT NULL,
+            amount_per_share REAL NOT NULL,
+            shares REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            special INTEGER NOT NULL DEFAULT 0,
+            projected INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (ticker, ex_date)
+        )
+        ''',
+        'DELETE FROM dividend_calendar_state',
+    ]),
+    (7, 'listing currency of holdings and lots created as USD', [
+        _backfill_currencies,
+    ]),
+    (8, 'physical line count of resumable imports', [
+        'ALTER TABLE import_jobs ADD COLUMN lines_read INTEGER NOT NULL DEFAULT 0',
+        # Unfinished jobs were counted in records; assume one line each after the header
+        'UPDATE import_jobs SET lines_read = rows_read + 1',
+    ]),
+]
 
-def init_db() -> None:
-    """Initializes the database table if it doesn't exist."""
+def get_schema_version() -> int:
+    """Returns the applied schema version (PRAGMA user_version)."""
+    with get_db_connection() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+@instrumentation.timed
+def migrate() -> int:
+    """
+    Applies pending migrations, each in its own transaction.
+    
+    Returns:
+        The schema version after migrating.
+    """
     try:
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS holdings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ticker TEXT UNIQUE NOT NULL,
-                    shares REAL NOT NULL,
-                    avg_cost REAL NOT NULL,
-                    sector TEXT,
-                    currency TEXT DEFAULT 'USD'
-                )
-            ''')
-            conn.commit()
-            logger.info(f"Database initialized successfully at {DB_PATH}")
+            current = conn.execute('PRAGMA user_version').fetchone()[0]
+            for version, description, statements in MIGRATIONS:
+                if version <= current:
+                    continue
+                conn.execute('BEGIN')
+                cursor = conn.cursor()
+                for step in statements:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+                current = version
+                logger.info(f"Applied migration {version}: {description}")
+            return current
     except sqlite3.Error as e:
-        logger.error(f"Failed to initialize database: {e}")
+        logger.error(f"Migration failed: {e}")
         raise
 
+def init_db(force: bool = False) -> None:
+    """
+    Initializes the database by applying pending schema migrations.
+    Runs once per process and database path; later calls return immediately.
+    """
+    global _initialized_path
+    if _initialized_path == DB_PATH and not force:
+        return
+    with _init_lock:
+        if _initialized_path == DB_PATH and not force:
+            return
+        version = migrate()
+        _initialized_path = DB_PATH
+        logger.info(f"Database initialized successfully at {DB_PATH} (schema v{version})")
+
+@instrumentation.timed
 def add_holding(ticker: str, shares: float, avg_cost: float, sector: Optional[str] = None, currency: str = 'USD') -> None:
     """
     Adds a new holding or updates an existing one (Upsert).
@@ -63,43 +350,467 @@ def add_holding(ticker: str, shares: float, avg_cost: float, sector: Optional[st
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO holdings (ticker, shares, avg_cost, sector, currency)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(ticker) DO UPDATE SET
-                    shares = excluded.shares,
-                    avg_cost = excluded.avg_cost,
-                    sector = excluded.sector
-            ''', (ticker.upper(), shares, avg_cost, sector, currency))
+            cursor.execute(UPSERT_HOLDING_SQL, (ticker.upper(), shares, avg_cost, sector, currency))
+            _bump_holdings_version(cursor)
             conn.commit()
             logger.info(f"Upserted holding: {ticker.upper()}")
     except sqlite3.Error as e:
         logger.error(f"Error adding holding {ticker}: {e}")
         raise
 
-def get_holdings() -> List[Tuple[Any, ...]]:
-    """Retrieves all holdings from the database."""
+@instrumentation.timed
+def bulk_upsert_holdings(rows: List[Tuple[str, float, float, Optional[str], str]]) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Upserts many holdings in a single transaction.
+    
+    Args:
+        rows: List of (ticker, shares, avg_cost, sector, currency), already normalized
+        
+    Returns:
+        Tuple of (number of rows written, [(index in rows, error message), ...]).
+        If the batch fails, rows are retried one by one so a bad row doesn't abort the rest.
+    """
+    if not rows:
+        return 0, []
+    errors = []
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(UPSERT_HOLDING_SQL, rows)
+            except sqlite3.Error as e:
+                logger.warning(f"Bulk upsert failed ({e}), retrying row by row")
+                conn.rollback()
+                for i, row in enumerate(rows):
+                    try:
+                        cursor.execute(UPSERT_HOLDING_SQL, row)
+                    except sqlite3.Error as row_error:
+                        errors.append((i, str(row_error)))
+            _bump_holdings_version(cursor)
+            conn.commit()
+            logger.info(f"Bulk upserted {len(rows) - len(errors)} holdings")
+    except sqlite3.Error as e:
+        logger.error(f"Error during bulk upsert: {e}")
+        raise
+    return len(rows) - len(errors), errors
+
+def _bump_holdings_version(cursor: sqlite3.Cursor) -> None:
+    """Increments the holdings version inside the caller's transaction."""
+    cursor.execute('''
+        INSERT INTO meta (key, value) VALUES ('holdings_version', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+    ''')
+
+def get_holdings_version() -> int:
+    """Returns a counter that changes whenever holdings are written."""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM holdings')
+            cursor.execute("SELECT value FROM meta WHERE key = 'holdings_version'")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving holdings version: {e}")
+        return 0
+
+# Current holdings of a portfolio, aggregated from its open lots.
+# Same column layout as the `holdings` table.
+LOT_HOLDINGS_SQL = '''
+    SELECT MIN(id), ticker, SUM(shares), SUM(shares * cost_per_share) / SUM(shares),
+           MAX(sector), MAX(currency)
+    FROM lots
+    WHERE portfolio_id = ? AND shares > 0
+    GROUP BY ticker
+    ORDER BY ticker
+'''
+
+@instrumentation.timed
+def get_holdings(portfolio_id: Optional[int] = None) -> List[Tuple[Any, ...]]:
+    """
+    Retrieves all holdings from the database.
+    
+    Args:
+        portfolio_id: Aggregate the lots of this portfolio instead of reading
+            the manually managed `holdings` table (default)
+            
+    Returns:
+        List of tuples (id, ticker, shares, avg_cost, sector, currency)
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            if portfolio_id is None:
+                cursor.execute('SELECT * FROM holdings')
+            else:
+                cursor.execute(LOT_HOLDINGS_SQL, (portfolio_id,))
             rows = cursor.fetchall()
             return rows
     except sqlite3.Error as e:
         logger.error(f"Error retrieving holdings: {e}")
         return []
 
+# Sortable columns of get_holdings_page (also guards the ORDER BY clause)
+HOLDING_SORT_COLUMNS = ['ticker', 'shares', 'avg_cost', 'sector', 'currency']
+
+@instrumentation.timed
+def get_holdings_page(query: str = '', sort_by: Optional[str] = 'ticker', ascending: bool = True,
+                      offset: int = 0, limit: int = 50) -> Tuple[List[Tuple[Any, ...]], int]:
+    """
+    Retrieves one page of holdings, filtered and sorted in SQL.
+    
+    Args:
+        query: Case-insensitive substring of the ticker or sector
+        sort_by: One of HOLDING_SORT_COLUMNS
+        ascending: Sort direction (ties are broken by ticker)
+        offset: Rows to skip
+        limit: Page size
+        
+    Returns:
+        Tuple of (rows like get_holdings(), number of matching holdings)
+    """
+    if sort_by not in HOLDING_SORT_COLUMNS:
+        raise ValueError(f"Unknown sort column: {sort_by}")
+    where, params = '', []
+    if query:
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        where = "WHERE ticker LIKE ? ESCAPE '\\' OR sector LIKE ? ESCAPE '\\'"
+        params = [pattern, pattern]
+    direction = 'ASC' if ascending else 'DESC'
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            total = cursor.execute(f'SELECT COUNT(*) FROM holdings {where}', params).fetchone()[0]
+            cursor.execute(
+                f'SELECT * FROM holdings {where} ORDER BY {sort_by} IS NULL, {sort_by} {direction}, ticker '
+                'LIMIT ? OFFSET ?',
+                params + [limit, offset]
+            )
+            return cursor.fetchall(), total
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving holdings page: {e}")
+        return [], 0
+
+@instrumentation.timed
+def get_all_tickers() -> List[str]:
+    """Returns every ticker currently held, in the holdings table or in any portfolio's open lots."""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT ticker FROM holdings
+                UNION
+                SELECT ticker FROM lots WHERE shares > 0
+                ORDER BY ticker
+            ''')
+            return [r[0] for r in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving tickers: {e}")
+        return []
+
 def delete_holding(ticker: str) -> None:
     """Deletes a holding by ticker."""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM holdings WHERE ticker = ?', (ticker.upper(),))
+            _bump_holdings_version(cursor)
             conn.commit()
             logger.info(f"Deleted holding: {ticker.upper()}")
     except sqlite3.Error as e:
         logger.error(f"Error deleting holding {ticker}: {e}")
         raise
 
+def create_portfolio(name: str, base_currency: str = 'USD') -> int:
+    """Creates a portfolio and returns its id."""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT INTO portfolios (name, base_currency) VALUES (?, ?)', (name, base_currency.upper()))
+            conn.commit()
+            logger.info(f"Created portfolio: {name}")
+            return cursor.lastrowid
+    except sqlite3.Error as e:
+        logger.error(f"Error creating portfolio {name}: {e}")
+        raise
+
+def get_portfolios() -> List[Tuple[Any, ...]]:
+    """Retrieves all portfolios [(id, name, base_currency, created_at), ...]."""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, name, base_currency, created_at FROM portfolios ORDER BY id')
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving portfolios: {e}")
+        return []
+
+def set_base_currency(portfolio_id: int, currency: str) -> None:
+    """Changes the currency a portfolio is valued in."""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE portfolios SET base_currency = ? WHERE id = ?', (currency.upper(), portfolio_id))
+            # Metrics are derived from holdings and the base currency
+            _bump_holdings_version(cursor)
+            conn.commit()
+            logger.info(f"Set base currency of portfolio {portfolio_id} to {currency.upper()}")
+    except sqlite3.Error as e:
+        logger.error(f"Error setting base currency of portfolio {portfolio_id}: {e}")
+        raise
+
+@instrumentation.timed
+def add_lot(portfolio_id: int, ticker: str, shares: float, cost_per_share: float, purchase_date: str,
+            currency: str = 'USD', sector: Optional[str] = None, fee: float = 0.0) -> int:
+    """
+    Records a purchase as a new lot plus a BUY transaction in one transaction.
+    
+    Args:
+        portfolio_id: Portfolio the lot belongs to
+        ticker: ETF Ticker Symbol
+        shares: Number of shares bought
+        cost_per_share: Purchase price per share
+        purchase_date: Date 'YYYY-MM-DD'
+        currency: Currency code (default USD)
+        sector: Sector classification (optional)
+        fee: Commission paid
+        
+    Returns:
+        The new lot id.
+    """
+    ticker = ticker.upper()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO lots (portfolio_id, ticker, shares, cost_per_share, purchase_date, currency, sector)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (portfolio_id, ticker, shares, cost_per_share, purchase_date, currency, sector))
+            lot_id = cursor.lastrowid
+            cursor.execute('''
+                INSERT INTO transactions (portfolio_id, lot_id, ticker, type, date, shares, price, fee, currency)
+                VALUES (?, ?, ?, 'BUY', ?, ?, ?, ?, ?)
+            ''', (portfolio_id, lot_id, ticker, purchase_date, shares, cost_per_share, fee, currency))
+            _bump_holdings_version(cursor)
+            conn.commit()
+            logger.info(f"Added lot {lot_id}: {ticker} x {shares} in portfolio {portfolio_id}")
+            return lot_id
+    except sqlite3.Error as e:
+        logger.error(f"Error adding lot for {ticker}: {e}")
+        raise
+
+@instrumentation.timed
+def add_transaction(portfolio_id: int, ticker: str, tx_type: str, date: str, shares: float = 0.0,
+                    price: float = 0.0, fee: float = 0.0, currency: str = 'USD') -> int:
+    """
+    Records a SELL or DIVIDEND transaction (use add_lot for purchases).
+    A SELL reduces the ticker's open lots first-in, first-out.
+    
+    Raises:
+        ValueError: For BUY transactions or when selling more shares than are held.
+        
+    Returns:
+        The new transaction id.
+    """
+    ticker, tx_type = ticker.upper(), tx_type.upper()
+    if tx_type == 'BUY':
+        raise ValueError("Use add_lot() to record purchases")
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO transactions (portfolio_id, ticker, type, date, shares, price, fee, currency)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (portfolio_id, ticker, tx_type, date, shares, price, fee, currency))
+            tx_id = cursor.lastrowid
+
+            if tx_type == 'SELL':
+                cursor.execute('''
+                    SELECT id, shares FROM lots
+                    WHERE portfolio_id = ? AND ticker = ? AND shares > 0
+                    ORDER BY purchase_date, id
+                ''', (portfolio_id, ticker))
+                remaining = shares
+                for lot_id, lot_shares in cursor.fetchall():
+                    if remaining <= 0:
+                        break
+                    taken = min(lot_shares, remaining)
+                    cursor.execute('UPDATE lots SET shares = shares - ? WHERE id = ?', (taken, lot_id))
+                    remaining -= taken
+                if remaining > 1e-9:
+                    raise ValueError(f"Cannot sell {shares} {ticker}: only {shares - remaining} held")
+                _bump_holdings_version(cursor)
+
+            conn.commit()
+            logger.info(f"Recorded {tx_type} {ticker} in portfolio {portfolio_id}")
+            return tx_id
+    except sqlite3.Error as e:
+        logger.error(f"Error recording {tx_type} for {ticker}: {e}")
+        raise
+
+def get_lots(portfolio_id: int, ticker: Optional[str] = None) -> List[Tuple[Any, ...]]:
+    """Retrieves lots [(id, ticker, shares, cost_per_share, purchase_date, currency, sector), ...]."""
+    query = 'SELECT id, ticker, shares, cost_per_share, purchase_date, currency, sector FROM lots WHERE portfolio_id = ?'
+    params: List[Any] = [portfolio_id]
+    if ticker:
+        query += ' AND ticker = ?'
+        params.append(ticker.upper())
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query + ' ORDER BY ticker, purchase_date, id', params)
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving lots: {e}")
+        return []
+
+def get_transactions(portfolio_id: int, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple[Any, ...]]:
+    """Retrieves transactions [(id, ticker, type, date, shares, price, fee, currency), ...] ordered by date."""
+    query = 'SELECT id, ticker, type, date, shares, price, fee, currency FROM transactions WHERE portfolio_id = ?'
+    params: List[Any] = [portfolio_id]
+    if start:
+        query += ' AND date >= ?'
+        params.append(start)
+    if end:
+        query += ' AND date <= ?'
+        params.append(end)
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query + ' ORDER BY date, id', params)
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving transactions: {e}")
+        return []
+
+def get_dividend_events(ticker: str) -> List[Tuple[str, float]]:
+    """Retrieves stored dividend events [(date, amount), ...] for a ticker, newest first."""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT date, amount FROM dividend_events WHERE ticker = ? ORDER BY date DESC',
+                (ticker.upper(),)
+            )
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving dividend events for {ticker}: {e}")
+        return []
+
+def get_dividend_sync(ticker: str) -> Optional[Tuple[Optional[str], float]]:
+    """Returns (last_date, synced_at) for a ticker, or None if it was never synced."""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT last_date, synced_at FROM dividend_sync WHERE ticker = ?', (ticker.upper(),))
+            return cursor.fetchone()
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving dividend sync state for {ticker}: {e}")
+        return None
+
+@instrumentation.timed
+def get_dividend_events_bulk(tickers: List[str]) -> List[Tuple[str, str, float]]:
+    """Retrieves stored dividend events [(ticker, date, amount), ...] for several tickers in one query."""
+    if not tickers:
+        return []
+    placeholders = ','.join('?' * len(tickers))
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'SELECT ticker, date, amount FROM dividend_events WHERE ticker IN ({placeholders}) '
+                f'ORDER BY ticker, date DESC',
+                [t.upper() for t in tickers]
+            )
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving dividend events: {e}")
+        return []
+
+def get_dividend_sync_states(tickers: List[str]) -> dict:
+    """Returns {ticker: (last_date, synced_at)} for the given tickers that were synced before."""
+    if not tickers:
+        return {}
+    placeholders = ','.join('?' * len(tickers))
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'SELECT ticker, last_date, synced_at FROM dividend_sync WHERE ticker IN ({placeholders})',
+                [t.upper() for t in tickers]
+            )
+            return {t: (d, s) for t, d, s in cursor.fetchall()}
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving dividend sync states: {e}")
+        return {}
+
+@instrumentation.timed
+def save_dividend_events(ticker: str, events: List[Tuple[str, float]], synced_at: float, replace: bool = False) -> None:
+    """
+    Stores dividend events and advances the ticker's high-water mark in one transaction.
+
+    Args:
+        ticker: Ticker symbol
+        events: List of (date 'YYYY-MM-DD', amount)
+        synced_at: Unix timestamp of the sync
+        replace: Drop previously stored events first (full resync)
+    """
+    ticker = ticker.upper()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            if replace:
+                cursor.execute('DELETE FROM dividend_events WHERE ticker = ?', (ticker,))
+            cursor.executemany('''
+                INSERT OR REPLACE INTO dividend_events (ticker, date, amount)
+                VALUES (?, ?, ?)
+            ''', [(ticker, d, a) for d, a in events])
+            cursor.execute('''
+                INSERT INTO dividend_sync (ticker, last_date, synced_at, revision)
+                VALUES (?, (SELECT MAX(date) FROM dividend_events WHERE ticker = ?), ?, 1)
+                ON CONFLICT(ticker) DO UPDATE SET
+                    last_date = excluded.last_date,
+                    synced_at = excluded.synced_at,
+                    revision = revision + ?
+            ''', (ticker, ticker, synced_at, int(bool(events) or replace)))
+            conn.commit()
+            logger.info(f"Stored {len(events)} dividend events for {ticker}")
+    except sqlite3.Error as e:
+        logger.error(f"Error saving dividend events for {ticker}: {e}")
+        raise
+
+@instrumentation.timed
+def merge_dividend_events(ticker: str, events: List[Tuple[str, float]]) -> None:
+    """
+    Stores dividend events from outside a sync (e.g. a file import) in one transaction.
+
+    The ticker's high-water mark and sync time are left as they are, so the next
+    sync still fetches everything after the last synced date (or the full history
+    of a ticker that was never synced); only the revision is bumped.
+
+    Args:
+        ticker: Ticker symbol
+        events: List of (date 'YYYY-MM-DD', amount)
+    """
+    if not events:
+        return
+    ticker = ticker.upper()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO dividend_events (ticker, date, amount)
+                VALUES (?, ?, ?)
+            ''', [(ticker, d, a) for d, a in events])
+            cursor.execute('''
+                INSERT INTO dividend_sync (ticker, last_date, synced_at, revision)
+                VALUES (?, NULL, 0, 1)
+                ON CONFLICT(ticker) DO UPDATE SET revision = revision + 1
+            ''', (ticker,))
+            conn.commit()
+            logger.info(f"Merged {len(events)} dividend events for {ticker}")
+    except sqlite3.Error as e:
+        logger.error(f"Error merging dividend events for {ticker}: {e}")
+        raise
+
 if __name__ == '__main__':
     init_db()
@@ -0,0 +1,215 @@
+import json
+import time
+import sqlite3
+import logging
+import datetime
+import dataclasses
+from typing import List, Dict, Tuple, Any, Optional
+
+import pandas as pd
+from src import database, fetcher, projection, instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+CALENDAR_COLUMNS = ['Month', 'Ticker', 'Ex Date', 'Pay Date', 'Amount Per Share', 'Shares', 'Total Amount',
+                    'Special', 'Projected']
+
+# Build inputs of one ticker's rows: (shares, dividend revision, first projected month)
+State = Tuple[float, int, str]
+
+
+def _holding_shares(holdings: List[Tuple[Any, ...]]) -> Dict[str, float]:
+    shares: Dict[str, float] = {}
+    for h in holdings:
+        ticker = h[1].upper()
+        shares[ticker] = shares.get(ticker, 0.0) + float(h[2])
+    return shares
+
+
+def get_states() -> Dict[str, State]:
+    """Returns {ticker: (shares, dividend_revision, start_month)} of the materialized calendar."""
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT ticker, shares, dividend_revision, start_month FROM dividend_calendar_state')
+            return {t: (s, r, m) for t, s, r, m in cursor.fetchall()}
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving dividend calendar states: {e}")
+        return {}
+
+
+def get_dividend_revisions(tickers: List[str]) -> Dict[str, int]:
+    """Returns {ticker: revision} of the stored dividend histories (missing if never synced)."""
+    if not tickers:
+        return {}
+    placeholders = ','.join('?' * len(tickers))
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT ticker, revision FROM dividend_sync WHERE ticker IN ({placeholders})', tickers)
+            return dict(cursor.fetchall())
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving dividend revisions: {e}")
+        return {}
+
+
+def _load_schedules(tickers: List[str]) -> Dict[str, Tuple[int, projection.Schedule]]:
+    """Returns {ticker: (dividend_revision, schedule)} of the stored schedules."""
+    if not tickers:
+        return {}
+    placeholders = ','.join('?' * len(tickers))
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'SELECT ticker, dividend_revision, payload FROM dividend_schedules WHERE ticker IN ({placeholders})',
+                tickers
+            )
+            result = {}
+            for ticker, revision, payload in cursor.fetchall():
+                data = json.loads(payload)
+                data['events'] = [tuple(e) for e in data['events']]
+                result[ticker] = (revision, projection.Schedule(**data))
+            return result
+    except (sqlite3.Error, ValueError, TypeError) as e:
+        logger.error(f"Error retrieving dividend schedules: {e}")
+        return {}
+
+
+def _save_schedules(schedules: Dict[str, Tuple[int, projection.Schedule]]) -> None:
+    try:
+        with database.get_db_connection() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO dividend_schedules (ticker, dividend_revision, payload, built_at)
+                VALUES (?, ?, ?, ?)
+            ''', [(t, r, json.dumps(dataclasses.asdict(s)), time.time()) for t, (r, s) in schedules.items()])
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error saving dividend schedules: {e}")
+        raise
+
+
+@instrumentation.timed
+def get_schedules(tickers: List[str], revisions: Optional[Dict[str, int]] = None) -> Dict[str, projection.Schedule]:
+    """
+    Returns the dividend schedule of each ticker. Schedules are stored per ticker
+    and detected again only when the ticker's dividend events changed.
+
+    Args:
+        tickers: Ticker symbols
+        revisions: {ticker: dividend revision} if already known (see get_dividend_revisions)
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    revisions = revisions if revisions is not None else get_dividend_revisions(tickers)
+    stored = _load_schedules(tickers)
+    schedules = {t: s for t, (r, s) in stored.items() if r == revisions.get(t, -1)}
+    missing = [t for t in tickers if t not in schedules]
+    instrumentation.inc('dividend_schedules_total', len(schedules), result='hit')
+    instrumentation.inc('dividend_schedules_total', len(missing), result='detected')
+    if missing:
+        history = fetcher.get_dividend_histories(missing, sync=False)
+        events = dict(tuple(history.groupby('Ticker')))
+        for t in missing:
+            group = events.get(t)
+            schedules[t] = (projection.detect_schedule(group['Date'], group['Dividends'])
+                            if group is not None else projection.Schedule())
+        _save_schedules({t: (revisions.get(t, -1), schedules[t]) for t in missing})
+    return schedules
+
+
+def _save(states: Dict[str, State], removed: List[str], rows: List[Tuple[Any, ...]]) -> None:
+    """Replaces the rows and states of the rebuilt tickers and drops removed ones in one transaction."""
+    tickers = [(t,) for t in list(states) + removed]
+    built_at = time.time()
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('DELETE FROM dividend_calendar WHERE ticker = ?', tickers)
+            cursor.executemany('DELETE FROM dividend_calendar_state WHERE ticker = ?', tickers)
+            cursor.executemany('''
+                INSERT INTO dividend_calendar
+                    (ticker, ex_date, pay_date, month, amount_per_share, shares, total_amount, special, projected)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            cursor.executemany('''
+                INSERT INTO dividend_calendar_state (ticker, shares, dividend_revision, start_month, built_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(t, *state, built_at) for t, state in states.items()])
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error saving dividend calendar: {e}")
+        raise
+
+
+@instrumentation.timed
+def refresh(holdings: List[Tuple[Any, ...]], today: Optional[datetime.datetime] = None) -> int:
+    """
+    Brings the materialized calendar up to date with the holdings.
+
+    Only tickers whose shares or dividend history changed since their rows were
+    built are laid out again; all of them are when a new month starts. Schedule
+    detection itself only reruns for tickers with new dividend events.
+
+    Args:
+        holdings: List of (id, ticker, shares, ...) tuples
+        today: Projection start (default: now)
+
+    Returns:
+        Number of tickers rebuilt or removed.
+    """
+    today = today or datetime.datetime.now()
+    start_month = today.strftime('%Y-%m')
+    shares = _holding_shares(holdings)
+
+    fetcher.ensure_dividend_histories(list(shares))
+    revisions = get_dividend_revisions(list(shares))
+    built = get_states()
+
+    wanted = {t: (s, revisions.get(t, -1), start_month) for t, s in shares.items()}
+    stale = {t: state for t, state in wanted.items() if built.get(t) != state}
+    removed = [t for t in built if t not in shares]
+    if not stale and not removed:
+        return 0
+
+    rows = []
+    if stale:
+        schedules = get_schedules(list(stale), revisions)
+        df_holdings = pd.DataFrame({'Ticker': list(stale), 'Shares': [shares[t] for t in stale]})
+        df = projection.project_dividends(df_holdings, schedules, today=today)
+        if not df.empty:
+            rows = list(zip(df['Ticker'], df['Ex Date'].dt.strftime('%Y-%m-%d'), df['Pay Date'].dt.strftime('%Y-%m-%d'),
+                            df['Month'], df['Amount Per Share'].astype(float), df['Shares'].astype(float),
+                            df['Total Amount'].astype(float), df['Special'].astype(int), df['Projected'].astype(int)))
+    _save(stale, removed, rows)
+    logger.info(f"Rebuilt dividend calendar for {len(stale)} tickers, removed {len(removed)}")
+    return len(stale) + len(removed)
+
+
+@instrumentation.timed
+def get_calendar(holdings: List[Tuple[Any, ...]], today: Optional[datetime.datetime] = None) -> pd.DataFrame:
+    """
+    Returns the dividend calendar, refreshing stale tickers first.
+
+    Returns:
+        DataFrame with CALENDAR_COLUMNS, one row per payment (by pay month),
+        sorted by Month and Total Amount descending.
+    """
+    refresh(holdings, today)
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT month, ticker, ex_date, pay_date, amount_per_share, shares, total_amount, special, projected
+                FROM dividend_calendar
+                ORDER BY month, total_amount DESC
+            ''')
+            df = pd.DataFrame(cursor.fetchall(), columns=CALENDAR_COLUMNS)
+            df['Ex Date'] = pd.to_datetime(df['Ex Date'])
+            df['Pay Date'] = pd.to_datetime(df['Pay Date'])
+            df['Special'] = df['Special'].astype(bool)
+            df['Projected'] = df['Projected'].astype(bool)
+            return df
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving dividend calendar: {e}")
+        return pd.DataFrame(columns=CALENDAR_COLUMNS)
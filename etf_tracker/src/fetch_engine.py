@@ -0,0 +1,146 @@
+import time
+import asyncio
+import logging
+from typing import List, Dict, Tuple, Any, Optional
+
+import pandas as pd
+from src import providers, instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Output schema of get_market_data (one row per ticker)
+MARKET_COLUMNS = ['Ticker', 'Current Price', 'Yield', 'Sector', 'Name']
+
+# Engine defaults
+TICKER_TIMEOUT = 10.0    # Wall-clock budget per ticker (seconds, retries included)
+MAX_RETRIES = 2          # Extra attempts after the first failure
+BACKOFF_BASE = 0.5       # Seconds; doubled after every failed attempt
+
+
+def _is_transient(error: BaseException) -> bool:
+    """
+    True for errors worth retrying: network failures, timeouts, rate limits and
+    5xx responses. A ProviderError (no data, unknown ticker) is final unless it
+    wraps a transient error (e.g. every fallback provider was unreachable).
+    """
+    if isinstance(error, providers.ProviderError):
+        cause = error.__cause__
+        return cause is not None and _is_transient(cause)
+    if isinstance(error, (OSError, asyncio.TimeoutError)):  # Connection errors, timeouts, URLError
+        return True
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None) or getattr(response, 'status_code', None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+async def _fetch_one(symbol: str, provider: providers.MarketDataProvider, limit: asyncio.Semaphore,
+                     groups: Tuple[str, ...], timeout: float, retries: int, backoff: float) -> Dict[str, Any]:
+    """
+    Fetches a single ticker, retrying transient errors with exponential backoff.
+    The timeout starts once the ticker gets a slot, so queueing doesn't count against it.
+    """
+    async with limit:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + timeout
+        attempt = 0
+        outcome = 'error'
+        try:
+            while True:
+                try:
+                    row = await asyncio.wait_for(provider.get_market_row(symbol, groups), deadline - loop.time())
+                    outcome = 'ok'
+                    return row
+                except Exception as e:
+                    # wait_for's timeout (raised from the cancellation) means the ticker's
+                    # budget is spent; a timeout inside the provider may be retried
+                    expired = isinstance(e.__cause__, asyncio.CancelledError) or loop.time() >= deadline
+                    if isinstance(e, asyncio.TimeoutError) and expired:
+                        outcome = 'timeout'
+                        raise
+                    delay = backoff * (2 ** attempt)
+                    if not _is_transient(e) or attempt >= retries or loop.time() + delay >= deadline:
+                        raise
+                    logger.warning(f"Retrying {symbol} in {delay:.1f}s after error: {e}")
+                    await asyncio.sleep(delay)
+                    attempt += 1
+        finally:
+            instrumentation.observe('fetch_ticker_seconds', loop.time() - started, ticker=symbol, outcome=outcome)
+
+
+async def fetch_rows_async(tickers: List[str],
+                           provider: Optional[providers.MarketDataProvider] = None,
+                           max_workers: Optional[int] = None,
+                           groups: Tuple[str, ...] = providers.MARKET_GROUPS,
+                           timeout: float = TICKER_TIMEOUT,
+                           retries: int = MAX_RETRIES,
+                           backoff: float = BACKOFF_BASE) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Fetches market data rows for tickers concurrently.
+
+    At most `max_workers` tickers are in flight, so the total cost is roughly
+    len(tickers) / max_workers times the typical ticker latency. A ticker that
+    keeps failing or exceeds `timeout` is reported as failed; the others are
+    still returned.
+
+    Args:
+        tickers: Ticker symbols (already normalized)
+        provider: Market data provider (default: providers.get_provider())
+        max_workers: Maximum concurrent tickers (default: the provider's
+            max_concurrency; a row is usually one upstream request)
+        groups: Field groups to fetch; rows only contain their columns
+        timeout: Per-ticker time budget in seconds, retries included
+        retries: Extra attempts after a failure
+        backoff: Base delay in seconds between attempts
+
+    Returns:
+        Tuple of (rows in ticker order, failed ticker symbols)
+    """
+    provider = provider or providers.get_provider()
+    limit = asyncio.Semaphore(max_workers or provider.max_concurrency)
+    results = await asyncio.gather(
+        *(_fetch_one(t, provider, limit, groups, timeout, retries, backoff) for t in tickers),
+        return_exceptions=True
+    )
+
+    rows, failed = [], []
+    for symbol, result in zip(tickers, results):
+        if isinstance(result, asyncio.TimeoutError):
+            logger.error(f"Timed out fetching data for {symbol} after {timeout:.0f}s")
+            failed.append(symbol)
+        elif isinstance(result, BaseException):
+            logger.error(f"Failed to fetch data for {symbol}: {result}")
+            failed.append(symbol)
+        else:
+            rows.append(result)
+    return rows, failed
+
+
+def fetch_rows(tickers: List[str], provider: Optional[providers.MarketDataProvider] = None,
+               **kwargs: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Synchronous wrapper of fetch_rows_async."""
+    if not tickers:
+        return [], []
+    start = time.monotonic()
+    rows, failed = providers.run(fetch_rows_async(tickers, provider, **kwargs))
+    logger.info(f"Fetched {len(rows)}/{len(tickers)} tickers in {time.monotonic() - start:.2f}s")
+    return rows, failed
+
+
+def fetch_market_data(tickers: List[str], provider: Optional[providers.MarketDataProvider] = None,
+                      **kwargs: Any) -> pd.DataFrame:
+    """
+    Fetches market data for tickers without any caching.
+
+    Returns:
+        DataFrame with MARKET_COLUMNS. Tickers that failed are omitted.
+    """
+    if not tickers:
+        return pd.DataFrame()
+
+    unique_tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    rows, failed = fetch_rows(unique_tickers, provider, **kwargs)
+    if failed:
+        logger.warning(f"Market data incomplete, {len(failed)}/{len(unique_tickers)} failed: {failed}")
+    return pd.DataFrame(rows, columns=MARKET_COLUMNS)
@@ -1,12 +1,21 @@
-import yfinance as yf
 import pandas as pd
-import streamlit as st
+import time
 import logging
-from typing import List, Optional, Any
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional, Any
+from src import fetch_engine, providers, cache, database, singleflight, instrumentation
 
 # Configure Logger
 logger = logging.getLogger(__name__)
 
+# Refresh interval of incremental dividend syncs
+DIVIDEND_SYNC_TTL = 86400
+
+# Concurrent requests for the same ticker share one upstream fetch
+_market_flight = singleflight.group('market')
+_dividend_flight = singleflight.group('dividends')
+
 SECTOR_MAP = {
     'Technology': '기술',
     'Healthcare': '헬스케어',
@@ -27,10 +36,55 @@ def map_sector_to_category(sector: str) -> str:
         return '기타'
     return SECTOR_MAP.get(sector, sector)
 
-@st.cache_data(ttl=900)
+def _fetch_and_store(keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+    """Fetches (ticker, field group) keys, batching tickers that need the same groups."""
+    wanted: Dict[str, List[str]] = {}
+    for t, g in keys:
+        wanted.setdefault(t, []).append(g)
+    batches: Dict[Tuple[str, ...], List[str]] = {}
+    for t, gs in wanted.items():
+        batches.setdefault(tuple(g for g in cache.MARKET_GROUPS if g in gs), []).append(t)
+
+    payloads = {}
+    for groups, tickers in batches.items():
+        rows, _ = fetch_engine.fetch_rows(tickers, groups=groups)
+        cache.store_market_rows(rows)
+        for r in rows:
+            for g in groups:
+                payloads[(r['Ticker'], g)] = {c: r[c] for c in cache.FIELD_GROUPS[g]['columns']}
+    return payloads
+
+@instrumentation.timed
+def refresh_market_keys(keys: List[Tuple[str, str]]) -> Dict[str, dict]:
+    """
+    Fetches (ticker, field group) keys into the persistent cache and returns the
+    fetched columns by ticker. Keys already being fetched by another thread are
+    awaited instead of refetched.
+    """
+    rows: Dict[str, dict] = {}
+    for (t, _), payload in _market_flight.do_many(keys, _fetch_and_store).items():
+        if payload is not None:
+            rows.setdefault(t, {'Ticker': t}).update(payload)
+    return rows
+
+def refresh_market_data(tickers: List[str], groups: Tuple[str, ...] = cache.MARKET_GROUPS) -> List[dict]:
+    """
+    Fetches field groups of tickers from the provider and writes them to the
+    persistent cache (e.g. groups=('quote',) refreshes prices only).
+
+    Returns:
+        Fetched (possibly partial) rows; failed tickers are omitted.
+    """
+    rows = refresh_market_keys([(t, g) for t in tickers for g in groups])
+    return [rows[t] for t in tickers if t in rows]
+
+@instrumentation.timed
 def get_market_data(tickers: List[str]) -> pd.DataFrame:
     """
-    Fetches real-time market data for a list of tickers using yfinance.
+    Fetches real-time market data for a list of tickers from the market data provider.
+    Rows are assembled per ticker from the persistent cache (see src/cache.py), so only
+    missing tickers, or missing field groups of a ticker, are fetched synchronously.
+    Stale groups are returned immediately and revalidated in the background.
     
     Args:
         tickers: List of ticker symbols (e.g. ['SCHD', 'JEPI'])
@@ -41,55 +95,71 @@ def get_market_data(tickers: List[str]) -> pd.DataFrame:
     if not tickers:
         return pd.DataFrame()
     
-    unique_tickers = list(set([t.upper() for t in tickers]))
-    results = []
+    unique_tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    rows, stale, missing = cache.load_market_rows(unique_tickers)
+
+    if missing:
+        logger.info(f"Fetching market data for: {sorted({t for t, _ in missing})}")
+        for t, fetched in refresh_market_keys(missing).items():
+            rows.setdefault(t, {'Ticker': t}).update(fetched)
+    if stale:
+        key = ','.join(f"{t}/{g}" for t, g in sorted(stale))
+        cache.refresh_in_background(f"market:{key}", lambda: refresh_market_keys(stale))
+
+    complete = [rows[t] for t in unique_tickers if t in rows and len(rows[t]) == len(fetch_engine.MARKET_COLUMNS)]
+    return pd.DataFrame(complete, columns=fetch_engine.MARKET_COLUMNS)
+
+def _fetch_dividends(ticker: str, start: Optional[datetime.date] = None, full: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Downloads dividend events for a ticker from the provider. Returns None on failure.
+    
+    Args:
+        ticker: Ticker symbol
+        start: Only fetch events on or after this date (incremental sync)
+        full: Fetch the entire history instead of the initial lookback window
+    """
+    try:
+        hist = providers.run(providers.get_provider().get_dividends(ticker, start, full))
+        return pd.DataFrame({'Date': hist.index, 'Dividends': hist.to_numpy()})
+    except Exception as e:
+        logger.error(f"Error fetching dividends for {ticker}: {e}")
+        return None
+
+@instrumentation.timed
+def sync_dividend_history(ticker: str, full: bool = False) -> int:
+    """
+    Syncs locally stored dividend events with the provider.
+    Only events after the stored high-water mark are requested unless `full` is set,
+    in which case the ticker's stored history is replaced with the complete history.
     
-    logger.info(f"Fetching market data for: {unique_tickers}")
-
-    for t_symbol in unique_tickers:
-        try:
-            t = yf.Ticker(t_symbol)
-            # Fetch info (network call)
-            info = t.info
-            
-            # Defensive coding for missing keys
-            price = info.get('currentPrice') or info.get('regularMarketPrice') or info.get('previousClose') or 0.0
-            # Yield Handling
-            # yfinance 'dividendYield' is usually Percentage (e.g. 3.74 for 3.74%)
-            # 'trailingAnnualDividendYield' is usually Decimal (e.g. 0.0374)
-            div_yield = info.get('dividendYield')
-            
-            if div_yield is not None:
-                # Assume if it's from 'dividendYield', it's a percentage. 
-                # Normalize to decimal for consistency
-                div_yield = div_yield / 100.0
-            else:
-                # Fallback
-                div_yield = info.get('trailingAnnualDividendYield', 0)
-                # trailingAnnualDividendYield is already decimal usually.
-                if div_yield is None: div_yield = 0
-
-            sector = info.get('sector', 'Unknown')
-            name = info.get('shortName', t_symbol)
-            
-            results.append({
-                'Ticker': t_symbol,
-                'Current Price': float(price),
-                'Yield': float(div_yield),
-                'Sector': str(sector),
-                'Name': str(name)
-            })
-        except Exception as e:
-            logger.error(f"Failed to fetch data for {t_symbol}: {e}")
-            # Continue to next ticker even if one fails
-            continue
-            
-    return pd.DataFrame(results)
-
-@st.cache_data(ttl=86400)
+    Returns:
+        Number of events fetched, or -1 if the fetch failed.
+    """
+    ticker = ticker.upper()
+    return _dividend_flight.do((ticker, full), lambda: _sync_dividend_history(ticker, full))
+
+def _sync_dividend_history(ticker: str, full: bool) -> int:
+    state = None if full else database.get_dividend_sync(ticker)
+    start = None
+    if state is not None and state[0]:
+        start = datetime.date.fromisoformat(state[0]) + datetime.timedelta(days=1)
+
+    if start is not None and start > datetime.date.today():
+        df = pd.DataFrame(columns=['Date', 'Dividends'])
+    else:
+        df = _fetch_dividends(ticker, start=start, full=full)
+        if df is None:
+            return -1
+
+    events = list(zip(pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d'), df['Dividends'].astype(float)))
+    database.save_dividend_events(ticker, events, time.time(), replace=full)
+    return len(events)
+
 def get_dividend_history(ticker: str) -> pd.DataFrame:
     """
-    Fetches historical dividend data for a single ticker.
+    Returns historical dividend data for a single ticker from the local store.
+    The first call syncs synchronously; afterwards a sync older than
+    DIVIDEND_SYNC_TTL is refreshed incrementally in the background.
     
     Args:
         ticker: Ticker symbol
@@ -97,23 +167,57 @@ def get_dividend_history(ticker: str) -> pd.DataFrame:
     Returns:
         DataFrame with 'Date' and 'Dividends' columns, sorted by Date descending.
     """
-    try:
-        t = yf.Ticker(ticker)
-        hist = t.dividends
-        
-        if hist is None or hist.empty:
-            logger.warning(f"No dividend history found for {ticker}")
-            return pd.DataFrame(columns=['Date', 'Dividends'])
+    ticker = ticker.upper()
+    state = database.get_dividend_sync(ticker)
+    if state is None:
+        sync_dividend_history(ticker)
+    elif time.time() - state[1] > DIVIDEND_SYNC_TTL:
+        cache.refresh_in_background(f"dividends:{ticker}", lambda: sync_dividend_history(ticker))
 
-        df = pd.DataFrame(hist)
-        df.reset_index(inplace=True)
-        
-        # Standardize columns
-        df.columns = ['Date', 'Dividends']
-        df['Date'] = pd.to_datetime(df['Date']).dt.tz_localize(None)
-        
-        return df.sort_values(by='Date', ascending=False)
-        
-    except Exception as e:
-        logger.error(f"Error fetching dividends for {ticker}: {e}")
+    events = database.get_dividend_events(ticker)
+    if not events:
+        logger.warning(f"No dividend history found for {ticker}")
         return pd.DataFrame(columns=['Date', 'Dividends'])
+
+    df = pd.DataFrame(events, columns=['Date', 'Dividends'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+def ensure_dividend_histories(tickers: List[str]) -> None:
+    """
+    Syncs never-synced tickers' dividend histories concurrently and schedules
+    a background refresh for those older than DIVIDEND_SYNC_TTL.
+    """
+    unique_tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    states = database.get_dividend_sync_states(unique_tickers)
+
+    missing = [t for t in unique_tickers if t not in states]
+    if missing:
+        with ThreadPoolExecutor(max_workers=providers.DEFAULT_CONCURRENCY, thread_name_prefix='dividends') as executor:
+            list(executor.map(sync_dividend_history, missing))
+
+    now = time.time()
+    for t, (_, synced_at) in states.items():
+        if now - synced_at > DIVIDEND_SYNC_TTL:
+            cache.refresh_in_background(f"dividends:{t}", lambda t=t: sync_dividend_history(t))
+
+@instrumentation.timed
+def get_dividend_histories(tickers: List[str], sync: bool = True) -> pd.DataFrame:
+    """
+    Returns the dividend histories of several tickers as one long frame.
+    
+    Args:
+        tickers: Ticker symbols
+        sync: Sync missing and stale histories first (see ensure_dividend_histories)
+    
+    Returns:
+        DataFrame with 'Ticker', 'Date' and 'Dividends' columns,
+        sorted by Ticker and Date descending.
+    """
+    unique_tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    if sync:
+        ensure_dividend_histories(unique_tickers)
+
+    df = pd.DataFrame(database.get_dividend_events_bulk(unique_tickers), columns=['Ticker', 'Date', 'Dividends'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
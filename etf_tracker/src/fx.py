@@ -0,0 +1,171 @@
+import logging
+from typing import List, Tuple, Any, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+from src import database, prices, instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Rates are stored per USD: the daily close of '<CUR>=X' is units of CUR per 1 USD
+PIVOT_CURRENCY = 'USD'
+
+CURRENCY_SYMBOLS = {'USD': '$', 'KRW': '₩', 'EUR': '€', 'JPY': '¥', 'GBP': '£', 'CNY': '¥'}
+
+# Listing currency by Yahoo Finance exchange suffix; anything else is assumed USD
+SUFFIX_CURRENCIES = {'.KS': 'KRW', '.KQ': 'KRW', '.T': 'JPY', '.L': 'GBP', '.DE': 'EUR', '.PA': 'EUR', '.HK': 'HKD'}
+
+
+def fx_symbol(currency: str) -> str:
+    """Price store symbol of a currency's daily rate against USD."""
+    return f"{currency.upper()}=X"
+
+
+def currency_symbol(currency: str) -> str:
+    """Display prefix of an amount in `currency` (e.g. '$', '₩', 'HKD ')."""
+    return CURRENCY_SYMBOLS.get(currency.upper(), f"{currency.upper()} ")
+
+
+def infer_currency(ticker: str) -> str:
+    """Listing currency of a ticker from its exchange suffix (e.g. 069500.KS -> KRW)."""
+    ticker = ticker.upper()
+    for suffix, currency in SUFFIX_CURRENCIES.items():
+        if ticker.endswith(suffix):
+            return currency
+    return PIVOT_CURRENCY
+
+
+def _currencies(values: Iterable[Any]) -> List[str]:
+    return list(dict.fromkeys(str(c).upper() if c else PIVOT_CURRENCY for c in values))
+
+
+def get_base_currency(portfolio_id: int = database.DEFAULT_PORTFOLIO_ID) -> str:
+    """Base currency of a portfolio (USD if it doesn't exist)."""
+    for pid, _, base_currency, _ in database.get_portfolios():
+        if pid == portfolio_id:
+            return base_currency
+    return PIVOT_CURRENCY
+
+
+@instrumentation.timed
+def get_rate_matrix(currencies: List[str], sync: bool = True) -> pd.DataFrame:
+    """
+    Daily units of each currency per USD, forward-filled, from the price store.
+
+    One history per currency is fetched and then kept up to date by the store,
+    so the number of holdings doesn't affect the number of fetches; the matrix
+    is cached in memory until the store changes (see prices.get_price_matrix).
+
+    Returns:
+        DataFrame indexed by Date with one column per currency; USD is 1.
+    """
+    currencies = _currencies(currencies)
+    others = [c for c in currencies if c != PIVOT_CURRENCY]
+    if others:
+        matrix = prices.get_price_matrix([fx_symbol(c) for c in others], sync=sync)
+        matrix = matrix.set_axis(others, axis=1)
+    else:
+        matrix = pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+    return matrix.assign(**{PIVOT_CURRENCY: 1.0}).reindex(columns=currencies).ffill()
+
+
+def _per_usd(matrix: pd.DataFrame, currencies: List[str], rows: np.ndarray) -> np.ndarray:
+    """Units per USD of currencies[i] on matrix row rows[i] (NaN without a rate)."""
+    columns = matrix.columns.get_indexer(currencies)
+    if matrix.empty:
+        return np.where(np.array(currencies) == PIVOT_CURRENCY, 1.0, np.nan)
+    return matrix.to_numpy(dtype=float)[rows, columns]
+
+
+def _warn_missing(rates: np.ndarray, currencies: List[str], base: str) -> np.ndarray:
+    missing = np.isnan(rates)
+    if missing.any():
+        unknown = sorted({c for c, m in zip(currencies, missing) if m})
+        logger.warning(f"No FX rate for {', '.join(unknown)} -> {base}; their values are excluded")
+    return rates
+
+
+@instrumentation.timed
+def latest_rates(currencies: List[str], base: str, sync: bool = True) -> pd.Series:
+    """
+    Latest conversion rates to `base` (base units per unit of each currency).
+    Currencies already in `base` are 1 without touching the rate store; currencies
+    without a rate are NaN (see missing_currencies).
+    """
+    currencies, base = _currencies(currencies), base.upper()
+    if all(c == base for c in currencies):
+        return pd.Series(1.0, index=currencies, name='FX Rate')
+    matrix = get_rate_matrix(currencies + [base], sync=sync)
+    last = np.full(len(currencies), len(matrix) - 1)
+    rates = _per_usd(matrix, [base] * len(currencies), last) / _per_usd(matrix, currencies, last)
+    return pd.Series(_warn_missing(rates, currencies, base), index=currencies, name='FX Rate')
+
+
+def missing_currencies(rates: pd.Series) -> List[str]:
+    """Currencies of latest_rates() that have no rate to the base currency."""
+    return sorted(rates.index[rates.isna()])
+
+
+@instrumentation.timed
+def historical_rates(currencies: List[Any], dates: List[Any], base: str, sync: bool = True) -> np.ndarray:
+    """
+    Conversion rates to `base` on given dates, element-wise (the last rate on
+    or before each date; the first known rate for earlier dates; NaN without any).
+    """
+    currencies, base = [str(c).upper() if c else PIVOT_CURRENCY for c in currencies], base.upper()
+    if all(c == base for c in currencies):
+        return np.ones(len(currencies))
+    matrix = get_rate_matrix(currencies + [base], sync=sync)
+    rows = matrix.index.searchsorted(pd.DatetimeIndex(pd.to_datetime(dates)), side='right') - 1
+    rows = np.clip(rows, 0, max(len(matrix) - 1, 0))
+    rates = _per_usd(matrix, [base] * len(currencies), rows) / _per_usd(matrix, currencies, rows)
+    return _warn_missing(rates, currencies, base)
+
+
+def lot_cost_rates(lots: List[Tuple[Any, ...]], base: str, sync: bool = True) -> pd.Series:
+    """
+    Cost-weighted conversion rate of each ticker's open lots at their purchase dates,
+    for valuing cost basis at historical rates.
+
+    Args:
+        lots: database.get_lots() rows (id, ticker, shares, cost_per_share, purchase_date, currency, sector)
+
+    Returns:
+        Series of base units per unit of the lots' currency, indexed by ticker.
+    """
+    df = pd.DataFrame(lots, columns=['ID', 'Ticker', 'Shares', 'Cost', 'Date', 'Currency', 'Sector'])
+    df = df[df['Shares'] > 0]
+    if df.empty:
+        return pd.Series(dtype=float, name='Cost FX Rate')
+    cost = df['Shares'].to_numpy(dtype=float) * df['Cost'].to_numpy(dtype=float)
+    converted = cost * historical_rates(df['Currency'].tolist(), df['Date'].tolist(), base, sync=sync)
+    totals = pd.DataFrame({'Ticker': df['Ticker'].to_numpy(), 'cost': cost, 'converted': converted}).groupby('Ticker').sum()
+    rates = np.divide(totals['converted'].to_numpy(), totals['cost'].to_numpy(),
+                      out=np.full(len(totals), np.nan), where=totals['cost'].to_numpy() > 0)
+    return pd.Series(rates, index=totals.index, name='Cost FX Rate').dropna()
+
+
+@instrumentation.timed
+def convert_price_matrix(matrix: pd.DataFrame, currencies: List[str], base: str, sync: bool = True) -> pd.DataFrame:
+    """
+    Converts a (date x ticker) price matrix to `base` at each day's rate.
+    Columns in a currency without any rate are dropped.
+
+    Args:
+        matrix: Price matrix, e.g. prices.get_price_matrix()
+        currencies: Currency of each column of `matrix`
+    """
+    currencies, base = [str(c).upper() if c else PIVOT_CURRENCY for c in currencies], base.upper()
+    if all(c == base for c in currencies) or matrix.empty:
+        return matrix
+    rates = get_rate_matrix(currencies + [base], sync=sync)
+    rates = rates.reindex(rates.index.union(matrix.index)).ffill().bfill().reindex(matrix.index)
+    per_usd = rates.to_numpy(dtype=float)
+    columns = rates.columns.get_indexer(currencies)
+    factor = per_usd[:, [rates.columns.get_loc(base)]] / per_usd[:, columns]
+    missing = np.isnan(factor).all(axis=0)
+    if missing.any():
+        unknown = sorted({c for c, m in zip(currencies, missing) if m})
+        logger.warning(f"No FX rate for {', '.join(unknown)} -> {base}; their prices are excluded")
+    return (matrix * factor).loc[:, ~missing]
@@ -0,0 +1,305 @@
+import csv
+import json
+import time
+import codecs
+import sqlite3
+import hashlib
+import logging
+import urllib.request
+from dataclasses import dataclass, field
+from typing import List, Tuple, Optional, Callable, BinaryIO
+
+import pandas as pd
+from src import database, utils, instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Data rows parsed and written per transaction
+IMPORT_CHUNK_ROWS = 20000
+
+# Bytes hashed to recognize the same file on resume
+FINGERPRINT_HEAD_BYTES = 65536
+
+# Line errors kept for the summary (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+URL_TIMEOUT = 60
+
+REQUIRED_COLUMNS = ['ticker', 'shares', 'avg_cost']
+
+
+@dataclass
+class ImportProgress:
+    """State of a streaming import, passed to the progress callback after each chunk."""
+    source: str
+    rows_read: int = 0
+    rows_written: int = 0
+    error_count: int = 0
+    bytes_read: int = 0
+    total_bytes: Optional[int] = None
+    resumed_from: int = 0                     # Byte offset the import continued from
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (CSV line number, reason)
+
+    @property
+    def fraction(self) -> Optional[float]:
+        return min(self.bytes_read / self.total_bytes, 1.0) if self.total_bytes else None
+
+
+@dataclass
+class _Job:
+    """Persisted progress of an import (row of `import_jobs`)."""
+    source: str
+    fingerprint: Optional[str]
+    header: List[str]
+    byte_offset: int
+    lines_read: int       # Physical lines before byte_offset, header included
+    rows_read: int
+    rows_written: int
+    error_count: int
+
+
+ProgressCallback = Callable[[ImportProgress], None]
+
+
+class _LineReader:
+    """Iterates the decoded lines of a binary stream, counting the bytes and lines consumed."""
+
+    def __init__(self, stream: BinaryIO, offset: int = 0, line_no: int = 0):
+        self.stream = stream
+        self.offset = offset
+        self.line_no = line_no
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self.stream.readline()
+        if not line:
+            raise StopIteration
+        if self.offset == 0 and line.startswith(codecs.BOM_UTF8):
+            text = line[len(codecs.BOM_UTF8):].decode('utf-8')
+        else:
+            text = line.decode('utf-8')
+        self.offset += len(line)
+        self.line_no += 1
+        return text
+
+
+def _load_job(source: str) -> Optional[Tuple[str, _Job]]:
+    """Returns (status, job) of the latest import from `source`."""
+    try:
+        with database.get_db_connection() as conn:
+            row = conn.execute('''
+                SELECT status, fingerprint, header, byte_offset, lines_read, rows_read, rows_written, error_count
+                FROM import_jobs WHERE source = ?
+            ''', (source,)).fetchone()
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving import job for {source}: {e}")
+        return None
+    if row is None:
+        return None
+    status, fingerprint, header, *counts = row
+    return status, _Job(source, fingerprint, json.loads(header), *counts)
+
+
+def _save_job(job: _Job, status: str) -> None:
+    try:
+        with database.get_db_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO import_jobs
+                    (source, fingerprint, header, byte_offset, lines_read, rows_read, rows_written, error_count,
+                     status, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (job.source, job.fingerprint, json.dumps(job.header), job.byte_offset, job.lines_read,
+                  job.rows_read, job.rows_written, job.error_count, status, time.time()))
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Error saving import job for {job.source}: {e}")
+        raise
+
+
+def _resumable_job(source: str, fingerprint: Optional[str]) -> Optional[_Job]:
+    """The unfinished import from the same source and content, if any."""
+    found = _load_job(source)
+    if found is None or fingerprint is None:
+        return None
+    status, job = found
+    return job if status == 'running' and job.fingerprint == fingerprint else None
+
+
+def _import_lines(lines: _LineReader, job: Optional[_Job], source: str, fingerprint: Optional[str],
+                  progress: ImportProgress, on_progress: Optional[ProgressCallback], chunk_rows: int) -> ImportProgress:
+    """
+    Parses CSV records from `lines` and upserts them chunk by chunk, saving the
+    job after each committed chunk if it can be resumed (has a fingerprint). Starts at the header unless `job` is given,
+    in which case `lines` must be positioned at job.byte_offset and job.lines_read.
+    Errors carry the physical line a record starts on, so blank lines and quoted
+    line breaks don't shift them.
+    """
+    reader = csv.reader(lines)
+    if job is None:
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("빈 파일입니다.")
+        job = _Job(source, fingerprint, header, lines.offset, lines.line_no, 0, 0, 0)
+    else:
+        progress.rows_read, progress.rows_written, progress.error_count = job.rows_read, job.rows_written, job.error_count
+
+    found_map = utils.match_import_columns(job.header)
+    missing = [c for c in REQUIRED_COLUMNS if c not in found_map]
+    if missing:
+        raise ValueError(f"필수 컬럼이 누락되었습니다: {', '.join(missing)} (원래 헤더: {', '.join(utils.GS_HEADERS)})")
+
+    width = len(job.header)
+
+    def flush(batch: List[List[str]], starts: List[int]) -> None:
+        df = pd.DataFrame(batch, columns=job.header)
+        rows, line_numbers, errors = utils.normalize_import_frame(df, found_map, line_numbers=starts)
+        count, db_errors = database.bulk_upsert_holdings(rows)
+        errors += [(line_numbers[i], msg) for i, msg in db_errors]
+
+        # Holdings are upserted by ticker, so replaying a chunk after a crash
+        # between the two commits is harmless
+        job.byte_offset = lines.offset
+        job.lines_read = lines.line_no
+        job.rows_read += len(batch)
+        job.rows_written += count
+        job.error_count += len(errors)
+        if job.fingerprint:
+            _save_job(job, 'running')
+
+        progress.rows_read, progress.rows_written, progress.error_count = job.rows_read, job.rows_written, job.error_count
+        progress.bytes_read = lines.offset
+        progress.errors.extend(errors[:MAX_REPORTED_ERRORS - len(progress.errors)])
+        instrumentation.inc('import_rows_total', len(batch))
+        if on_progress:
+            on_progress(progress)
+
+    batch: List[List[str]] = []
+    starts: List[int] = []
+    start = lines.line_no + 1
+    for record in reader:
+        record_start, start = start, lines.line_no + 1
+        if not record:
+            continue  # Blank line
+        batch.append(record[:width] + [''] * (width - len(record)))
+        starts.append(record_start)
+        if len(batch) >= chunk_rows:
+            flush(batch, starts)
+            batch, starts = [], []
+    if batch:
+        flush(batch, starts)
+
+    progress.bytes_read = lines.offset
+    if job.fingerprint:
+        _save_job(job, 'done')
+    logger.info(f"Imported {job.rows_written} of {job.rows_read} rows from {source}")
+    return progress
+
+
+def _file_fingerprint(fileobj: BinaryIO) -> Tuple[int, str]:
+    """(size, fingerprint) of a seekable binary file; leaves it at the start."""
+    fileobj.seek(0)
+    head = fileobj.read(FINGERPRINT_HEAD_BYTES)
+    size = fileobj.seek(0, 2)
+    fileobj.seek(0)
+    return size, f"{size}:{hashlib.sha1(head).hexdigest()}"
+
+
+@instrumentation.timed
+def import_file(fileobj: BinaryIO, source: Optional[str] = None, on_progress: Optional[ProgressCallback] = None,
+                resume: bool = True, chunk_rows: int = IMPORT_CHUNK_ROWS) -> ImportProgress:
+    """
+    Streams holdings from a binary CSV file (Google Sheet format) into the database
+    in chunks of `chunk_rows`, so memory stays bounded by the chunk size.
+
+    Args:
+        fileobj: Seekable binary file, e.g. open(path, 'rb') or a Streamlit upload
+        source: Name used to find an unfinished import of the same file (default: derived from its content)
+        on_progress: Called with the ImportProgress after each committed chunk
+        resume: Continue an unfinished import of the same source and content,
+            and record progress so this one can be continued
+
+    Raises:
+        ValueError: The file has no header or lacks a required column.
+    """
+    size, fingerprint = _file_fingerprint(fileobj)
+    source = source or f"file:{fingerprint}"
+    if not resume:
+        fingerprint = None
+    job = _resumable_job(source, fingerprint)
+    progress = ImportProgress(source, total_bytes=size)
+    if job is not None:
+        fileobj.seek(job.byte_offset)
+        progress.resumed_from = job.byte_offset
+        logger.info(f"Resuming import of {source} at byte {job.byte_offset}")
+    lines = _LineReader(fileobj, job.byte_offset if job else 0, job.lines_read if job else 0)
+    return _import_lines(lines, job, source, fingerprint, progress, on_progress, chunk_rows)
+
+
+def _http_fingerprint(response) -> Tuple[Optional[int], Optional[str]]:
+    """
+    (total size, fingerprint) of an HTTP response. The fingerprint combines the
+    validator (ETag or Last-Modified) with the size and is None without a validator.
+    """
+    total = None
+    content_range = response.headers.get('Content-Range')
+    if content_range and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+    else:
+        total = response.headers.get('Content-Length')
+    total = int(total) if total and total.isdigit() else None
+    validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+    return total, (f"{validator}:{total}" if validator else None)
+
+
+def _skip(stream: BinaryIO, count: int, block: int = 1 << 20) -> None:
+    """Discards `count` bytes of a stream that can't seek."""
+    while count > 0:
+        data = stream.read(min(block, count))
+        if not data:
+            break
+        count -= len(data)
+
+
+@instrumentation.timed
+def import_url(url: str, on_progress: Optional[ProgressCallback] = None,
+               resume: bool = True, chunk_rows: int = IMPORT_CHUNK_ROWS) -> ImportProgress:
+    """
+    Streams holdings from a CSV URL into the database in chunks, without
+    holding the response in memory.
+
+    An unfinished import of the same URL is resumed if the server reports the
+    same content (ETag or Last-Modified and size): with a Range request when the
+    server supports it, otherwise by skipping the bytes already imported.
+
+    Raises:
+        ValueError: The CSV has no header or lacks a required column.
+        urllib.error.URLError: The request failed.
+    """
+    found = _load_job(url) if resume else None
+    previous = found[1] if found and found[0] == 'running' and found[1].fingerprint else None
+
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    if previous is not None:
+        headers['Range'] = f"bytes={previous.byte_offset}-"
+        headers['If-Range'] = previous.fingerprint.rsplit(':', 1)[0]
+    request = urllib.request.Request(url, headers=headers)
+
+    with urllib.request.urlopen(request, timeout=URL_TIMEOUT) as response:
+        total, fingerprint = _http_fingerprint(response)
+        if not resume:
+            fingerprint = None
+        job = previous if previous is not None and fingerprint == previous.fingerprint else None
+        if job is None and response.status == 206:
+            # Partial content of a changed resource; start over
+            return import_url(url, on_progress, resume=False, chunk_rows=chunk_rows)
+        progress = ImportProgress(url, total_bytes=total)
+        if job is not None:
+            if response.status != 206:
+                _skip(response, job.byte_offset)
+            progress.resumed_from = job.byte_offset
+            logger.info(f"Resuming import of {url} at byte {job.byte_offset} (HTTP {response.status})")
+        lines = _LineReader(response, job.byte_offset if job else 0, job.lines_read if job else 0)
+        return _import_lines(lines, job, url, fingerprint, progress, on_progress, chunk_rows)
@@ -0,0 +1,187 @@
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Tuple, Any, Callable, Optional
+from src import singleflight
+
+# Latency histogram buckets in seconds (upper bounds, +Inf implied)
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metric name prefix of the Prometheus dump
+PREFIX = 'etf_tracker_'
+
+HELP = {
+    'function_seconds': 'Wall time of instrumented functions.',
+    'fetch_ticker_seconds': 'Provider fetch latency per ticker, retries included.',
+    'page_render_seconds': 'Wall time of a Streamlit page render.',
+    'cache_lookups_total': 'Market cache lookups per field group and result (hit/stale/miss).',
+    'errors_total': 'Exceptions raised by instrumented functions.',
+    'import_rows_total': 'CSV rows read by streaming holdings imports.',
+    'dividend_schedules_total': 'Dividend schedule lookups per result (hit/detected).',
+    'window_seconds': 'Seconds since the metrics were last reset.',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Bucketed latency distribution (cumulative counts are derived on export)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+started_at = time.time()
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    """Adds `value` to a counter, e.g. inc('cache_lookups_total', group='quote', result='hit')."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def observe(name: str, seconds: float, **labels: Any) -> None:
+    """Records a duration in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        if key not in _histograms:
+            _histograms[key] = Histogram()
+        _histograms[key].observe(seconds)
+
+
+@contextmanager
+def timer(name: str, **labels: Any):
+    """Context manager recording the wall time of its block in histogram `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(fn: Optional[Callable] = None, *, name: Optional[str] = None):
+    """
+    Decorator recording calls of a function in the 'function_seconds' histogram
+    (label function="module.name") and exceptions in 'errors_total'.
+
+    Usage:
+        @instrumentation.timed
+        def get_holdings(): ...
+    """
+    def decorate(func: Callable) -> Callable:
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                inc('errors_total', function=label)
+                raise
+            finally:
+                observe('function_seconds', time.perf_counter() - start, function=label)
+        return wrapper
+
+    return decorate(fn) if fn is not None else decorate
+
+
+def counters(name: Optional[str] = None) -> List[Tuple[str, Dict[str, str], float]]:
+    """Counter samples as (name, labels, value), optionally for one metric."""
+    with _lock:
+        return [(n, dict(l), v) for (n, l), v in sorted(_counters.items()) if name in (None, n)]
+
+
+def histograms(name: Optional[str] = None) -> List[Tuple[str, Dict[str, str], Histogram]]:
+    """Histogram samples as (name, labels, histogram copy), optionally for one metric."""
+    with _lock:
+        result = []
+        for (n, l), h in sorted(_histograms.items()):
+            if name in (None, n):
+                copy = Histogram(h.buckets)
+                copy.counts, copy.count, copy.sum, copy.max = list(h.counts), h.count, h.sum, h.max
+                result.append((n, dict(l), copy))
+        return result
+
+
+def reset() -> None:
+    """Clears all counters and histograms."""
+    global started_at
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        started_at = time.time()
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+def to_prometheus() -> str:
+    """Renders all metrics, plus single-flight counters, in the Prometheus text format."""
+    lines: List[str] = []
+    described = set()
+
+    def describe(name: str, kind: str) -> None:
+        if name not in described:
+            described.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {PREFIX}{name} {HELP[name]}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    for name, labels, value in counters():
+        describe(name, 'counter')
+        lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value:g}")
+
+    for name, labels, h in histograms():
+        describe(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(list(h.buckets) + ['+Inf'], h.counts):
+            cumulative += count
+            le = bound if isinstance(bound, str) else f"{bound:g}"
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {h.sum:.6f}")
+        lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {h.count}")
+
+    for stat in ('calls', 'executed', 'deduplicated'):
+        describe(f"singleflight_{stat}_total", 'counter')
+        for group, values in sorted(singleflight.stats().items()):
+            lines.append(f"{PREFIX}singleflight_{stat}_total{_format_labels({'group': group})} {values[stat]}")
+
+    describe('window_seconds', 'gauge')
+    lines.append(f"{PREFIX}window_seconds {time.time() - started_at:.0f}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,226 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Tuple, Any, Optional
+
+import numpy as np
+import pandas as pd
+from src import instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+# Column layout of database.get_transactions()
+TRANSACTION_COLUMNS = ['ID', 'Ticker', 'Type', 'Date', 'Shares', 'Price', 'Fee', 'Currency']
+
+
+@dataclass
+class PerformanceResult:
+    """Daily portfolio time series and summary statistics over one price matrix."""
+    value: pd.Series            # Market value per day
+    flows: pd.Series            # External cash flows per day (money in > 0, dividends/sales < 0)
+    returns: pd.Series          # Daily time-weighted returns
+    twr: float                  # Cumulative time-weighted return over the period
+    mwr: Optional[float]        # Annualized money-weighted return (XIRR), None if undefined
+    volatility: pd.Series       # Rolling annualized volatility of daily returns
+    drawdown: pd.Series         # Drawdown of the time-weighted wealth index
+    max_drawdown: float
+    contributions: pd.DataFrame  # Per-holding P&L and return contribution
+
+
+def transactions_frame(transactions: List[Tuple[Any, ...]]) -> pd.DataFrame:
+    """Converts database.get_transactions() rows to a DataFrame with parsed dates."""
+    df = pd.DataFrame(transactions, columns=TRANSACTION_COLUMNS)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def holdings_transactions(holdings: List[Tuple[Any, ...]], date: Any) -> pd.DataFrame:
+    """
+    Treats current holdings [(id, ticker, shares, avg_cost, ...)] as one BUY each on `date`,
+    for portfolios without a transaction history.
+    """
+    return pd.DataFrame({
+        'ID': [h[0] for h in holdings],
+        'Ticker': [h[1] for h in holdings],
+        'Type': 'BUY',
+        'Date': pd.Timestamp(date),
+        'Shares': [float(h[2]) for h in holdings],
+        'Price': [float(h[3]) for h in holdings],
+        'Fee': 0.0,
+        'Currency': [h[5] if len(h) > 5 else 'USD' for h in holdings],
+    }, columns=TRANSACTION_COLUMNS)
+
+
+def _trading_day_codes(dates: pd.Series, calendar: pd.DatetimeIndex) -> np.ndarray:
+    """Position of each date on the price calendar (non-trading days roll forward; -1 if after the end)."""
+    codes = calendar.searchsorted(pd.DatetimeIndex(dates).normalize())
+    return np.where(codes < len(calendar), codes, -1)
+
+
+def position_matrix(transactions: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shares held at the end of each day of the price matrix, from BUY/SELL transactions.
+
+    Args:
+        transactions: DataFrame with TRANSACTION_COLUMNS
+        prices: (date x ticker) price matrix, e.g. prices.get_price_matrix()
+    """
+    trades = transactions[transactions['Type'].isin(['BUY', 'SELL'])]
+    codes = _trading_day_codes(trades['Date'], prices.index)
+    columns = prices.columns.get_indexer(trades['Ticker'].str.upper())
+    valid = (codes >= 0) & (columns >= 0)
+    if not valid.all():
+        logger.warning(f"Ignoring {int((~valid).sum())} transactions outside the price matrix")
+
+    signed = np.where(trades['Type'] == 'BUY', 1.0, -1.0) * trades['Shares'].to_numpy(dtype=float)
+    deltas = np.zeros(prices.shape)
+    np.add.at(deltas, (codes[valid], columns[valid]), signed[valid])
+    return pd.DataFrame(np.cumsum(deltas, axis=0), index=prices.index, columns=prices.columns)
+
+
+def external_flows(transactions: pd.DataFrame, calendar: pd.DatetimeIndex) -> pd.Series:
+    """
+    Net money put into the portfolio per day: buys (plus fees) are inflows, sale
+    proceeds (minus fees) and dividends received are outflows.
+    DIVIDEND rows carry the amount per share in Price (or the total if Shares is 0).
+    """
+    shares = transactions['Shares'].to_numpy(dtype=float)
+    price = transactions['Price'].to_numpy(dtype=float)
+    fee = transactions['Fee'].to_numpy(dtype=float)
+    kind = transactions['Type'].to_numpy()
+    amount = np.select(
+        [kind == 'BUY', kind == 'SELL', kind == 'DIVIDEND'],
+        [shares * price + fee, -(shares * price - fee), -np.where(shares > 0, shares * price, price)],
+        0.0
+    )
+    codes = _trading_day_codes(transactions['Date'], calendar)
+    flows = np.bincount(codes[codes >= 0], weights=amount[codes >= 0], minlength=len(calendar))
+    return pd.Series(flows, index=calendar, name='Flow')
+
+
+def daily_returns(value: pd.Series, flows: pd.Series) -> pd.Series:
+    """
+    Daily time-weighted returns, treating flows as occurring at the end of the day:
+    r_t = (V_t - F_t) / V_{t-1} - 1. Days without a previous value return 0.
+    """
+    v = value.to_numpy(dtype=float)
+    prev = np.concatenate([[0.0], v[:-1]])
+    r = np.divide(v - flows.to_numpy(dtype=float), prev, out=np.ones_like(v), where=prev > 0) - 1.0
+    return pd.Series(r, index=value.index, name='Return')
+
+
+def rolling_volatility(returns: pd.Series, window: int = 21) -> pd.Series:
+    """Annualized rolling standard deviation of daily returns."""
+    return (returns.rolling(window).std() * np.sqrt(TRADING_DAYS)).rename('Volatility')
+
+
+def drawdown(returns: pd.Series) -> pd.Series:
+    """Drawdown of the wealth index built from daily returns (0 at new highs)."""
+    wealth = np.cumprod(1.0 + returns.to_numpy(dtype=float))
+    peak = np.maximum.accumulate(wealth)
+    return pd.Series(wealth / peak - 1.0, index=returns.index, name='Drawdown')
+
+
+def xirr(flows: pd.Series, final_value: float, final_date: Optional[pd.Timestamp] = None,
+         max_iter: int = 100, tol: float = 1e-10) -> Optional[float]:
+    """
+    Annualized money-weighted return from the investor's point of view: inflows to the
+    portfolio are negative cash flows and the final value (on `final_date`, default:
+    the last flow) is a positive one.
+    Solved by bisection on the NPV, which is monotonic for this sign pattern.
+
+    Returns:
+        The rate, or None if it is undefined (no investment or no sign change).
+    """
+    flows = flows[flows != 0]
+    if flows.empty:
+        return None
+    final_date = flows.index[-1] if final_date is None else final_date
+    cash = np.concatenate([-flows.to_numpy(dtype=float), [final_value]])
+    days = np.concatenate([(flows.index - flows.index[0]).days.to_numpy(), [(final_date - flows.index[0]).days]])
+    if len(cash) < 2 or (cash > 0).all() or (cash < 0).all():
+        return None
+    years = days / 365.0
+
+    def npv(rate: float) -> float:
+        return float(np.sum(cash / np.power(1.0 + rate, years)))
+
+    low, high = -0.99, 10.0
+    # Short periods annualize to large rates; widen the bracket until the sign changes
+    while npv(low) * npv(high) > 0 and high < 1e6:
+        high *= 10
+    if npv(low) * npv(high) > 0:
+        return None
+    for _ in range(max_iter):
+        mid = (low + high) / 2
+        if npv(low) * npv(mid) <= 0:
+            high = mid
+        else:
+            low = mid
+        if high - low < tol:
+            break
+    return (low + high) / 2
+
+
+def contributions(shares: pd.DataFrame, prices: pd.DataFrame, value: pd.Series) -> pd.DataFrame:
+    """
+    Per-holding P&L from price changes on shares held since the previous day, and
+    its contribution to the return (daily P&L over the previous portfolio value, summed).
+    """
+    p = prices.to_numpy(dtype=float)
+    held = np.vstack([np.zeros((1, p.shape[1])), shares.to_numpy(dtype=float)[:-1]])
+    change = np.nan_to_num(np.diff(p, axis=0, prepend=np.nan))
+    pnl = held * change
+    prev_value = np.concatenate([[0.0], value.to_numpy(dtype=float)[:-1]])
+    weights = np.divide(1.0, prev_value, out=np.zeros_like(prev_value), where=prev_value > 0)
+    end_value = np.nan_to_num(shares.to_numpy()[-1] * p[-1]) if len(p) else np.zeros(p.shape[1])
+    total = end_value.sum()
+    return pd.DataFrame({
+        'Ticker': shares.columns,
+        'P&L': pnl.sum(axis=0),
+        'Contribution (%)': (pnl * weights[:, None]).sum(axis=0) * 100,
+        'End Value': end_value,
+        'End Weight (%)': end_value / total * 100 if total > 0 else 0.0,
+    }).sort_values('Contribution (%)', ascending=False, ignore_index=True)
+
+
+@instrumentation.timed
+def analyze(transactions: pd.DataFrame, prices: pd.DataFrame, volatility_window: int = 21) -> PerformanceResult:
+    """
+    Computes portfolio performance over a price matrix with array operations only.
+    Positions opened before the first date count as invested at its close; the
+    flows of earlier transactions are replaced by that value.
+
+    Args:
+        transactions: DataFrame with TRANSACTION_COLUMNS (see transactions_frame / holdings_transactions)
+        prices: (date x ticker) price matrix; gaps are forward-filled
+        volatility_window: Trading days of the rolling volatility window
+
+    Returns:
+        PerformanceResult
+    """
+    prices = prices.sort_index().ffill()
+    shares = position_matrix(transactions, prices)
+    value = pd.Series(np.nansum(shares.to_numpy() * prices.to_numpy(), axis=1), index=prices.index, name='Value')
+    start = prices.index[0] if len(prices) else pd.Timestamp.max
+    before = pd.DatetimeIndex(transactions['Date']).normalize() < start
+    flows = external_flows(transactions[~before], prices.index)
+    if len(flows):
+        opening = position_matrix(transactions[before], prices.iloc[:1]).to_numpy()[0]
+        flows.iloc[0] += float(np.nansum(opening * prices.to_numpy()[0]))
+    returns = daily_returns(value, flows)
+    dd = drawdown(returns)
+
+    return PerformanceResult(
+        value=value,
+        flows=flows,
+        returns=returns,
+        twr=float(np.prod(1.0 + returns.to_numpy()) - 1.0) if len(returns) else 0.0,
+        mwr=xirr(flows, float(value.iloc[-1]), value.index[-1]) if len(value) else None,
+        volatility=rolling_volatility(returns, volatility_window),
+        drawdown=dd,
+        max_drawdown=float(dd.min()) if len(dd) else 0.0,
+        contributions=contributions(shares, prices, value),
+    )
@@ -0,0 +1,299 @@
+import time
+import sqlite3
+import asyncio
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Any, Optional, Union
+
+import numpy as np
+import pandas as pd
+from src import database, providers, cache, singleflight, instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Stored fields (columns of `price_blocks`) and the provider columns they come from
+FIELDS: Dict[str, str] = {
+    'open': 'Open',
+    'high': 'High',
+    'low': 'Low',
+    'close': 'Close',
+    'adj_close': 'Adj Close',
+    'volume': 'Volume',
+}
+
+# Re-sync a ticker's daily bars when its last sync is older than this (seconds)
+PRICE_SYNC_TTL = 21600
+
+# Number of price matrices kept in memory (see get_price_matrix)
+MATRIX_CACHE_SIZE = 8
+
+# Packed array formats of a block: days since the epoch and field values
+DAY_DTYPE = np.dtype('<i4')
+VALUE_DTYPE = np.dtype('<f8')
+
+DateLike = Union[str, datetime.date, pd.Timestamp, None]
+
+_flight = singleflight.group('prices')
+_matrix_lock = threading.Lock()
+_matrices: 'OrderedDict[Tuple[Any, ...], Tuple[int, pd.DataFrame]]' = OrderedDict()
+
+
+def _to_days(index: pd.DatetimeIndex) -> np.ndarray:
+    return index.values.astype('datetime64[D]').astype(np.int64).astype(DAY_DTYPE)
+
+
+def _day_to_iso(day: int) -> str:
+    return str(np.datetime64(int(day), 'D'))
+
+
+def _to_iso(value: DateLike) -> Optional[str]:
+    return None if value is None else pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def _year_bounds(start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+    return (int(start[:4]) if start else 0), (int(end[:4]) if end else 9999)
+
+
+def get_sync_states(tickers: List[str]) -> Dict[str, Tuple[Optional[str], float]]:
+    """Returns {ticker: (last_date, synced_at)} for the given tickers whose prices were synced before."""
+    if not tickers:
+        return {}
+    placeholders = ','.join('?' * len(tickers))
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'SELECT ticker, last_date, synced_at FROM price_sync WHERE ticker IN ({placeholders})',
+                [t.upper() for t in tickers]
+            )
+            return {t: (d, s) for t, d, s in cursor.fetchall()}
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving price sync states: {e}")
+        return {}
+
+
+def get_version() -> int:
+    """Returns a counter that changes whenever price history is written."""
+    try:
+        with database.get_db_connection() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'prices_version'").fetchone()
+            return row[0] if row else 0
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving prices version: {e}")
+        return 0
+
+
+@instrumentation.timed
+def save_bars(ticker: str, bars: pd.DataFrame, synced_at: float, replace: bool = False) -> None:
+    """
+    Merges daily bars into the ticker's yearly blocks and advances its high-water mark
+    in one transaction. Bars for dates already stored overwrite them, so re-fetching
+    the last (possibly partial) day is safe; only the touched years are rewritten.
+
+    Args:
+        ticker: Ticker symbol
+        bars: Provider price frame (providers.PRICE_COLUMNS indexed by Date)
+        synced_at: Unix timestamp of the sync
+        replace: Drop previously stored bars first (full resync)
+    """
+    ticker = ticker.upper()
+    days = _to_days(bars.index)
+    values = {f: bars[c].to_numpy(dtype=VALUE_DTYPE) for f, c in FIELDS.items()}
+    years = bars.index.year.to_numpy()
+    columns = ', '.join(FIELDS)
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            if replace:
+                cursor.execute('DELETE FROM price_blocks WHERE ticker = ?', (ticker,))
+            for year in np.unique(years):
+                in_year = years == year
+                new_days = days[in_year]
+                new_values = {f: v[in_year] for f, v in values.items()}
+                cursor.execute(f'SELECT days, {columns} FROM price_blocks WHERE ticker = ? AND year = ?',
+                               (ticker, int(year)))
+                row = cursor.fetchone()
+                if row is not None:
+                    # Stored bars first, so np.unique's last occurrence (the new bar) wins
+                    merged_days = np.concatenate([np.frombuffer(row[0], DAY_DTYPE), new_days])
+                    order = len(merged_days) - 1 - np.unique(merged_days[::-1], return_index=True)[1]
+                    new_days = merged_days[order]
+                    new_values = {
+                        f: np.concatenate([np.frombuffer(blob, VALUE_DTYPE), new_values[f]])[order]
+                        for f, blob in zip(FIELDS, row[1:])
+                    }
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO price_blocks (ticker, year, days, {columns})
+                    VALUES (?, ?, ?, {', '.join('?' * len(FIELDS))})
+                ''', (ticker, int(year), new_days.tobytes(), *(new_values[f].tobytes() for f in FIELDS)))
+
+            cursor.execute('SELECT days FROM price_blocks WHERE ticker = ? ORDER BY year DESC LIMIT 1', (ticker,))
+            row = cursor.fetchone()
+            last_date = _day_to_iso(np.frombuffer(row[0], DAY_DTYPE)[-1]) if row else None
+            cursor.execute('INSERT OR REPLACE INTO price_sync (ticker, last_date, synced_at) VALUES (?, ?, ?)',
+                           (ticker, last_date, synced_at))
+            if len(bars) or replace:
+                cursor.execute('''
+                    INSERT INTO meta (key, value) VALUES ('prices_version', 1)
+                    ON CONFLICT(key) DO UPDATE SET value = value + 1
+                ''')
+            conn.commit()
+            logger.info(f"Stored {len(bars)} daily bars for {ticker}")
+    except sqlite3.Error as e:
+        logger.error(f"Error saving price history for {ticker}: {e}")
+        raise
+
+
+def _read_blocks(tickers: List[str], fields: List[str], start: Optional[str],
+                 end: Optional[str]) -> List[Tuple[Any, ...]]:
+    first_year, last_year = _year_bounds(start, end)
+    placeholders = ','.join('?' * len(tickers))
+    try:
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT ticker, days, {', '.join(fields)} FROM price_blocks "
+                f"WHERE ticker IN ({placeholders}) AND year BETWEEN ? AND ? ORDER BY ticker, year",
+                [t.upper() for t in tickers] + [first_year, last_year]
+            )
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error reading price history: {e}")
+        return []
+
+
+def read_bars(ticker: str, start: DateLike = None, end: DateLike = None) -> pd.DataFrame:
+    """
+    Reads a ticker's stored daily bars without syncing.
+
+    Returns:
+        DataFrame with providers.PRICE_COLUMNS indexed by Date (ascending).
+    """
+    start, end = _to_iso(start), _to_iso(end)
+    blocks = _read_blocks([ticker], list(FIELDS), start, end)
+    if not blocks:
+        return pd.DataFrame(columns=list(FIELDS.values()), index=pd.DatetimeIndex([], name='Date'), dtype=float)
+    days = np.concatenate([np.frombuffer(b[1], DAY_DTYPE) for b in blocks])
+    data = {c: np.concatenate([np.frombuffer(b[2 + i], VALUE_DTYPE) for b in blocks])
+            for i, c in enumerate(FIELDS.values())}
+    frame = pd.DataFrame(data, index=pd.DatetimeIndex(days.astype('datetime64[D]'), name='Date'))
+    return frame.loc[start:end] if start or end else frame
+
+
+async def _fetch_histories(tickers: List[str], starts: Dict[str, datetime.date]) -> List[Any]:
+    provider = providers.get_provider()
+    return await asyncio.gather(*(provider.get_history(t, starts.get(t)) for t in tickers), return_exceptions=True)
+
+
+def _sync(tickers: List[str], full: bool) -> Dict[str, int]:
+    states = {} if full else get_sync_states(tickers)
+    # Restart at the last stored day (inclusive): its bar may have been fetched mid-session
+    starts = {t: datetime.date.fromisoformat(d) for t, (d, _) in states.items() if d}
+    results = providers.run(_fetch_histories(tickers, starts))
+
+    counts = {}
+    synced_at = time.time()
+    for t, result in zip(tickers, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error fetching price history for {t}: {result}")
+            counts[t] = -1
+            continue
+        save_bars(t, result, synced_at, replace=full)
+        counts[t] = len(result)
+    return counts
+
+
+@instrumentation.timed
+def sync_price_histories(tickers: List[str], full: bool = False) -> Dict[str, int]:
+    """
+    Appends new daily bars for tickers to the local price store, fetching them
+    concurrently. Only bars from the stored high-water mark on are requested
+    unless `full` is set, which replaces the stored history.
+
+    Returns:
+        {ticker: number of bars fetched, or -1 if the fetch failed}
+    """
+    unique_tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    results = _flight.do_many(
+        [(t, full) for t in unique_tickers],
+        lambda keys: {(t, full): n for t, n in _sync([t for t, _ in keys], full).items()}
+    )
+    return {t: n for (t, _), n in results.items()}
+
+
+def _read_matrix(tickers: List[str], field: str, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+    """Reads one field as a (date x ticker) float matrix; days a ticker didn't trade are NaN."""
+    blocks = _read_blocks(tickers, [field], start, end)
+    columns = pd.Index(tickers, name='Ticker')
+    if not blocks:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'), columns=columns, dtype=float)
+
+    days = [np.frombuffer(b[1], DAY_DTYPE) for b in blocks]
+    values = np.concatenate([np.frombuffer(b[2], VALUE_DTYPE) for b in blocks])
+    positions = np.repeat(columns.get_indexer([b[0] for b in blocks]), [len(d) for d in days])
+    days = np.concatenate(days)
+
+    keep = np.ones(len(days), dtype=bool)
+    if start:
+        keep &= days >= np.datetime64(start, 'D').astype(np.int64)
+    if end:
+        keep &= days <= np.datetime64(end, 'D').astype(np.int64)
+    dates, rows = np.unique(days[keep], return_inverse=True)
+
+    matrix = np.full((len(dates), len(tickers)), np.nan)
+    matrix[rows, positions[keep]] = values[keep]
+    return pd.DataFrame(matrix, index=pd.DatetimeIndex(dates.astype('datetime64[D]'), name='Date'), columns=columns)
+
+
+@instrumentation.timed
+def get_price_matrix(tickers: List[str], start: DateLike = None, end: DateLike = None,
+                     field: str = 'close', sync: bool = True) -> pd.DataFrame:
+    """
+    Returns daily prices of several tickers as a wide matrix for vectorized analytics.
+
+    Never-synced tickers are synced first; histories older than PRICE_SYNC_TTL are
+    refreshed in the background. Matrices are kept in memory until the price store
+    changes, so callers must treat the result as read-only.
+
+    Args:
+        tickers: Ticker symbols (column order of the result)
+        start: First date (inclusive), default: entire history
+        end: Last date (inclusive)
+        field: One of FIELDS ('close', 'adj_close', 'volume', ...)
+        sync: Fetch missing or stale histories from the provider
+
+    Returns:
+        DataFrame indexed by Date (ascending) with one float column per ticker;
+        NaN where a ticker has no bar for the date.
+    """
+    if field not in FIELDS:
+        raise ValueError(f"Unknown price field: {field}")
+    unique_tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    if sync and unique_tickers:
+        states = get_sync_states(unique_tickers)
+        missing = [t for t in unique_tickers if t not in states]
+        if missing:
+            sync_price_histories(missing)
+        now = time.time()
+        stale = sorted(t for t, (_, synced_at) in states.items() if now - synced_at > PRICE_SYNC_TTL)
+        if stale:
+            cache.refresh_in_background(f"prices:{','.join(stale)}", lambda: sync_price_histories(stale))
+
+    key = (tuple(unique_tickers), field, _to_iso(start), _to_iso(end))
+    version = get_version()
+    with _matrix_lock:
+        cached = _matrices.get(key)
+        if cached is not None and cached[0] == version:
+            _matrices.move_to_end(key)
+            return cached[1]
+
+    matrix = _read_matrix(unique_tickers, field, key[2], key[3])
+    with _matrix_lock:
+        _matrices[key] = (version, matrix)
+        _matrices.move_to_end(key)
+        while len(_matrices) > MATRIX_CACHE_SIZE:
+            _matrices.popitem(last=False)
+    return matrix
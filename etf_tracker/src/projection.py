@@ -0,0 +1,255 @@
+import datetime
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+from src import instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+PROJECTION_COLUMNS = ['Ticker', 'Ex Date', 'Pay Date', 'Month', 'Amount Per Share', 'Shares', 'Total Amount',
+                      'Special', 'Projected']
+
+# Payments per year -> frequency name
+FREQUENCIES = {12: 'monthly', 4: 'quarterly', 2: 'semiannual', 1: 'annual'}
+
+# History before the latest event that is used to detect a schedule
+LOOKBACK_DAYS = 3 * 365
+
+# A payment this many times the median amount is a special dividend
+SPECIAL_AMOUNT_FACTOR = 2.5
+
+# A payment less than this fraction of a period after the previous one is an extra (special) payment
+EXTRA_GAP_FRACTION = 0.5
+
+# A ticker whose last regular payment is this many periods old is treated as no longer paying
+STOPPED_PERIODS = 2
+
+# Dividend histories carry ex-dates; payment follows a few business days later
+PAY_LAG_BUSINESS_DAYS = 3
+
+
+@dataclass
+class Schedule:
+    """Dividend schedule of a ticker detected from its history (see detect_schedule)."""
+    payments_per_year: int = 0            # 0: no history
+    last_ex_date: Optional[str] = None    # Latest regular ex-date, 'YYYY-MM-DD'
+    day_of_month: int = 1                 # Typical ex-date day (31: month end)
+    amount: float = 0.0                   # Expected regular amount per share
+    # (ex-date, amount, special) of the lookback window, oldest first
+    events: List[Tuple[str, float, bool]] = field(default_factory=list)
+
+    @property
+    def frequency(self) -> str:
+        return FREQUENCIES.get(self.payments_per_year, 'none')
+
+    @property
+    def period_months(self) -> int:
+        return 12 // self.payments_per_year if self.payments_per_year else 0
+
+
+def _ex_dates(months: np.ndarray, day: Any) -> np.ndarray:
+    """`day` (scalar or per month) of each month clamped to its length, moved off weekends within the month."""
+    months = np.asarray(months, dtype='datetime64[M]')
+    first = months.astype('datetime64[D]')
+    length = ((months + 1).astype('datetime64[D]') - first).astype(int)
+    dates = first + (np.minimum(day, length) - 1)
+    weekday = (dates.astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    saturday, sunday = weekday == 5, weekday == 6
+    # Saturday -> Friday, Sunday -> Monday, unless that leaves the month
+    nearer = dates + np.select([saturday, sunday], [-1, 1], 0)
+    other = dates + np.select([saturday, sunday], [2, -2], 0)
+    return np.where(nearer.astype('datetime64[M]') == months, nearer, other)
+
+
+def pay_dates(ex_dates: np.ndarray) -> np.ndarray:
+    """Expected payment dates of ex-dates (providers don't report pay dates)."""
+    # Weekend ex-dates count from the Friday before, like pd.offsets.BDay
+    return np.busday_offset(np.asarray(ex_dates, dtype='datetime64[D]'), PAY_LAG_BUSINESS_DAYS, roll='backward')
+
+
+def _nearest_frequency(gap_days: float) -> int:
+    return min(FREQUENCIES, key=lambda n: abs(365.25 / n - gap_days))
+
+
+@instrumentation.timed
+def detect_schedule(dates: pd.Series, amounts: pd.Series) -> Schedule:
+    """
+    Detects a ticker's payment frequency, cadence and regular amount from its history.
+
+    Payments far above the median amount, or paid well before the next one was
+    due, are flagged as special and left out of the regular schedule. Only the
+    history counts, not the current date, so a schedule stays valid until new
+    events arrive.
+
+    Args:
+        dates: Ex-dates of the ticker's dividend events
+        amounts: Amount per share of each event
+
+    Returns:
+        Schedule (payments_per_year 0 if there are no events).
+    """
+    df = pd.DataFrame({'Date': pd.to_datetime(dates).to_numpy(), 'Amount': np.asarray(amounts, dtype=float)})
+    df = df[df['Amount'] > 0].sort_values('Date').reset_index(drop=True)
+    if df.empty:
+        return Schedule()
+    df = df[df['Date'] > df['Date'].iloc[-1] - pd.Timedelta(days=LOOKBACK_DAYS)].reset_index(drop=True)
+
+    median = df['Amount'].median()
+    special = (df['Amount'] > SPECIAL_AMOUNT_FACTOR * median).to_numpy(copy=True)
+
+    regular = df[~special]
+    gaps = regular['Date'].diff().dt.days.dropna()
+    per_year = _nearest_frequency(gaps.median()) if len(gaps) else 1
+
+    # Extra payments between two regular ones: of each pair that is too close,
+    # the one whose amount is further from the median is the special one
+    min_gap = pd.Timedelta(days=EXTRA_GAP_FRACTION * 365.25 / per_year)
+    kept: Optional[int] = None
+    for i in regular.index:
+        if kept is not None and df.at[i, 'Date'] - df.at[kept, 'Date'] < min_gap:
+            if abs(df.at[i, 'Amount'] - median) >= abs(df.at[kept, 'Amount'] - median):
+                special[i] = True
+                continue
+            special[kept] = True
+        kept = i
+
+    regular = df[~special]
+    if regular.empty:
+        # Only special payments; nothing regular to project
+        return Schedule(events=[(d.strftime('%Y-%m-%d'), float(a), True) for d, a in zip(df['Date'], df['Amount'])])
+
+    # The trailing year of regular payments sets the amount and the typical day
+    recent = regular.tail(per_year)
+    days = recent['Date'].dt.day
+    month_end = (recent['Date'] + pd.offsets.BDay(1)).dt.month != recent['Date'].dt.month
+    day_of_month = 31 if month_end.all() else int(days.median())
+
+    return Schedule(
+        payments_per_year=per_year,
+        last_ex_date=regular['Date'].iloc[-1].strftime('%Y-%m-%d'),
+        day_of_month=day_of_month,
+        amount=round(float(recent['Amount'].mean()), 6),
+        events=[(d.strftime('%Y-%m-%d'), float(a), bool(s)) for d, a, s in zip(df['Date'], df['Amount'], special)]
+    )
+
+
+EVENT_COLUMNS = ['Ticker', 'Ex Date', 'Pay Date', 'Amount Per Share', 'Special', 'Projected']
+
+
+def _recurring_specials(specials: pd.DataFrame) -> pd.DataFrame:
+    """
+    Month, day and latest amount of each ticker's special dividends paid in the
+    same month in at least two years.
+
+    Args:
+        specials: DataFrame with 'Ticker', 'Ex Date' (datetime64) and 'Amount Per Share', oldest first
+    """
+    dates = specials['Ex Date'].dt
+    df = specials.assign(Month=dates.month, Year=dates.year, Day=dates.day)
+    groups = df.groupby(['Ticker', 'Month'], sort=False)
+    last = df[groups['Year'].transform('nunique') >= 2].groupby(['Ticker', 'Month'], sort=False).last()
+    return last.reset_index()[['Ticker', 'Month', 'Day', 'Amount Per Share']]
+
+
+@instrumentation.timed
+def schedule_events(schedules: Dict[str, Schedule], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """
+    Payments of several schedules whose pay date falls in [start, end]: the
+    recorded events, then the projected ones after each ticker's latest record.
+
+    Projected dates are generated for all schedules at once with array
+    arithmetic on months. A recurring special projected on a regular ex-date
+    replaces that regular payment.
+
+    Returns:
+        DataFrame with EVENT_COLUMNS, one row per ticker and ex-date, sorted by ticker and ex-date.
+    """
+    recorded = pd.DataFrame([(t, d, a, sp) for t, schedule in schedules.items() for d, a, sp in schedule.events],
+                            columns=['Ticker', 'Ex Date', 'Amount Per Share', 'Special'])
+    if recorded.empty:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    recorded['Ex Date'] = pd.to_datetime(recorded['Ex Date'])
+    frames = [recorded.assign(Projected=False)]
+
+    # Schedules still paying: a regular payment within STOPPED_PERIODS periods before the start
+    cutoffs = {p: start - pd.DateOffset(months=STOPPED_PERIODS * p) for p in {s.period_months for s in schedules.values()}}
+    active = pd.DataFrame([
+        (t, s.last_ex_date, s.period_months, s.day_of_month, s.amount)
+        for t, s in schedules.items()
+        if s.last_ex_date and pd.Timestamp(s.last_ex_date) >= cutoffs[s.period_months]
+    ], columns=['Ticker', 'Last', 'Period', 'Day', 'Amount'])
+
+    if not active.empty:
+        # Every period after the last regular payment up to the end month, one row per payment
+        period = active['Period'].to_numpy()
+        first = pd.to_datetime(active['Last']).to_numpy().astype('datetime64[M]').astype(int) + period
+        count = np.maximum((end.to_datetime64().astype('datetime64[M]').astype(int) - first) // period + 1, 0)
+        row = np.repeat(np.arange(len(active)), count)
+        step = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        months = (first[row] + step * period[row]).astype('datetime64[M]')
+        frames.append(pd.DataFrame({
+            'Ticker': active['Ticker'].to_numpy()[row],
+            'Ex Date': _ex_dates(months, active['Day'].to_numpy()[row]),
+            'Amount Per Share': active['Amount'].to_numpy()[row],
+            'Special': False,
+            'Projected': True,
+        }))
+
+        # Recurring specials of the active schedules in each year of the span
+        specials = recorded[recorded['Special'] & recorded['Ticker'].isin(active['Ticker'])]
+        specials = _recurring_specials(specials).merge(
+            pd.DataFrame({'Year': np.arange(start.year, end.year + 1)}), how='cross')
+        if not specials.empty:
+            months = (specials['Year'].to_numpy() - 1970) * 12 + specials['Month'].to_numpy() - 1
+            frames.append(pd.DataFrame({
+                'Ticker': specials['Ticker'].to_numpy(),
+                'Ex Date': _ex_dates(months.astype('datetime64[M]'), specials['Day'].to_numpy()),
+                'Amount Per Share': specials['Amount Per Share'].to_numpy(dtype=float),
+                'Special': True,
+                'Projected': True,
+            }))
+
+    df = pd.concat(frames, ignore_index=True)
+    df['Ex Date'] = df['Ex Date'].astype('datetime64[ns]')
+    df['Pay Date'] = pd.to_datetime(pay_dates(df['Ex Date'].to_numpy())).astype('datetime64[ns]')
+    latest = df['Ticker'].map({t: pd.Timestamp(s.events[-1][0]) for t, s in schedules.items() if s.events})
+    keep = df['Pay Date'].between(start, end) & (~df['Projected'] | (df['Ex Date'] > latest))
+    # Later frames win on the same ex-date, so a special replaces the regular payment it coincides with
+    df = df[keep].drop_duplicates(['Ticker', 'Ex Date'], keep='last')
+    return df.sort_values(['Ticker', 'Ex Date'], kind='stable').reset_index(drop=True)[EVENT_COLUMNS]
+
+
+@instrumentation.timed
+def project_dividends(holdings: pd.DataFrame, schedules: Dict[str, Schedule],
+                      today: Optional[datetime.datetime] = None, months: int = 12) -> pd.DataFrame:
+    """
+    Lays out the dividend payments of the holdings over calendar months.
+
+    Covers `months` calendar months starting with the current one, by pay date;
+    payments already recorded in that span are included as they were paid.
+
+    Args:
+        holdings: DataFrame with 'Ticker' and 'Shares' (one row per holding or lot)
+        schedules: Schedule of each ticker (see detect_schedule)
+        today: Projection start (default: now)
+        months: Number of calendar months
+
+    Returns:
+        DataFrame with PROJECTION_COLUMNS, one row per holding and payment.
+    """
+    today = pd.Timestamp(today or datetime.datetime.now())
+    start = today.normalize().replace(day=1)
+    end = start + pd.DateOffset(months=months) - pd.Timedelta(days=1)
+
+    proj = schedule_events(schedules, start, end)
+    if holdings.empty or proj.empty:
+        return pd.DataFrame(columns=PROJECTION_COLUMNS)
+
+    proj['Month'] = proj['Pay Date'].dt.strftime('%Y-%m')
+    df = holdings[['Ticker', 'Shares']].merge(proj, on='Ticker', how='inner')
+    df['Total Amount'] = df['Amount Per Share'] * df['Shares']
+    return df[PROJECTION_COLUMNS]
@@ -0,0 +1,457 @@
+import os
+import json
+import atexit
+import asyncio
+import logging
+import datetime
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Any, Optional
+
+import pandas as pd
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 16
+
+# Blocking upstream calls in flight across the process, whatever the event loop or thread
+UPSTREAM_CONCURRENCY = 16
+_upstream_slots = threading.BoundedSemaphore(UPSTREAM_CONCURRENCY)
+
+# Field groups a market data row is assembled from (cached separately, see src/cache.py)
+MARKET_GROUPS = ('quote', 'fundamentals')
+
+# Lookback of a non-full dividend download without a start date
+INITIAL_DIVIDEND_PERIOD = '5y'
+
+# Columns of a daily price history frame
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+class ProviderError(Exception):
+    """Raised when a provider has no data for a request."""
+
+
+class MarketDataProvider(ABC):
+    """
+    Async source of quotes, fundamentals and dividends.
+
+    Subclasses implement the `_quote`, `_fundamentals` and `_dividends` hooks.
+    `max_concurrency` is the number of tickers callers should keep in flight
+    (see fetch_engine); blocking upstream calls are bounded process-wide.
+
+    Normalized results:
+        quote:        {'price': float}
+        fundamentals: {'yield': float (decimal), 'sector': str, 'name': str}
+        dividends:    Series of amounts indexed by naive dates (index name 'Date')
+        history:      Daily PRICE_COLUMNS frame indexed by naive dates (index name 'Date')
+    """
+    name = 'base'
+
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+
+    async def get_quote(self, symbol: str) -> Dict[str, Any]:
+        return await self._quote(symbol)
+
+    async def get_fundamentals(self, symbol: str) -> Dict[str, Any]:
+        return await self._fundamentals(symbol)
+
+    async def get_dividends(self, symbol: str, start: Optional[datetime.date] = None, full: bool = False) -> pd.Series:
+        """
+        Args:
+            symbol: Ticker symbol
+            start: Only events on or after this date (incremental sync)
+            full: Entire history instead of the INITIAL_DIVIDEND_PERIOD window
+        """
+        return await self._dividends(symbol, start, full)
+
+    async def get_history(self, symbol: str, start: Optional[datetime.date] = None) -> pd.DataFrame:
+        """
+        Daily OHLCV bars from `start` (inclusive), or the entire history.
+        """
+        return await self._history(symbol, start)
+
+    async def get_market_row(self, symbol: str, groups: Tuple[str, ...] = MARKET_GROUPS) -> Dict[str, Any]:
+        """
+        Requested field groups of a symbol as one get_market_data row
+        (partial if not all of MARKET_GROUPS are requested).
+        """
+        return _market_row(symbol, await self.get_market_groups(symbol, groups))
+
+    async def get_market_groups(self, symbol: str, groups: Tuple[str, ...] = MARKET_GROUPS) -> Dict[str, Dict[str, Any]]:
+        """
+        Normalized results of the requested field groups, e.g. {'quote': {...}}.
+        Providers that can serve several groups from one upstream request override this.
+        """
+        calls = {'quote': self.get_quote, 'fundamentals': self.get_fundamentals}
+        results = await asyncio.gather(*(calls[g](symbol) for g in groups))
+        return dict(zip(groups, results))
+
+
+    @abstractmethod
+    async def _quote(self, symbol: str) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def _fundamentals(self, symbol: str) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def _dividends(self, symbol: str, start: Optional[datetime.date], full: bool) -> pd.Series: ...
+
+    async def _history(self, symbol: str, start: Optional[datetime.date]) -> pd.DataFrame:
+        raise ProviderError(f"{self.name} has no price history")
+
+
+def _market_row(symbol: str, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Builds a get_market_data row from normalized group results ({'quote': ..., 'fundamentals': ...})."""
+    row: Dict[str, Any] = {'Ticker': symbol}
+    for group, result in results.items():
+        if group == 'quote':
+            row['Current Price'] = float(result['price'])
+        else:
+            row.update({
+                'Yield': float(result['yield']),
+                'Sector': str(result['sector']),
+                'Name': str(result['name'])
+            })
+    return row
+
+
+def _to_dividend_series(hist: Optional[pd.Series]) -> pd.Series:
+    """Standardizes a dividend series: positive amounts, naive dates, ascending."""
+    if hist is None or hist.empty:
+        return pd.Series([], index=pd.DatetimeIndex([], name='Date'), name='Dividends', dtype=float)
+    hist = hist[hist > 0].astype(float)
+    index = pd.to_datetime(hist.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return pd.Series(hist.to_numpy(), index=pd.DatetimeIndex(index, name='Date'), name='Dividends').sort_index()
+
+
+def _to_price_frame(hist: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Standardizes a daily price frame: PRICE_COLUMNS, naive dates, ascending, no empty closes."""
+    if hist is None or hist.empty:
+        return pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype=float)
+    hist = hist.reindex(columns=PRICE_COLUMNS).astype(float)
+    hist = hist[hist['Close'].notna()]
+    index = pd.to_datetime(hist.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    hist.index = pd.DatetimeIndex(index.normalize(), name='Date')
+    return hist[~hist.index.duplicated(keep='last')].sort_index()
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Default provider backed by yfinance. Blocking calls run on a private thread
+    pool and each holds one of the process-wide upstream slots, so concurrent
+    run() calls (each on its own event loop) can't exceed UPSTREAM_CONCURRENCY.
+    """
+    name = 'yfinance'
+
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY):
+        super().__init__(max_concurrency)
+        # A private pool: asyncio.run() would otherwise wait on hung calls at shutdown
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='yfinance')
+
+    @staticmethod
+    def _limited(fn, *args):
+        with _upstream_slots:
+            return fn(*args)
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._limited, fn, *args)
+
+    @staticmethod
+    def _quote_from(ticker: Any, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Price from an already fetched `info` if it has one, else from fast_info."""
+        info = info or {}
+        price = info.get('regularMarketPrice') or info.get('currentPrice') or info.get('previousClose')
+        if not price:
+            fast_info = ticker.fast_info
+            price = getattr(fast_info, 'last_price', None) or getattr(fast_info, 'previous_close', None)
+        if not price:
+            raise ProviderError(f"No price for {ticker.ticker}")
+        return {'price': float(price)}
+
+    @staticmethod
+    def _fundamentals_from(info: Dict[str, Any], symbol: str) -> Dict[str, Any]:
+        # Yield Handling
+        # yfinance 'dividendYield' is usually Percentage (e.g. 3.74 for 3.74%)
+        # 'trailingAnnualDividendYield' is usually Decimal (e.g. 0.0374)
+        div_yield = info.get('dividendYield')
+        if div_yield is not None:
+            # Normalize to decimal for consistency
+            div_yield = div_yield / 100.0
+        else:
+            div_yield = info.get('trailingAnnualDividendYield') or 0
+        return {
+            'yield': float(div_yield),
+            'sector': info.get('sector', 'Unknown'),
+            'name': info.get('shortName', symbol)
+        }
+
+    @classmethod
+    def _load_quote(cls, symbol: str) -> Dict[str, Any]:
+        import yfinance as yf
+        return cls._quote_from(yf.Ticker(symbol))
+
+    @classmethod
+    def _load_fundamentals(cls, symbol: str) -> Dict[str, Any]:
+        import yfinance as yf
+        return cls._fundamentals_from(yf.Ticker(symbol).info, symbol)
+
+    @classmethod
+    def _load_row(cls, symbol: str, groups: Tuple[str, ...]) -> Dict[str, Dict[str, Any]]:
+        """
+        Requested groups from one Ticker object. `info` already carries the price,
+        so a full row is a single upstream request (fast_info is only a fallback).
+        """
+        import yfinance as yf
+        ticker = yf.Ticker(symbol)
+        if 'fundamentals' not in groups:
+            return {'quote': cls._quote_from(ticker)}
+        info = ticker.info
+        loaders = {'quote': lambda: cls._quote_from(ticker, info), 'fundamentals': lambda: cls._fundamentals_from(info, symbol)}
+        return {g: loaders[g]() for g in groups}
+
+    @staticmethod
+    def _load_dividends(symbol: str, start: Optional[datetime.date], full: bool) -> pd.Series:
+        import yfinance as yf
+        t = yf.Ticker(symbol)
+        if start is not None:
+            hist = t.history(start=start, auto_adjust=False, actions=True)
+        else:
+            hist = t.history(period='max' if full else INITIAL_DIVIDEND_PERIOD, auto_adjust=False, actions=True)
+        return _to_dividend_series(hist.get('Dividends'))
+
+    @staticmethod
+    def _load_history(symbol: str, start: Optional[datetime.date]) -> pd.DataFrame:
+        import yfinance as yf
+        t = yf.Ticker(symbol)
+        if start is not None:
+            hist = t.history(start=start, auto_adjust=False, actions=False)
+        else:
+            hist = t.history(period='max', auto_adjust=False, actions=False)
+        return _to_price_frame(hist)
+
+    async def _quote(self, symbol: str) -> Dict[str, Any]:
+        return await self._call(self._load_quote, symbol)
+
+    async def _fundamentals(self, symbol: str) -> Dict[str, Any]:
+        return await self._call(self._load_fundamentals, symbol)
+
+    async def get_market_groups(self, symbol: str, groups: Tuple[str, ...] = MARKET_GROUPS) -> Dict[str, Dict[str, Any]]:
+        # One Ticker object and (usually) one upstream request for all groups
+        return await self._call(self._load_row, symbol, groups)
+
+    async def _dividends(self, symbol: str, start: Optional[datetime.date], full: bool) -> pd.Series:
+        return await self._call(self._load_dividends, symbol, start, full)
+
+    async def _history(self, symbol: str, start: Optional[datetime.date]) -> pd.DataFrame:
+        return await self._call(self._load_history, symbol, start)
+
+
+class FallbackProvider(MarketDataProvider):
+    """Tries each provider in order and returns the first successful result."""
+
+    def __init__(self, providers: List[MarketDataProvider]):
+        # Paced like the primary provider; the others only serve its failures
+        super().__init__(max_concurrency=providers[0].max_concurrency if providers else DEFAULT_CONCURRENCY)
+        self.providers = providers
+        self.name = 'fallback(' + ','.join(p.name for p in providers) + ')'
+
+    async def _first(self, method: str, *args):
+        last_error: Optional[Exception] = None
+        for provider in self.providers:
+            try:
+                return await getattr(provider, method)(*args)
+            except Exception as e:
+                logger.warning(f"{provider.name}.{method}{args[:1]} failed, trying next provider: {e}")
+                last_error = e
+        raise ProviderError(f"All providers failed for {method}{args[:1]}") from last_error
+
+    async def get_market_groups(self, symbol: str, groups: Tuple[str, ...] = MARKET_GROUPS) -> Dict[str, Dict[str, Any]]:
+        return await self._first('get_market_groups', symbol, groups)
+
+    async def _quote(self, symbol: str) -> Dict[str, Any]:
+        return await self._first('get_quote', symbol)
+
+    async def _fundamentals(self, symbol: str) -> Dict[str, Any]:
+        return await self._first('get_fundamentals', symbol)
+
+    async def _dividends(self, symbol: str, start: Optional[datetime.date], full: bool) -> pd.Series:
+        return await self._first('get_dividends', symbol, start, full)
+
+    async def _history(self, symbol: str, start: Optional[datetime.date]) -> pd.DataFrame:
+        return await self._first('get_history', symbol, start)
+
+
+class RecordReplayProvider(MarketDataProvider):
+    """
+    File-backed provider for offline runs.
+
+    In 'record' mode every result of the wrapped provider is kept and written to a
+    JSON file by flush() (called by close() and at interpreter exit); in 'replay'
+    mode results are served from that file only (missing data raises
+    ProviderError), so benchmarks and CI need no network.
+    """
+
+    def __init__(self, path: str, inner: Optional[MarketDataProvider] = None, mode: str = 'replay'):
+        super().__init__(max_concurrency=inner.max_concurrency if inner else 64)
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown mode: {mode}")
+        if mode == 'record' and inner is None:
+            raise ValueError("Record mode needs an inner provider")
+        self.path, self.inner, self.mode = path, inner, mode
+        self.name = f"{mode}({os.path.basename(path)})"
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = {'quote': {}, 'fundamentals': {}, 'dividends': {}, 'history': {}}
+        self._dirty = False
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._data.update(json.load(f))
+        if mode == 'record':
+            atexit.register(self.flush)
+
+    def flush(self) -> None:
+        """Writes the recorded results to the file if anything was recorded since the last flush."""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def close(self) -> None:
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _record(self, kind: str, symbol: str, value: Any) -> None:
+        with self._lock:
+            self._data[kind][symbol] = value
+            self._dirty = True
+
+    def _lookup(self, kind: str, symbol: str) -> Any:
+        try:
+            return self._data[kind][symbol]
+        except KeyError:
+            raise ProviderError(f"No recorded {kind} for {symbol}") from None
+
+    async def get_market_groups(self, symbol: str, groups: Tuple[str, ...] = MARKET_GROUPS) -> Dict[str, Dict[str, Any]]:
+        if self.mode == 'replay':
+            return await super().get_market_groups(symbol, groups)
+        # Let the inner provider combine the groups into one request
+        results = await self.inner.get_market_groups(symbol, groups)
+        for group, result in results.items():
+            self._record(group, symbol, result)
+        return results
+
+    async def _quote(self, symbol: str) -> Dict[str, Any]:
+        if self.mode == 'replay':
+            return self._lookup('quote', symbol)
+        quote = await self.inner.get_quote(symbol)
+        self._record('quote', symbol, quote)
+        return quote
+
+    async def _fundamentals(self, symbol: str) -> Dict[str, Any]:
+        if self.mode == 'replay':
+            return self._lookup('fundamentals', symbol)
+        fundamentals = await self.inner.get_fundamentals(symbol)
+        self._record('fundamentals', symbol, fundamentals)
+        return fundamentals
+
+    async def _dividends(self, symbol: str, start: Optional[datetime.date], full: bool) -> pd.Series:
+        if self.mode == 'replay':
+            recorded = self._lookup('dividends', symbol)
+            series = pd.Series(recorded['Dividends'], index=pd.DatetimeIndex(pd.to_datetime(recorded['Date']), name='Date'),
+                               name='Dividends', dtype=float)
+        else:
+            # Always record the full history so any later start date can be replayed
+            series = await self.inner.get_dividends(symbol, None, True)
+            self._record('dividends', symbol, {
+                'Date': series.index.strftime('%Y-%m-%d').tolist(),
+                'Dividends': series.tolist()
+            })
+        if start is not None:
+            series = series[series.index >= pd.Timestamp(start)]
+        return series
+
+    async def _history(self, symbol: str, start: Optional[datetime.date]) -> pd.DataFrame:
+        if self.mode == 'replay':
+            recorded = self._lookup('history', symbol)
+            frame = pd.DataFrame({c: recorded[c] for c in PRICE_COLUMNS},
+                                 index=pd.DatetimeIndex(pd.to_datetime(recorded['Date']), name='Date'), dtype=float)
+        else:
+            # Always record the full history so any later start date can be replayed
+            frame = await self.inner.get_history(symbol, None)
+            self._record('history', symbol, {
+                'Date': frame.index.strftime('%Y-%m-%d').tolist(),
+                **{c: frame[c].tolist() for c in PRICE_COLUMNS}
+            })
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        return frame
+
+
+# Names accepted in ETF_PROVIDERS
+PROVIDER_NAMES = ('yfinance', 'replay')
+
+_provider: Optional[MarketDataProvider] = None
+_provider_lock = threading.Lock()
+
+
+def _named_provider(name: str) -> MarketDataProvider:
+    """Builds one entry of ETF_PROVIDERS."""
+    if name == 'yfinance':
+        record_file = os.environ.get('ETF_RECORD_FILE')
+        if record_file:
+            return RecordReplayProvider(record_file, YFinanceProvider(), mode='record')
+        return YFinanceProvider()
+    if name == 'replay':
+        replay_file = os.environ.get('ETF_REPLAY_FILE')
+        if not replay_file:
+            raise ValueError("ETF_PROVIDERS includes 'replay' but ETF_REPLAY_FILE is not set")
+        return RecordReplayProvider(replay_file, mode='replay')
+    raise ValueError(f"Unknown provider {name!r} in ETF_PROVIDERS (expected one of {', '.join(PROVIDER_NAMES)})")
+
+
+def _default_provider() -> MarketDataProvider:
+    """
+    Builds the provider from the environment:
+        ETF_PROVIDERS: comma-separated providers tried in order (FallbackProvider),
+            e.g. 'yfinance,replay' serves recorded data when yfinance fails.
+            Default: 'replay' if ETF_REPLAY_FILE is set, else 'yfinance'
+        ETF_REPLAY_FILE: recorded data served by 'replay' (offline)
+        ETF_RECORD_FILE: record every yfinance result to this file
+    """
+    default = 'replay' if os.environ.get('ETF_REPLAY_FILE') else 'yfinance'
+    names = [n.strip().lower() for n in os.environ.get('ETF_PROVIDERS', default).split(',') if n.strip()]
+    chain = [_named_provider(name) for name in dict.fromkeys(names or [default])]
+    return chain[0] if len(chain) == 1 else FallbackProvider(chain)
+
+
+def get_provider() -> MarketDataProvider:
+    """Returns the process-wide provider, creating the default one on first use."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = _default_provider()
+            logger.info(f"Using market data provider: {_provider.name}")
+        return _provider
+
+
+def set_provider(provider: Optional[MarketDataProvider]) -> None:
+    """Replaces the process-wide provider (None restores the default on next use)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def run(coro):
+    """Runs a provider coroutine to completion from synchronous code."""
+    return asyncio.run(coro)
@@ -0,0 +1,106 @@
+import os
+import time
+import logging
+import datetime
+import threading
+from zoneinfo import ZoneInfo
+from typing import List, Tuple, Optional
+from src import cache, database, fetcher
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Refresh intervals in seconds. The market-hours interval should stay below the
+# quote TTL (cache.FIELD_GROUPS['quote']) so page renders never see expired quotes.
+MARKET_HOURS_INTERVAL = int(os.environ.get('ETF_REFRESH_MARKET_SECONDS', '300'))
+OFF_HOURS_INTERVAL = int(os.environ.get('ETF_REFRESH_OFF_SECONDS', '3600'))
+ENABLED = os.environ.get('ETF_REFRESH_ENABLED', '1') != '0'
+
+# Regular trading sessions (timezone, open, close), Monday to Friday
+MARKET_SESSIONS: List[Tuple[str, datetime.time, datetime.time]] = [
+    ('America/New_York', datetime.time(9, 30), datetime.time(16, 0)),
+    ('Asia/Seoul', datetime.time(9, 0), datetime.time(15, 30)),
+]
+
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+last_refresh: Optional[float] = None
+
+
+def is_market_open(now: Optional[datetime.datetime] = None) -> bool:
+    """True if any of MARKET_SESSIONS is trading at `now` (timezone-aware, default: now)."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    for tz, open_time, close_time in MARKET_SESSIONS:
+        local = now.astimezone(ZoneInfo(tz))
+        if local.weekday() < 5 and open_time <= local.time() < close_time:
+            return True
+    return False
+
+
+def current_interval() -> int:
+    """Seconds until the next refresh, depending on market hours."""
+    return MARKET_HOURS_INTERVAL if is_market_open() else OFF_HOURS_INTERVAL
+
+
+def due_tickers(interval: int) -> List[str]:
+    """Held tickers whose quote is missing or would expire before the next refresh."""
+    tickers = database.get_all_tickers()
+    cached = cache.read('quote', tickers)
+    horizon = time.time() + interval - cache.FIELD_GROUPS['quote']['ttl']
+    return [t for t in tickers if t not in cached or cached[t][1] <= horizon]
+
+
+def refresh_once(interval: Optional[int] = None) -> int:
+    """
+    Refreshes quotes for held tickers into the persistent cache, skipping those
+    still fresh enough to outlast the next interval.
+
+    Returns:
+        Number of tickers refreshed successfully.
+    """
+    global last_refresh
+    tickers = due_tickers(current_interval() if interval is None else interval)
+    if not tickers:
+        return 0
+    start = time.monotonic()
+    rows = fetcher.refresh_market_data(tickers, groups=('quote',))
+    last_refresh = time.time()
+    logger.info(f"Refreshed {len(rows)}/{len(tickers)} quotes in {time.monotonic() - start:.1f}s")
+    return len(rows)
+
+
+def _run() -> None:
+    while not _stop.is_set():
+        interval = current_interval()
+        try:
+            refresh_once(interval)
+        except Exception as e:
+            logger.error(f"Quote refresh failed: {e}")
+        _stop.wait(interval)
+
+
+def start() -> bool:
+    """
+    Starts the background refresher once per process (no-op if already running
+    or disabled with ETF_REFRESH_ENABLED=0).
+
+    Returns:
+        True if a new refresher thread was started.
+    """
+    global _thread
+    if not ENABLED:
+        return False
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return False
+        _stop.clear()
+        _thread = threading.Thread(target=_run, name='quote-refresher', daemon=True)
+        _thread.start()
+        logger.info(f"Quote refresher started (market {MARKET_HOURS_INTERVAL}s, off-hours {OFF_HOURS_INTERVAL}s)")
+        return True
+
+
+def stop() -> None:
+    """Signals the refresher thread to exit after its current refresh."""
+    _stop.set()
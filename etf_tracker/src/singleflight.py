@@ -0,0 +1,115 @@
+import logging
+import threading
+from typing import List, Dict, Any, Callable, Hashable, Optional
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A fetch in flight; followers wait on `done` and share its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class Group:
+    """
+    Process-wide request coalescing (single-flight).
+
+    While a fetch for a key is running, identical requests from other threads
+    (Streamlit sessions, background refreshes) wait for it and receive its result
+    instead of calling the provider again. Nothing is cached after the fetch
+    completes; that is left to the persistent cache.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0          # Keys requested
+        self.executed = 0       # Keys actually fetched
+        self.deduplicated = 0   # Keys served by another caller's fetch
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Runs fn() unless a call for `key` is in flight, in which case its result is shared."""
+        return self.do_many([key], lambda keys: {key: fn()})[key]
+
+    def do_many(self, keys: List[Hashable], fn: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """
+        Batch variant of `do`: keys already in flight are awaited, the remaining
+        ones are fetched together with fn(keys), which returns results by key
+        (keys without a result map to None).
+
+        Raises:
+            The exception of the fetch a key depended on.
+        """
+        keys = list(dict.fromkeys(keys))
+        owned: Dict[Hashable, _Call] = {}
+        waiting: Dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    owned[key] = self._calls[key] = _Call()
+                else:
+                    waiting[key] = call
+            self.calls += len(keys)
+            self.executed += len(owned)
+            self.deduplicated += len(waiting)
+
+        if waiting:
+            logger.debug(f"{self.name}: waiting on in-flight fetch for {list(waiting)}")
+
+        results: Dict[Hashable, Any] = {}
+        if owned:
+            try:
+                fetched = fn(list(owned)) or {}
+                for key, call in owned.items():
+                    call.result = results[key] = fetched.get(key)
+            except BaseException as e:
+                for call in owned.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key, call in owned.items():
+                        del self._calls[key]
+                        call.done.set()
+
+        for key, call in waiting.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.result
+        return {key: results[key] for key in keys}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executed': self.executed,
+                'deduplicated': self.deduplicated,
+                'in_flight': len(self._calls)
+            }
+
+
+_groups: Dict[str, Group] = {}
+_groups_lock = threading.Lock()
+
+
+def group(name: str) -> Group:
+    """Returns the process-wide group registered under `name`."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = Group(name)
+        return _groups[name]
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Counters of all groups, e.g. {'market': {'calls': 10, 'deduplicated': 4, ...}}."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
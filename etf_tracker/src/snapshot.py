@@ -0,0 +1,109 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Any, Optional
+
+import pandas as pd
+from src import database, fetcher, analytics, cache, fx, singleflight, instrumentation
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Rebuild at least this often so stale quotes get revalidated (see cache.FIELD_GROUPS)
+MAX_AGE = cache.FIELD_GROUPS['quote']['ttl']
+
+
+@dataclass
+class PortfolioSnapshot:
+    """Holdings, market data and metrics computed together for one data version."""
+    version: Tuple[int, float]
+    holdings: List[Tuple[Any, ...]]
+    market_data: pd.DataFrame
+    metrics: pd.DataFrame
+    as_of: Optional[float] = None  # Fetch time of the oldest quote used
+    base_currency: str = 'USD'     # Currency of the metrics' values
+    missing_rates: List[str] = field(default_factory=list)  # Held currencies without an FX rate
+    built_at: float = field(default_factory=time.time)
+
+    @property
+    def tickers(self) -> List[str]:
+        return [h[1] for h in self.holdings]
+
+
+_lock = threading.Lock()
+# Shared snapshots by requested base currency (None: the portfolio's)
+_current: Dict[Optional[str], PortfolioSnapshot] = {}
+# Concurrent rebuilds of the same snapshot run once
+_builds = singleflight.group('snapshot')
+
+
+def get_version() -> Tuple[int, float]:
+    """Returns (holdings version, quotes version); changes when holdings or quotes change."""
+    return database.get_holdings_version(), cache.get_quotes_version()
+
+
+@instrumentation.timed
+def build(version: Tuple[int, float], base_currency: Optional[str] = None) -> PortfolioSnapshot:
+    """
+    Loads holdings and market data and computes metrics.
+
+    Holdings and their cost basis rates come from one source: the portfolio's
+    lots when it has any (their purchase dates give historical cost rates),
+    otherwise the `holdings` table, whose costs are converted at the latest rates.
+    
+    Args:
+        version: Data version the snapshot is built for (see get_version)
+        base_currency: Currency of the metrics' values (default: the portfolio's)
+    """
+    lots = database.get_lots(database.DEFAULT_PORTFOLIO_ID)
+    holdings = database.get_holdings(database.DEFAULT_PORTFOLIO_ID) if lots else database.get_holdings()
+    market_data = fetcher.get_market_data([h[1] for h in holdings]) if holdings else pd.DataFrame()
+
+    # FX rates are loaded once per build for all currencies held
+    base_currency = (base_currency or fx.get_base_currency()).upper()
+    rates = fx.latest_rates([h[5] for h in holdings], base_currency) if holdings else None
+    cost_rates = fx.lot_cost_rates(lots, base_currency) if lots else None
+
+    metrics = analytics.calculate_portfolio_metrics(holdings, market_data, rates, cost_rates)
+    as_of = cache.get_quotes_as_of([h[1] for h in holdings])
+    logger.info(f"Built portfolio snapshot for version {version} ({len(holdings)} holdings, {base_currency})")
+    missing = fx.missing_currencies(rates) if rates is not None else []
+    return PortfolioSnapshot(version, holdings, market_data, metrics, as_of, base_currency, missing)
+
+
+def get_snapshot(base_currency: Optional[str] = None) -> PortfolioSnapshot:
+    """
+    Returns the shared portfolio snapshot, rebuilding it only when the data version
+    changed or it is older than MAX_AGE. Shared by all sessions and views;
+    callers must treat its frames as read-only.
+
+    The rebuild runs outside the lock, once per base currency and version:
+    concurrent callers wait for it, and other snapshots stay readable meanwhile.
+
+    Args:
+        base_currency: Display currency of the metrics (default: the portfolio's)
+    """
+    key = base_currency.upper() if base_currency else None
+    version = get_version()
+    with _lock:
+        current = _current.get(key)
+    if current is not None and current.version == version and time.time() - current.built_at <= MAX_AGE:
+        return current
+
+    def rebuild() -> PortfolioSnapshot:
+        snap = build(version, key)
+        with _lock:
+            # A slower build of an older version must not replace a newer snapshot
+            previous = _current.get(key)
+            if previous is None or previous.version <= snap.version:
+                _current[key] = snap
+        return snap
+
+    return _builds.do((key, version), rebuild)
+
+
+def invalidate() -> None:
+    """Drops the shared snapshots so the next access rebuilds them."""
+    with _lock:
+        _current.clear()
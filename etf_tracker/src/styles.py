@@ -204,7 +204,9 @@ def render_calendar_card(month_name, total_amount_str, items):
     for item in items:
         # Use &dollar; to avoid LaTeX issues
         safe_item_amt = item["amount"].replace("$", "&dollar;")
-        items_html += f'<div class="cal-item"><span class="cal-item-ticker">{item["ticker"]}</span><span class="cal-item-amount">{safe_item_amt}</span></div>'
+        # Optional note, e.g. the pay date and a special-dividend flag
+        note = f' <span style="color:#888; font-size:11px;">{item["note"]}</span>' if item.get("note") else ""
+        items_html += f'<div class="cal-item"><span class="cal-item-ticker">{item["ticker"]}{note}</span><span class="cal-item-amount">{safe_item_amt}</span></div>'
     
     if not items_html:
         items_html = '<div class="cal-item" style="border:none; background:transparent; justify-content:center;"><span style="color:#444; font-size:12px;">배당 데이터 없음</span></div>'
@@ -213,6 +215,8 @@ def render_calendar_card(month_name, total_amount_str, items):
     html = f'<div class="calendar-card"><div class="cal-header"><div class="cal-month">{month_name}</div><div class="cal-amount">{safe_total}</div></div><div class="cal-list">{items_html}</div></div>'
     st.markdown(html, unsafe_allow_html=True)
 
-def render_validation_card(annual_total, calendar_total):
-    """Renders the dividend verification card."""
-    st.markdown(f'<div class="validation-card"><div class="v-left"><div class="v-icon">🖩</div><div><div class="v-title">배당금 정합성 검증</div><div class="v-desc">연간 배당 총액(&dollar;{annual_total:,.2f}) vs 캘린더 합계(&dollar;{calendar_total:,.2f})</div></div></div><div class="v-badge">✓ 검증 완료</div></div>', unsafe_allow_html=True)
+def render_validation_card(annual_total, calendar_total, currency="$"):
+    """Renders the dividend verification card (`currency`: prefix of both amounts)."""
+    # Use &dollar; to avoid LaTeX issues
+    sym = currency.replace("$", "&dollar;")
+    st.markdown(f'<div class="validation-card"><div class="v-left"><div class="v-icon">🖩</div><div><div class="v-title">배당금 정합성 검증</div><div class="v-desc">연간 배당 총액({sym}{annual_total:,.2f}) vs 캘린더 합계({sym}{calendar_total:,.2f})</div></div></div><div class="v-badge">✓ 검증 완료</div></div>', unsafe_allow_html=True)
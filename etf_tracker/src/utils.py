@@ -1,130 +1,284 @@
 import pandas as pd
 import io
+import os
 import datetime
 import logging
-import urllib.request
-from typing import List, Tuple, Any
-from src import database, fetcher, analytics
+from typing import List, Tuple, Any, Optional, Iterator, TextIO, BinaryIO, Callable
+from src import database, snapshot, fetcher, analytics, fx, instrumentation
 
 logger = logging.getLogger(__name__)
 
 # Target Headers from Google Sheet
 GS_HEADERS = ['Ticker', 'Name', 'Shares', 'AvgPrice', 'Yield', 'Months', 'Category', 'CurrentPrice']
 
-def export_to_csv() -> str:
+# Holdings per page when streaming an export
+EXPORT_CHUNK_SIZE = 5000
+
+def _export_frame(df_metrics: pd.DataFrame) -> pd.DataFrame:
+    """Maps portfolio metrics to the Google Sheet columns (GS_HEADERS)."""
+    if df_metrics.empty:
+        return pd.DataFrame(columns=GS_HEADERS)
+    # Metrics are already enriched with market data (Name, Yield, CurrentPrice)
+    return pd.DataFrame({
+        'Ticker': df_metrics['Ticker'],
+        'Name': df_metrics.get('Name', df_metrics['Ticker']),
+        'Shares': df_metrics['Shares'],
+        'AvgPrice': df_metrics['Avg Cost'],
+        'Yield': (df_metrics.get('Yield', 0.0) * 100).map('{:.2f}%'.format), # Display as %
+        'Months': "", # Placeholder for payment months if we had them easily
+        'Category': df_metrics.get('Sector', 'Unknown'),
+        'CurrentPrice': df_metrics.get('Current Price', df_metrics['Avg Cost'])
+    }, columns=GS_HEADERS)
+
+@instrumentation.timed
+def build_export_frame(snap: Optional[snapshot.PortfolioSnapshot] = None) -> pd.DataFrame:
+    """
+    Maps portfolio metrics to the Google Sheet columns (GS_HEADERS).
+    
+    Args:
+        snap: Portfolio snapshot to export (default: the shared snapshot)
+    """
+    snap = snap or snapshot.get_snapshot()
+    if not snap.holdings:
+        return pd.DataFrame(columns=GS_HEADERS)
+    return _export_frame(snap.metrics)
+
+def iter_export_csv(snap: Optional[snapshot.PortfolioSnapshot] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yields the export CSV in chunks of `chunk_size` rows (header first).
+
+    Without a snapshot, the `holdings` table (what a CSV import writes) is read a
+    page at a time, and market data and metrics are loaded per page, so memory is
+    bounded by the page size. A given snapshot is already in memory and is only
+    formatted in chunks.
+    """
+    yield ",".join(GS_HEADERS) + "\n"
+    if snap is not None:
+        df_export = build_export_frame(snap)
+        for start in range(0, len(df_export), chunk_size):
+            yield df_export.iloc[start:start + chunk_size].to_csv(index=False, header=False)
+        return
+
+    offset = 0
+    while True:
+        page, _ = database.get_holdings_page(sort_by='ticker', offset=offset, limit=chunk_size)
+        if not page:
+            break
+        market_data = fetcher.get_market_data([h[1] for h in page])
+        yield _export_frame(analytics.calculate_portfolio_metrics(page, market_data)).to_csv(index=False, header=False)
+        offset += len(page)
+        if len(page) < chunk_size:
+            break
+
+def write_export_csv(fileobj: TextIO, snap: Optional[snapshot.PortfolioSnapshot] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> None:
+    """Streams the export CSV to a text file object without building the whole string."""
+    for chunk in iter_export_csv(snap, chunk_size):
+        fileobj.write(chunk)
+
+@instrumentation.timed
+def export_dataset(dataset: str, fmt: str) -> bytes:
+    """
+    Serializes a dataset (holdings, metrics, dividends, projections) as a
+    Parquet or Arrow IPC file with its versioned schema.
+    """
+    from src import columnar
+    df, metadata = columnar.load_dataset(dataset)
+    return columnar.to_bytes(dataset, df, fmt, metadata)
+
+def export_to_csv(snap: Optional[snapshot.PortfolioSnapshot] = None) -> str:
     """
     Exports current holdings to a CSV string matching the Google Sheet format.
     Format: Ticker, Name, Shares, AvgPrice, Yield, Months, Category, CurrentPrice
-    """
-    holdings = database.get_holdings()
-    if not holdings:
-        return ",".join(GS_HEADERS) + "\n"
-    
-    # Fetch latest market data for enrichment (Name, Yield, CurrentPrice)
-    tickers = [h[1] for h in holdings]
-    market_data = fetcher.get_market_data(tickers)
     
-    # Calculate metrics to get clean data
-    df_metrics = analytics.calculate_portfolio_metrics(holdings, market_data)
+    Args:
+        snap: Portfolio snapshot to export (default: the holdings table, page by page)
+    """
+    return "".join(iter_export_csv(snap))
+
+# Google Sheet header -> holdings column
+IMPORT_COL_MAP = {
+    'Ticker': 'ticker',
+    'Shares': 'shares',
+    'AvgPrice': 'avg_cost',
+    'Category': 'sector',
+    'Currency': 'currency'
+}
+
+def _to_number(col: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Parses a column of numbers that may contain '$', ',' or whitespace.
     
-    # Prepare Export DataFrame
-    export_rows = []
-    for _, row in df_metrics.iterrows():
-        # Mapping to GS_HEADERS
-        export_rows.append({
-            'Ticker': row['Ticker'],
-            'Name': row.get('Name', row['Ticker']),
-            'Shares': row['Shares'],
-            'AvgPrice': row['Avg Cost'],
-            'Yield': f"{row.get('Yield', 0) * 100:.2f}%", # Display as %
-            'Months': "", # Placeholder for payment months if we had them easily
-            'Category': row.get('Sector', 'Unknown'),
-            'CurrentPrice': row.get('Current Price', row['Avg Cost'])
-        })
+    Returns:
+        Tuple of (parsed floats, mask of non-empty values that failed to parse)
+    """
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype(float), pd.Series(False, index=col.index)
+    text = col.astype('string').str.replace(r'[$,\s]', '', regex=True)
+    text = text.mask(text == '')
+    parsed = pd.to_numeric(text, errors='coerce')
+    return parsed.astype(float), text.notna() & parsed.isna()
+
+def match_import_columns(columns: List[str]) -> dict:
+    """Maps internal column names to the CSV's actual headers (case-insensitive)."""
+    found_map = {}
+    for target, internal in IMPORT_COL_MAP.items():
+        for actual in columns:
+            if target.lower() == str(actual).strip().lower():
+                found_map[internal] = actual
+                break
+    return found_map
+
+def normalize_import_frame(df: pd.DataFrame, found_map: dict,
+                           line_numbers: Optional[List[int]] = None) -> Tuple[List[Tuple[Any, ...]], List[int], List[Tuple[int, str]]]:
+    """
+    Validates and normalizes imported rows with vectorized operations.
+    Rows without a ticker or with non-positive shares are skipped, as before.
     
-    df_export = pd.DataFrame(export_rows, columns=GS_HEADERS)
-    return df_export.to_csv(index=False)
+    Args:
+        df: Raw CSV frame
+        found_map: Result of match_import_columns
+        line_numbers: Line of the file each row starts on (default: the lines
+            after a header, for a file without blank or multi-line records)
+        
+    Returns:
+        Tuple of (rows for database.bulk_upsert_holdings, CSV line number of each row,
+        [(CSV line number, error), ...])
+    """
+    if line_numbers is None:
+        line_numbers = range(2, 2 + len(df))  # header is line 1
+    line_no = pd.Series(line_numbers, index=df.index)
+    ticker = df[found_map['ticker']].astype('string').str.strip().str.upper()
+    shares, bad_shares = _to_number(df[found_map['shares']])
+    avg_cost, bad_cost = _to_number(df[found_map['avg_cost']])
+    if 'sector' in found_map:
+        sector = df[found_map['sector']].astype('string').str.strip()
+        sector = sector.mask(sector == '')
+    else:
+        sector = pd.Series(pd.NA, index=df.index, dtype='string')
+
+    if 'currency' in found_map:
+        currency = df[found_map['currency']].astype('string').str.strip().str.upper()
+    else:
+        currency = pd.Series(pd.NA, index=df.index, dtype='string')
+    # Without a currency column, the listing suffix decides (e.g. .KS -> KRW)
+    currency = currency.mask(currency == '').fillna(ticker.fillna('').map(fx.infer_currency))
+
+    has_ticker = ticker.notna() & (ticker != '')
+    error_reason = pd.Series(pd.NA, index=df.index, dtype='string')
+    error_reason = error_reason.mask(has_ticker & (avg_cost.isna() | (avg_cost < 0)), '평단가 값이 올바르지 않습니다')
+    error_reason = error_reason.mask(has_ticker & bad_cost, '평단가 숫자 형식 오류')
+    error_reason = error_reason.mask(has_ticker & bad_shares, '수량 숫자 형식 오류')
+    is_error = error_reason.notna()
 
+    valid = has_ticker & ~is_error & shares.notna() & (shares > 0)
+    rows = list(zip(
+        ticker[valid].tolist(),
+        shares[valid].tolist(),
+        avg_cost[valid].tolist(),
+        [None if pd.isna(v) else v for v in sector[valid]],
+        currency[valid].tolist()
+    ))
+    errors = list(zip(line_no[is_error].tolist(), error_reason[is_error].tolist()))
+    return rows, line_no[valid].tolist(), errors
+
+def _format_import_result(count: int, errors: List[Tuple[int, str]], error_count: Optional[int] = None,
+                          label: str = "항목") -> str:
+    """Builds the user-facing import summary (`errors` may be the first few of `error_count`)."""
+    error_count = len(errors) if error_count is None else error_count
+    msg = f"성공적으로 {count}개의 {label}을 가져왔습니다."
+    if error_count:
+        shown = ", ".join(f"{line}행: {reason}" for line, reason in errors[:5])
+        more = f" 외 {error_count - 5}건" if error_count > 5 else ""
+        msg += f" ({error_count}개 행 건너뜀 - {shown}{more})"
+    return msg
+
+def _format_import_progress(progress) -> str:
+    """Summary of a streaming import (importer.ImportProgress)."""
+    msg = _format_import_result(progress.rows_written, progress.errors, progress.error_count)
+    if progress.resumed_from:
+        msg += " 중단된 가져오기를 이어서 완료했습니다."
+    return msg
+
+@instrumentation.timed
 def import_from_csv(csv_content: str) -> Tuple[bool, str]:
     """
     Imports holdings from a CSV string matching the Google Sheet format.
     Required columns: Ticker, Shares, AvgPrice
+    Valid rows are written in batched transactions; invalid rows are reported.
     """
+    from src import importer
     try:
-        # Some Google Sheets CSVs might have multiple header rows or weird formatting
-        # We assume standard CSV for now.
-        df = pd.read_csv(io.StringIO(csv_content))
-        
-        # Mapping variations
-        col_map = {
-            'Ticker': 'ticker',
-            'Shares': 'shares',
-            'AvgPrice': 'avg_cost',
-            'Category': 'sector'
-        }
-        
-        # Check if minimal required columns exist (Ticker, Shares, AvgPrice)
-        # Using case-insensitive check and fuzzy match
-        actual_cols = df.columns.tolist()
-        found_map = {}
-        for target, internal in col_map.items():
-            for actual in actual_cols:
-                if target.lower() == actual.lower():
-                    found_map[internal] = actual
-                    break
-        
-        required_internal = ['ticker', 'shares', 'avg_cost']
-        missing = [ri for ri in required_internal if ri not in found_map]
-        
-        if missing:
-            return False, f"필수 컬럼이 누락되었습니다: {', '.join(missing)} (원래 헤더: {', '.join(GS_HEADERS)})"
-            
-        count = 0
-        for _, row in df.iterrows():
-            ticker = str(row[found_map['ticker']]).strip().upper()
-            shares = float(row[found_map['shares']])
-            avg_cost = float(row[found_map['avg_cost']])
-            sector = str(row[found_map['sector']]) if 'sector' in found_map and pd.notna(row[found_map['sector']]) else None
-            
-            if ticker and not pd.isna(shares) and shares > 0:
-                database.add_holding(ticker, shares, avg_cost, sector)
-                count += 1
-                
-        return True, f"성공적으로 {count}개의 항목을 가져왔습니다."
-        
+        progress = importer.import_file(io.BytesIO(csv_content.encode('utf-8')), resume=False)
+        return True, _format_import_progress(progress)
+    except ValueError as e:
+        return False, str(e)
     except Exception as e:
         logger.error(f"Error importing CSV: {e}")
         return False, f"오류 발생: {str(e)}"
 
-def import_from_url(url: str) -> Tuple[bool, str]:
+@instrumentation.timed
+def import_from_file(fileobj: BinaryIO, name: Optional[str] = None, on_progress: Optional[Callable] = None) -> Tuple[bool, str]:
+    """
+    Streams holdings from a binary CSV file (e.g. a Streamlit upload) in chunks.
+    An interrupted import of the same file name and content is resumed.
+    Parquet and Arrow files (by extension) are loaded as holdings or dividends datasets.
+    
+    Args:
+        fileobj: Seekable binary file
+        name: File name, used to recognize an interrupted import
+        on_progress: Called with an importer.ImportProgress after each chunk
+    """
+    from src import importer, columnar
+    try:
+        if name and os.path.splitext(name)[1].lower() in columnar.EXTENSIONS:
+            dataset, count, errors = columnar.import_file(fileobj)
+            label = "보유 종목" if dataset == 'holdings' else "배당 기록"
+            return True, _format_import_result(count, errors, label=label)
+        progress = importer.import_file(fileobj, f"upload:{name}" if name else None, on_progress)
+        return True, _format_import_progress(progress)
+    except (ValueError, ImportError) as e:
+        return False, str(e)
+    except Exception as e:
+        logger.error(f"Error importing file {name}: {e}")
+        return False, f"오류 발생: {str(e)}"
+
+def to_csv_url(url: str) -> str:
+    """Converts Google Sheets edit and publish URLs to their CSV export URL."""
+    url = url.strip()
+    # Transform Google Sheets Edit URL to CSV Export URL
+    if "docs.google.com/spreadsheets/d/" in url and ("/edit" in url or url.endswith("/")):
+        # Extract ID and construct export URL
+        if "/edit" in url:
+            url = url.split("/edit")[0] + "/export?format=csv"
+        else:
+            url = url.rstrip("/") + "/export?format=csv"
+    elif "docs.google.com/spreadsheets/d/e/" in url and "pub" in url:
+        # Published CSV - ensure output=csv
+        if "output=csv" not in url:
+            url += "&output=csv" if "?" in url else "?output=csv"
+    return url
+
+@instrumentation.timed
+def import_from_url(url: str, on_progress: Optional[Callable] = None) -> Tuple[bool, str]:
     """
     Imports holdings from a Google Sheets URL or any valid CSV URL.
     Attempts to convert standard Google Sheet edit URLs to export URLs.
+    The response is parsed as it streams in; an interrupted import resumes
+    where it stopped if the server reports unchanged content.
+    
+    Args:
+        url: Sheet or CSV URL
+        on_progress: Called with an importer.ImportProgress after each chunk
     """
+    from src import importer
     try:
         url = url.strip()
         if not url:
             return False, "URL을 입력해주세요."
-            
-        # Transform Google Sheets Edit URL to CSV Export URL
-        if "docs.google.com/spreadsheets/d/" in url and ("/edit" in url or url.endswith("/")):
-            # Extract ID and construct export URL
-            if "/edit" in url:
-                url = url.split("/edit")[0] + "/export?format=csv"
-            else:
-                url = url.rstrip("/") + "/export?format=csv"
-        elif "docs.google.com/spreadsheets/d/e/" in url and "pub" in url:
-            # Published CSV - ensure output=csv
-            if "output=csv" not in url:
-                url += "&output=csv" if "?" in url else "?output=csv"
-                
-        # Fetch content using urllib
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            content = response.read().decode('utf-8')
-            return import_from_csv(content)
-            
+        progress = importer.import_url(to_csv_url(url), on_progress)
+        return True, _format_import_progress(progress)
+    except ValueError as e:
+        return False, str(e)
     except Exception as e:
         logger.error(f"Error importing from URL: {e}")
         return False, f"동기화 실패: {str(e)}"
@@ -0,0 +1,86 @@
+import streamlit as st
+import datetime
+import pandas as pd
+from src import instrumentation, singleflight, refresher, styles
+
+
+def _histogram_frame(name: str, label: str) -> pd.DataFrame:
+    """One row per label value of a histogram: count, average, p50/p95 and max in ms."""
+    rows = []
+    for _, labels, h in instrumentation.histograms(name):
+        rows.append({
+            label: ' / '.join(labels.values()),
+            '호출 수': h.count,
+            '평균 (ms)': h.sum / h.count * 1000,
+            'p50 (ms)': h.quantile(0.5) * 1000,
+            'p95 (ms)': h.quantile(0.95) * 1000,
+            '최대 (ms)': h.max * 1000,
+            '합계 (s)': h.sum,
+        })
+    return pd.DataFrame(rows)
+
+
+def render():
+    styles.apply_global_styles()
+
+    st.title("성능 모니터")
+    window = datetime.datetime.now() - datetime.datetime.fromtimestamp(instrumentation.started_at)
+    last = datetime.datetime.fromtimestamp(refresher.last_refresh).strftime('%H:%M:%S') if refresher.last_refresh else '-'
+    st.caption(f"수집 기간 {str(window).split('.')[0]} · 마지막 시세 갱신 {last}")
+
+    # 1. Cache hit rate
+    st.subheader("시세 캐시")
+    lookups = instrumentation.counters('cache_lookups_total')
+    if lookups:
+        cache_df = pd.DataFrame([{**labels, 'count': value} for _, labels, value in lookups])
+        cache_df = cache_df.pivot_table(index='group', columns='result', values='count', aggfunc='sum', fill_value=0)
+        cache_df['적중률 (%)'] = cache_df.get('hit', 0) / cache_df.sum(axis=1) * 100
+        st.dataframe(cache_df, use_container_width=True)
+    else:
+        st.info("아직 캐시 조회 기록이 없습니다.")
+
+    flights = singleflight.stats()
+    if flights:
+        st.dataframe(pd.DataFrame(flights).T.rename(columns={
+            'calls': '요청', 'executed': '실행', 'deduplicated': '중복 제거', 'in_flight': '진행 중'
+        }), use_container_width=True)
+
+    # 2. Function and page timings
+    st.subheader("함수 / 페이지 소요 시간")
+    pages = _histogram_frame('page_render_seconds', '이름')
+    if not pages.empty:
+        pages['이름'] = 'page.' + pages['이름']
+    timings = pd.concat([_histogram_frame('function_seconds', '이름'), pages], ignore_index=True)
+    if not timings.empty:
+        st.dataframe(timings.sort_values('합계 (s)', ascending=False), use_container_width=True, hide_index=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.1f") for c in timings.columns if '(ms)' in c})
+    errors = instrumentation.counters('errors_total')
+    if errors:
+        st.warning(' · '.join(f"{labels['function']}: {value:g}회 오류" for _, labels, value in errors))
+
+    # 3. Per-ticker fetch latency
+    st.subheader("티커별 조회 지연")
+    fetches = _histogram_frame('fetch_ticker_seconds', '티커 / 결과')
+    if not fetches.empty:
+        st.dataframe(fetches.sort_values('p95 (ms)', ascending=False), use_container_width=True, hide_index=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.1f") for c in fetches.columns if '(ms)' in c})
+        buckets = [f"≤{b:g}s" for b in instrumentation.BUCKETS] + [f">{instrumentation.BUCKETS[-1]:g}s"]
+        totals = [0] * len(buckets)
+        for _, _, h in instrumentation.histograms('fetch_ticker_seconds'):
+            totals = [a + b for a, b in zip(totals, h.counts)]
+        st.bar_chart(pd.DataFrame({'조회 수': totals}, index=pd.Index(buckets, name='지연')))
+    else:
+        st.info("아직 시세 조회 기록이 없습니다.")
+
+    # 4. Prometheus dump
+    st.subheader("Prometheus")
+    dump = instrumentation.to_prometheus()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("📥 metrics.txt", data=dump, file_name="metrics.txt", mime="text/plain", use_container_width=True)
+    with col2:
+        if st.button("초기화", use_container_width=True):
+            instrumentation.reset()
+            st.rerun()
+    with st.expander("텍스트 보기"):
+        st.code(dump, language=None)
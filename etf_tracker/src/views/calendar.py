@@ -1,86 +1,42 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import plotly.express as px
-from src import database, fetcher, styles
-
-def predict_future_dividends(holdings):
-    if not holdings:
-        return pd.DataFrame()
-
-    predictions = []
-    today = datetime.datetime.now()
-    
-    with st.spinner("예상 배당금 계산 중..."):
-        for h in holdings:
-            ticker = h[1]
-            shares = h[2]
-            
-            hist = fetcher.get_dividend_history(ticker)
-            if hist.empty:
-                continue
-            
-            # Ensure 'Date' index is handled
-            if 'Date' not in hist.columns: 
-                hist.reset_index(inplace=True)
-            
-            # 1. Identify valid payment months from the last ~18 months
-            # This handles irregular schedules better than fixed frequency
-            lookback_date = today - datetime.timedelta(days=365 + 180)
-            recent_hist = hist[hist['Date'] > lookback_date]
-            
-            if recent_hist.empty:
-                # Fallback to the very last payment if no recent ones (unlikely but safe)
-                payment_months = {hist.iloc[0]['Date'].month}
-                latest_amt = hist.iloc[0]['Dividends']
-            else:
-                payment_months = set(recent_hist['Date'].dt.month.unique())
-                latest_amt = recent_hist.iloc[0]['Dividends']
-            
-            # 2. Project for the next 12 months
-            # If the month is in payment_months, we add it.
-            for i in range(1, 13):
-                future_date = today + pd.DateOffset(months=i)
-                f_month = future_date.month
-                
-                if f_month in payment_months:
-                    predictions.append({
-                        'Ticker': ticker,
-                        'Shares': shares,
-                        'Pay Date': future_date, # Approximation of date
-                        'Amount Per Share': latest_amt,
-                        'Total Amount': latest_amt * shares,
-                        'Month': future_date.strftime('%Y-%m'),
-                        'MonthName': f"{f_month}월"
-                    })
-                    
-    df = pd.DataFrame(predictions)
-    return df
+from src import dividend_calendar, fx, snapshot, styles
 
 def render():
     styles.apply_global_styles() # Apply CSS
     
-    holdings = database.get_holdings()
+    snap = snapshot.get_snapshot(st.session_state.get('base_currency'))
+    holdings = snap.holdings
     if not holdings:
         st.info("보유 종목이 없습니다. 'ETF 등록' 탭에서 종목을 추가하세요.")
         return
 
-    df_pred = predict_future_dividends(holdings)
+    with st.spinner("예상 배당금 계산 중..."):
+        df_pred = dividend_calendar.get_calendar(holdings)
+
+    # Amounts are in each holding's currency; convert them to the snapshot's base
+    # currency like the metrics (holdings without a rate are left out of both)
+    base = snap.base_currency
+    currency = {h[1]: h[5] for h in holdings}
+    if not df_pred.empty:
+        currencies = df_pred['Ticker'].map(currency).fillna(fx.PIVOT_CURRENCY).str.upper()
+        rates = fx.latest_rates(currencies.unique().tolist(), base)
+        df_pred = df_pred.assign(**{'Total Amount': df_pred['Total Amount'] * currencies.map(rates).to_numpy()})
+        df_pred = df_pred[df_pred['Total Amount'].notna()]
+    sym = fx.currency_symbol(base)
     
     # ---------------------------------------------------------
     # Validation Logic
     # ---------------------------------------------------------
-    from src import analytics
-    # Fetch market data for accurate annual yield calculation
-    tickers = [h[1] for h in holdings]
-    market_data = fetcher.get_market_data(tickers)
-    df_metrics = analytics.calculate_portfolio_metrics(holdings, market_data)
+    # Metrics from the shared snapshot for accurate annual yield calculation
+    df_metrics = snap.metrics
     
     annual_total = df_metrics['Est. Annual Income'].sum() if 'Est. Annual Income' in df_metrics.columns else 0.0
     calendar_total = df_pred['Total Amount'].sum() if not df_pred.empty else 0.0
     
     st.markdown("# 월별 배당 캘린더")
-    styles.render_validation_card(annual_total, calendar_total)
+    styles.render_validation_card(annual_total, calendar_total, sym)
     
     # ---------------------------------------------------------
     # Premium Grid Layout
@@ -94,21 +50,14 @@ def render():
         m_label = f"{int(d.strftime('%m'))}월" 
         months_to_show.append({'key': m_key, 'label': m_label})
 
-    # Group by Month
+    # Rows are stored sorted by month and amount descending
     monthly_data = {}
-    if not df_pred.empty:
-        grouped = df_pred.groupby('Month')
-        for m_key, group in grouped:
-            total = group['Total Amount'].sum()
-            # Prepare list of dicts for the new card style
-            # Sort by amount descending
-            items = []
-            for _, row in group.sort_values(by='Total Amount', ascending=False).iterrows():
-                items.append({
-                    'ticker': row['Ticker'],
-                    'amount': f"${row['Total Amount']:,.2f}"
-                })
-            monthly_data[m_key] = {'total': total, 'items': items}
+    for m_key, ticker, amount, pay_date, special in zip(df_pred['Month'], df_pred['Ticker'], df_pred['Total Amount'],
+                                                        df_pred['Pay Date'], df_pred['Special']):
+        data = monthly_data.setdefault(m_key, {'total': 0.0, 'items': []})
+        data['total'] += amount
+        note = f"{pay_date.month}/{pay_date.day}" + (" 특별" if special else "")
+        data['items'].append({'ticker': ticker, 'amount': f"{sym}{amount:,.2f}", 'note': note})
             
     # Display Grid (Chunks of 4 to match mockup if possible, or 3 for standard layout)
     # The mockup shows 4 columns.
@@ -124,6 +73,6 @@ def render():
                 data = monthly_data.get(m_key, {'total': 0.0, 'items': []})
                 
                 with cols[j]:
-                    # Format amount with &dollar; to avoid Streamlit LaTeX issues
-                    amount_str = f"&dollar;{data['total']:,.2f}"
+                    # '$' is escaped by render_calendar_card to avoid Streamlit LaTeX issues
+                    amount_str = f"{sym}{data['total']:,.2f}"
                     styles.render_calendar_card(m_label, amount_str, data['items'])
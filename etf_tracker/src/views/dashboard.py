@@ -1,32 +1,105 @@
 import streamlit as st
 import datetime
-import plotly.express as px
-from src import database, fetcher, analytics, styles
+import pandas as pd
+from src import database, fx, snapshot, styles
+from src.views import table
+
+PERFORMANCE_PERIODS = {"1년": 1, "3년": 3, "5년": 5, "전체": None}
+
+def render_performance(snap):
+    """Portfolio value, returns and risk over time from the local daily price store."""
+    from src import performance, prices
+
+    period = st.radio("기간", list(PERFORMANCE_PERIODS), horizontal=True, label_visibility="collapsed")
+    years = PERFORMANCE_PERIODS[period]
+    start = (pd.Timestamp.today() - pd.DateOffset(years=years)).normalize() if years else None
+
+    with st.spinner("가격 이력 불러오는 중..."):
+        matrix = prices.get_price_matrix(snap.tickers, start=start)
+    if matrix.empty:
+        st.info("가격 이력이 없습니다.")
+        return
+    # Everything in the base currency: prices at each day's rate, trades at their date's rate
+    base = snap.base_currency
+    matrix = fx.convert_price_matrix(matrix, [h[5] for h in snap.holdings], base)
+    if matrix.columns.empty:
+        st.info("환율 정보가 있는 가격 이력이 없습니다.")
+        return
+
+    transactions = performance.transactions_frame(database.get_transactions(database.DEFAULT_PORTFOLIO_ID))
+    has_history = not transactions.empty
+    if not has_history:
+        # Without a transaction history, assume the current holdings were held throughout:
+        # opened before the first close, they count as invested at its value
+        transactions = performance.holdings_transactions(snap.holdings, matrix.index[0] - pd.Timedelta(days=1))
+    rates = fx.historical_rates(transactions['Currency'].tolist(), transactions['Date'].tolist(), base)
+    # Trades in a currency without a rate are left out, like their prices
+    known = ~pd.isna(rates)
+    transactions, rates = transactions[known].copy(), rates[known]
+    transactions['Price'] *= rates
+    transactions['Fee'] *= rates
+    result = performance.analyze(transactions, matrix)
+
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        styles.render_metric_card("시간가중수익률", f"{result.twr * 100:.2f}%", icon="⏱",
+                                  color_class="positive" if result.twr >= 0 else "negative")
+    with c2:
+        mwr = f"{result.mwr * 100:.2f}%" if has_history and result.mwr is not None else "-"
+        styles.render_metric_card("금액가중수익률 (연)", mwr, icon="💰")
+    with c3:
+        vol = result.volatility.dropna()
+        styles.render_metric_card("변동성 (연, 21일)", f"{vol.iloc[-1] * 100:.2f}%" if len(vol) else "-", icon="〰")
+    with c4:
+        styles.render_metric_card("최대 낙폭", f"{result.max_drawdown * 100:.2f}%", icon="↘", color_class="negative")
+
+    st.line_chart(result.value.rename('평가액'))
+    st.area_chart(result.drawdown.rename('낙폭') * 100)
+    money = fx.currency_symbol(base) + "%.2f"
+    st.dataframe(result.contributions, use_container_width=True, hide_index=True, column_config={
+        'P&L': st.column_config.NumberColumn(format=money),
+        'Contribution (%)': st.column_config.NumberColumn('기여도 (%)', format="%.2f"),
+        'End Value': st.column_config.NumberColumn('평가액', format=money),
+        'End Weight (%)': st.column_config.NumberColumn('비중 (%)', format="%.1f"),
+    })
 
 def render():
     styles.apply_global_styles() # Use shared styles
     
+    # Latest snapshot; quotes are kept fresh by the background refresher
+    # The display currency is per session; only the save button changes the portfolio's
+    snap = snapshot.get_snapshot(st.session_state.get('base_currency'))
+    as_of = datetime.datetime.fromtimestamp(snap.as_of).strftime('%m-%d %H:%M') if snap.as_of else '-'
+    
     # Header
     col1, col2 = st.columns([3, 1])
     with col1:
         st.title("포트폴리오 대시보드")
         st.caption("자산 현황과 수익률을 실시간으로 확인하세요.")
     with col2:
-        st.markdown(f"<div style='text-align: right; color: #888;'>오늘 날짜<br><span style='font-size: 18px; color: #FFF;'>{datetime.date.today().strftime('%Y-%m-%d')}</span></div>", unsafe_allow_html=True)
+        currencies = list(dict.fromkeys([snap.base_currency, 'USD', 'KRW'] + [h[5] for h in snap.holdings if h[5]]))
+        base_currency = st.selectbox("기준 통화", currencies, index=0)
+        if base_currency != snap.base_currency:
+            st.session_state['base_currency'] = base_currency
+            st.rerun()
+        if snap.base_currency != fx.get_base_currency():
+            if st.button("기본 통화로 저장", use_container_width=True):
+                database.set_base_currency(database.DEFAULT_PORTFOLIO_ID, snap.base_currency)
+                st.rerun()
+        st.markdown(f"<div style='text-align: right; color: #888;'>오늘 날짜<br><span style='font-size: 18px; color: #FFF;'>{datetime.date.today().strftime('%Y-%m-%d')}</span><br><span style='font-size: 12px;'>시세 기준 {as_of}</span></div>", unsafe_allow_html=True)
     
     st.markdown("---")
+    if snap.missing_rates:
+        st.warning(f"환율 정보가 없는 통화({', '.join(snap.missing_rates)})의 종목은 합계에서 제외되었습니다.")
 
-    # 1. Load Data
-    holdings = database.get_holdings()
-    
-    # Default values
+    # 1. Load Data (default values)
     total_value = 0.0
     total_cost = 0.0
     total_gain = 0.0
     total_gain_pct = 0.0
     annual_income = 0.0
     
-    df = analytics.calculate_portfolio_metrics(holdings, fetcher.get_market_data([h[1] for h in holdings])) if holdings else None
+    df = snap.metrics if snap.holdings else None
     
     if df is not None and not df.empty:
         total_value = df['Market Value'].sum()
@@ -35,19 +108,20 @@ def render():
         total_gain_pct = (total_gain / total_cost * 100) if total_cost > 0 else 0.0
         annual_income = df['Est. Annual Income'].sum()
 
-    # 2. Metrics Cards
+    # 2. Metrics Cards (in the base currency)
+    sym = fx.currency_symbol(snap.base_currency)
     c1, c2, c3, c4 = st.columns(4)
     
     with c1:
-        styles.render_metric_card("총 투자금", f"${total_cost:,.0f}", icon="💲")
+        styles.render_metric_card("총 투자금", f"{sym}{total_cost:,.0f}", icon="💲")
     with c2:
         delta_color = "positive" if total_gain >= 0 else "negative"
-        styles.render_metric_card("평가 금액", f"${total_value:,.0f}", "↗" if total_gain >=0 else "↘", icon="📈", color_class=delta_color)
+        styles.render_metric_card("평가 금액", f"{sym}{total_value:,.0f}", "↗" if total_gain >=0 else "↘", icon="📈", color_class=delta_color)
     with c3:
         delta_color = "positive" if total_gain_pct >= 0 else "negative"
         styles.render_metric_card("수익률", f"{total_gain_pct:.2f}%", icon="①", color_class=delta_color)
     with c4:
-        styles.render_metric_card("연 예상 배당금", f"${annual_income:,.0f}", icon="🕒", color_class="positive")
+        styles.render_metric_card("연 예상 배당금", f"{sym}{annual_income:,.0f}", icon="🕒", color_class="positive")
 
     st.markdown("###")
 
@@ -55,27 +129,37 @@ def render():
     st.subheader("보유 종목 리스트")
     
     if df is not None and not df.empty:
-        display_df = df.copy()
-        
-        display_df = display_df.rename(columns={
-            'Ticker': 'TICKER',
-            'Category': '카테고리',
-            'Shares': '수량',
-            'Avg Cost': '평단가',
-            'Current Price': '현재가',
-            'Total Gain (%)': '수익률',
-            'Yield': '배당률',
-            'Market Value': '평가액'
-        })
-        
-        # Format
-        display_df['평단가'] = display_df['평단가'].apply(lambda x: f"${x:,.2f}")
-        display_df['현재가'] = display_df['현재가'].apply(lambda x: f"${x:,.2f}")
-        display_df['평가액'] = display_df['평가액'].apply(lambda x: f"${x:,.2f}")
-        display_df['수익률'] = display_df['수익률'].apply(lambda x: f"{x:.2f}%")
-        display_df['배당률'] = display_df['배당률'].apply(lambda x: f"{x * 100:.2f}%")
-        
-        cols = ['TICKER', '카테고리', '수량', '평단가', '현재가', '수익률', '배당률', '평가액']
-        st.dataframe(display_df[cols], use_container_width=True, hide_index=True)
+        # Sorted, filtered and paginated on the server; only the visible page is
+        # sent and formatted by the browser (prices are in each holding's currency)
+        table.render_table(
+            "holdings",
+            table.frame_loader(df, ['Ticker', 'Name', 'Category']),
+            sort_options={
+                '평가액순': 'Market Value', '수익률순': 'Total Gain (%)', '배당률순': 'Yield',
+                '티커순': 'Ticker', '카테고리순': 'Category',
+            },
+            columns=['Ticker', 'Category', 'Shares', 'Currency', 'Avg Cost', 'Current Price',
+                     'Total Gain (%)', 'Yield (%)', 'Market Value'],
+            prepare=lambda page: page.assign(**{'Yield (%)': page['Yield'] * 100}),
+            column_config={
+                'Ticker': 'TICKER',
+                'Category': '카테고리',
+                'Shares': st.column_config.NumberColumn('수량', format="%.2f"),
+                'Currency': '통화',
+                'Avg Cost': st.column_config.NumberColumn('평단가', format="%.2f"),
+                'Current Price': st.column_config.NumberColumn('현재가', format="%.2f"),
+                'Total Gain (%)': st.column_config.NumberColumn('수익률', format="%.2f%%"),
+                'Yield (%)': st.column_config.NumberColumn('배당률', format="%.2f%%"),
+                'Market Value': st.column_config.NumberColumn('평가액', format=f"{sym}%.2f"),
+            },
+            search_placeholder="티커, 이름, 카테고리 검색",
+        )
     else:
         st.info("등록된 ETF가 없습니다. 'ETF 등록' 탭에서 종목을 추가하세요.")
+
+    # 4. Performance over time (price history is loaded on demand)
+    if snap.holdings:
+        st.markdown("###")
+        st.subheader("성과 추이")
+        if st.toggle("가격 이력으로 성과 분석하기"):
+            render_performance(snap)
@@ -1,6 +1,19 @@
 import streamlit as st
 import pandas as pd
-from src import database, styles
+from src import database, fx, styles
+from src.views import table
+
+HOLDING_COLUMNS = ['ID', 'Ticker', 'Shares', 'Avg Cost', 'Category', 'Currency']
+
+DATASET_LABELS = {'holdings': "보유 종목", 'metrics': "포트폴리오 지표", 'dividends': "배당 기록", 'projections': "배당 예측"}
+
+def render_import_progress(bar, progress):
+    """Updates a progress bar from an importer.ImportProgress."""
+    text = f"{progress.rows_read:,}행 처리 · {progress.rows_written:,}개 저장"
+    if progress.error_count:
+        text += f" · {progress.error_count:,}개 오류"
+    # Size is unknown for chunked HTTP responses; only the counts move then
+    bar.progress(progress.fraction or 0.0, text=text)
 
 def render():
     styles.apply_global_styles()
@@ -29,7 +42,8 @@ def render():
             if st.button("🔄 불러오기", use_container_width=True, type="primary"):
                 if gs_url:
                     with st.spinner("구글 시트 데이터 동기화 중..."):
-                        success, msg = utils.import_from_url(gs_url)
+                        bar = st.progress(0.0)
+                        success, msg = utils.import_from_url(gs_url, on_progress=lambda p: render_import_progress(bar, p))
                         if success:
                             st.session_state['sync_status'] = "동기화 완료!"
                             st.rerun()
@@ -39,14 +53,21 @@ def render():
                     st.warning("URL을 입력해주세요.")
                     
         with btn_col2:
-            csv_data = utils.export_to_csv()
-            st.download_button(
-                label="📥 CSV 내보내기",
-                data=csv_data,
-                file_name=f"etf_portfolio_{datetime.date.today()}.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
+            # Generated only on request and reused until holdings change
+            holdings_version = database.get_holdings_version()
+            export = st.session_state.get('csv_export')
+            if export is not None and export[0] == holdings_version:
+                st.download_button(
+                    label="📥 CSV 내보내기",
+                    data=export[1],
+                    file_name=f"etf_portfolio_{datetime.date.today()}.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+            elif st.button("📄 CSV 준비", use_container_width=True):
+                with st.spinner("CSV 생성 중..."):
+                    st.session_state['csv_export'] = (holdings_version, utils.export_to_csv())
+                st.rerun()
             
         if 'sync_status' in st.session_state:
             st.markdown(f'<div class="status-badge">{st.session_state["sync_status"]}</div>', unsafe_allow_html=True)
@@ -71,27 +92,49 @@ def render():
             </div>
         """, unsafe_allow_html=True)
 
-    with st.expander("또는 CSV 파일 직접 업로드"):
-        uploaded_file = st.file_uploader("CSV 파일 선택", type=["csv"])
+    with st.expander("또는 CSV · Parquet · Arrow 파일 직접 업로드"):
+        uploaded_file = st.file_uploader("파일 선택", type=["csv", "parquet", "arrow", "feather"],
+                                         help="Parquet/Arrow 파일은 보유 종목 또는 배당 기록 데이터셋을 가져옵니다.")
         if uploaded_file is not None:
-            content = uploaded_file.getvalue().decode("utf-8")
             if st.button("파일에서 가져오기"):
-                success, msg = utils.import_from_csv(content)
+                bar = st.progress(0.0)
+                success, msg = utils.import_from_file(uploaded_file, uploaded_file.name,
+                                                      on_progress=lambda p: render_import_progress(bar, p))
                 if success:
                     st.success(msg)
                     st.rerun()
                 else:
                     st.error(msg)
 
+    with st.expander("Parquet · Arrow 데이터셋 내보내기"):
+        c1, c2, c3 = st.columns([2, 1, 1])
+        dataset = c1.selectbox("데이터셋", list(DATASET_LABELS), format_func=DATASET_LABELS.get)
+        fmt = c2.selectbox("형식", ["parquet", "arrow"])
+        # Generated only on request and reused until holdings or the selection change
+        key = (dataset, fmt, database.get_holdings_version())
+        export = st.session_state.get('dataset_export')
+        if export is not None and export[0] == key:
+            c3.download_button("📥 다운로드", data=export[1], file_name=f"etf_{dataset}_{datetime.date.today()}.{fmt}",
+                               mime="application/octet-stream", use_container_width=True)
+        elif c3.button("📦 준비", use_container_width=True):
+            with st.spinner("파일 생성 중..."):
+                try:
+                    st.session_state['dataset_export'] = (key, utils.export_dataset(dataset, fmt))
+                except ImportError as e:
+                    st.error(str(e))
+                else:
+                    st.rerun()
+
     st.markdown("---")
     
     # 2. Manual Input Form
     st.subheader("ETF 직접 등록")
     with st.form("add_etf_form"):
-        col1, col2, col3 = st.columns(3)
-        ticker_input = col1.text_input("티커 (예: SCHD)").upper().strip()
+        col1, col2, col3, col4 = st.columns([3, 3, 3, 2])
+        ticker_input = col1.text_input("티커 (예: SCHD, 069500.KS)").upper().strip()
         shares = col2.number_input("수량", min_value=0.01, step=0.01)
-        avg_cost = col3.number_input("평단가 (&dollar;)", min_value=0.01, step=0.01)
+        avg_cost = col3.number_input("평단가 (거래 통화)", min_value=0.01, step=0.01)
+        currency_input = col4.selectbox("통화", ["자동", "USD", "KRW", "JPY", "EUR"])
         
         st.markdown("💡 티커를 입력하고 추가 버튼을 누르면 카테고리가 **자동으로** 분석됩니다.")
         
@@ -106,29 +149,41 @@ def render():
                 else:
                     category = "기타"
             
-            database.add_holding(ticker_input, shares, avg_cost, category)
-            st.success(f"저장되었습니다: {ticker_input} (카테고리: {category})")
+            # "자동" takes the listing currency from the exchange suffix
+            currency = fx.infer_currency(ticker_input) if currency_input == "자동" else currency_input
+            database.add_holding(ticker_input, shares, avg_cost, category, currency)
+            st.success(f"저장되었습니다: {ticker_input} (카테고리: {category}, 통화: {currency})")
             st.rerun()
 
     st.markdown("---")
     
     # 3. Display Holdings
     st.subheader("보유 종목 현황")
-    holdings = database.get_holdings()
-    if holdings:
-        df = pd.DataFrame(holdings, columns=['ID', 'Ticker', 'Shares', 'Avg Cost', 'Category', 'Currency'])
-        display_df = df.rename(columns={
-            'Ticker': '티커',
-            'Shares': '수량',
-            'Avg Cost': '평단가',
-            'Category': '카테고리',
-            'Currency': '통화'
-        })
-        st.dataframe(display_df, use_container_width=True)
+    _, holding_count = database.get_holdings_page(limit=1)
+    if holding_count:
+        def load(query, sort_by, ascending, offset, limit):
+            rows, total = database.get_holdings_page(query, sort_by, ascending, offset, limit)
+            return pd.DataFrame(rows, columns=HOLDING_COLUMNS), total
+
+        page = table.render_table(
+            "portfolio_holdings", load,
+            sort_options={'티커순': 'ticker', '수량순': 'shares', '평단가순': 'avg_cost',
+                          '카테고리순': 'sector', '통화순': 'currency'},
+            columns=HOLDING_COLUMNS[1:],
+            column_config={
+                'Ticker': '티커',
+                'Shares': st.column_config.NumberColumn('수량', format="%.2f"),
+                'Avg Cost': st.column_config.NumberColumn('평단가', format="%.2f"),
+                'Category': '카테고리',
+                'Currency': '통화',
+            },
+            search_placeholder="티커, 카테고리 검색",
+        )
         
         with st.expander("종목 삭제"):
-            ticker_to_del = st.selectbox("삭제할 티커 선택", df['Ticker'].unique())
-            if st.button("삭제"):
+            # Choices come from the visible page; search to narrow it down
+            ticker_to_del = st.selectbox("삭제할 티커 선택", page['Ticker'].tolist())
+            if ticker_to_del and st.button("삭제"):
                 database.delete_holding(ticker_to_del)
                 st.warning(f"삭제되었습니다: {ticker_to_del}")
                 st.rerun()
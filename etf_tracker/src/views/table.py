@@ -0,0 +1,103 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# (search query, sort column, ascending, offset, limit) -> (rows of the page, number of matching rows)
+PageLoader = Callable[[str, Optional[str], bool, int, int], Tuple[pd.DataFrame, int]]
+
+PAGE_SIZES = [25, 50, 100, 200]
+
+# Sort orders of shared (read-only) frames, reused across reruns and sessions
+ORDER_CACHE_SIZE = 32
+_order_lock = threading.Lock()
+_orders: 'OrderedDict[Tuple[int, str, bool], Tuple[pd.DataFrame, np.ndarray]]' = OrderedDict()
+
+
+def _sort_order(df: pd.DataFrame, column: str, ascending: bool) -> np.ndarray:
+    """Row positions of `df` sorted by `column` (missing values last), computed once per frame."""
+    key = (id(df), column, ascending)
+    with _order_lock:
+        cached = _orders.get(key)
+        # The frame is kept with its order, so its id can't be reused while cached
+        if cached is not None and cached[0] is df:
+            _orders.move_to_end(key)
+            return cached[1]
+    order = (df[column].reset_index(drop=True)
+             .sort_values(ascending=ascending, na_position='last', kind='stable')
+             .index.to_numpy())
+    with _order_lock:
+        _orders[key] = (df, order)
+        while len(_orders) > ORDER_CACHE_SIZE:
+            _orders.popitem(last=False)
+    return order
+
+
+def frame_loader(df: pd.DataFrame, search_columns: List[str]) -> PageLoader:
+    """Pages an in-memory frame: filters on `search_columns` (case-insensitive substring)."""
+    def load(query: str, sort_by: Optional[str], ascending: bool, offset: int, limit: int) -> Tuple[pd.DataFrame, int]:
+        order = _sort_order(df, sort_by, ascending) if sort_by else np.arange(len(df))
+        if query:
+            mask = np.zeros(len(df), dtype=bool)
+            for column in search_columns:
+                mask |= df[column].astype('string').str.contains(query, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+            order = order[mask[order]]
+        return df.iloc[order[offset:offset + limit]], len(order)
+    return load
+
+
+def _reset_page(key: str) -> None:
+    st.session_state[f"{key}_page"] = 1
+
+
+def render_table(key: str, load: PageLoader, sort_options: Dict[str, str], column_config: Dict[str, Any],
+                 columns: Optional[List[str]] = None, prepare: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                 search_placeholder: str = "검색") -> pd.DataFrame:
+    """
+    Renders a table that is searched, sorted and paginated by `load`, so only the
+    visible page is sent to the browser. Values are formatted by `column_config`.
+
+    Args:
+        key: Unique widget key prefix
+        load: Returns one page of rows and the number of matching rows
+        sort_options: Sort label -> column name passed to `load` (first is the default)
+        column_config: st.dataframe column configuration
+        columns: Columns to show (default: all)
+        prepare: Applied to the page before display (e.g. derived columns)
+
+    Returns:
+        The displayed page.
+    """
+    c1, c2, c3, c4 = st.columns([4, 2, 1, 1])
+    query = c1.text_input("검색", key=f"{key}_query", placeholder=search_placeholder,
+                          label_visibility="collapsed", on_change=_reset_page, args=(key,)).strip()
+    sort_label = c2.selectbox("정렬", list(sort_options), key=f"{key}_sort",
+                              label_visibility="collapsed", on_change=_reset_page, args=(key,))
+    descending = c3.toggle("내림차순", key=f"{key}_desc", on_change=_reset_page, args=(key,))
+    page_size = c4.selectbox("행 수", PAGE_SIZES, key=f"{key}_size",
+                             label_visibility="collapsed", on_change=_reset_page, args=(key,))
+
+    page = st.session_state.get(f"{key}_page", 1)
+    frame, total = load(query, sort_options[sort_label], not descending, (page - 1) * page_size, page_size)
+    pages = max(1, math.ceil(total / page_size))
+    if page > pages:
+        # The result shrank (e.g. after deleting rows); show its last page
+        page = pages
+        frame, total = load(query, sort_options[sort_label], not descending, (page - 1) * page_size, page_size)
+    st.session_state[f"{key}_page"] = page
+
+    if prepare is not None and not frame.empty:
+        frame = prepare(frame)
+    st.dataframe(frame[columns] if columns else frame, use_container_width=True, hide_index=True,
+                 column_config=column_config)
+
+    c1, c2 = st.columns([4, 1])
+    first = (page - 1) * page_size + 1 if total else 0
+    c1.caption(f"총 {total:,}개 중 {first:,}–{min(page * page_size, total):,}")
+    c2.number_input("페이지", min_value=1, max_value=pages, step=1, key=f"{key}_page",
+                    label_visibility="collapsed")
+    return frame
@@ -0,0 +1,114 @@
+import os
+import time
+import logging
+import importlib
+import threading
+from typing import List, Optional
+from src import database
+
+# Configure Logger
+logger = logging.getLogger(__name__)
+
+# Time budget of the network part of a warm start (seconds)
+WARMUP_TIMEOUT = float(os.environ.get('ETF_WARMUP_TIMEOUT', '20'))
+
+# Modules that are only needed once a page renders or data is fetched
+HEAVY_MODULES = [
+    'src.views.dashboard',
+    'src.views.calendar',
+    'src.views.portfolio',
+    'src.projection',
+    'src.utils',
+    'yfinance',
+]
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def preload_modules(modules: Optional[List[str]] = None) -> float:
+    """Imports modules ahead of the first page render. Returns the elapsed seconds."""
+    start = time.monotonic()
+    for name in modules or HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning(f"Preload of {name} skipped: {e}")
+    return time.monotonic() - start
+
+
+def prefetch() -> int:
+    """
+    Fills the persistent caches for held tickers: missing or stale market data,
+    never-synced dividend histories and the dividend calendar. Returns the number of tickers.
+    """
+    from src import cache, dividend_calendar, fetcher
+    tickers = database.get_all_tickers()
+    if not tickers:
+        return 0
+    _, stale, missing = cache.load_market_rows(tickers)
+    if stale or missing:
+        fetcher.refresh_market_keys(missing + stale)
+    dividend_calendar.refresh(database.get_holdings())
+    return len(tickers)
+
+
+def warm_up(timeout: float = WARMUP_TIMEOUT) -> bool:
+    """
+    Prepares a fresh instance before it accepts traffic: migrates the database,
+    prefetches market data into the persistent cache (bounded by `timeout`) and
+    reads heavy modules once. Run once from the container entrypoint (warmup.py);
+    the cache is shared with the Streamlit process through SQLite.
+
+    Returns:
+        True if the prefetch finished within the timeout.
+    """
+    start = time.monotonic()
+    database.init_db()
+
+    # Network I/O runs on a daemon thread so a slow provider can't hold up startup
+    done = threading.Event()
+
+    def run():
+        try:
+            count = prefetch()
+            logger.info(f"Prefetched market data for {count} tickers")
+        except Exception as e:
+            logger.error(f"Prefetch failed: {e}")
+        finally:
+            done.set()
+
+    threading.Thread(target=run, name='warmup-prefetch', daemon=True).start()
+    # Also pulls the module files into the OS page cache for the Streamlit process
+    elapsed = preload_modules()
+    finished = done.wait(max(0.0, timeout - (time.monotonic() - start)))
+    if not finished:
+        logger.warning(f"Prefetch still running after {timeout:.0f}s, continuing startup")
+    logger.info(f"Warm start took {time.monotonic() - start:.2f}s (module preload {elapsed:.2f}s)")
+    return finished
+
+
+def start() -> bool:
+    """
+    In-process warm-up for the Streamlit server: preloads heavy modules and builds
+    the shared portfolio snapshot on a background thread, once per process.
+
+    Returns:
+        True if the warm-up thread was started.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return False
+        _started = True
+
+    def run():
+        from src import snapshot
+        try:
+            preload_modules()
+            snapshot.get_snapshot()
+        except Exception as e:
+            logger.error(f"Background warm-up failed: {e}")
+
+    threading.Thread(target=run, name='warmup', daemon=True).start()
+    return True
@@ -0,0 +1,20 @@
+"""
+Shared fixtures. Run from the etf_tracker directory:
+    python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh database at the latest schema version, used instead of data/portfolio.db."""
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'portfolio.db'))
+    database.init_db(force=True)
+    yield database
+    database.close_db_connection()
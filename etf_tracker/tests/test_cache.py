@@ -0,0 +1,45 @@
+import time
+
+from src import cache, fetcher, fetch_engine
+
+QUOTE_TTL = cache.FIELD_GROUPS['quote']['ttl']
+FUNDAMENTALS = {'Yield': 0.02, 'Sector': 'Equity', 'Name': 'Fund'}
+
+
+def test_entries_are_stale_after_their_groups_ttl(db):
+    now = time.time()
+    cache.write('quote', {'VOO': {'Current Price': 500.0}}, fetched_at=now - QUOTE_TTL - 1)
+    cache.write('fundamentals', {'VOO': FUNDAMENTALS}, fetched_at=now - QUOTE_TTL - 1)
+
+    rows, stale, missing = cache.load_market_rows(['VOO', 'SCHD'])
+
+    # Fundamentals live longer than quotes
+    assert stale == [('VOO', 'quote')]
+    assert missing == [('SCHD', 'quote'), ('SCHD', 'fundamentals')]
+    assert rows == {'VOO': {'Ticker': 'VOO', 'Current Price': 500.0, **FUNDAMENTALS}}
+
+
+def test_only_missing_groups_are_fetched_and_stale_ones_revalidate_in_the_background(db, monkeypatch):
+    now = time.time()
+    cache.write('quote', {'VOO': {'Current Price': 500.0}, 'JEPI': {'Current Price': 55.0}})
+    cache.write('quote', {'SCHD': {'Current Price': 75.0}}, fetched_at=now - QUOTE_TTL - 1)
+    cache.write('fundamentals', {'VOO': FUNDAMENTALS, 'SCHD': FUNDAMENTALS})
+    fetched, background = [], []
+
+    def fetch_rows(tickers, groups):
+        fetched.append((sorted(tickers), groups))
+        prices = {'quote': {'Current Price': 10.0}, 'fundamentals': FUNDAMENTALS}
+        return [{'Ticker': t, **{k: v for g in groups for k, v in prices[g].items()}} for t in tickers], []
+
+    monkeypatch.setattr(fetch_engine, 'fetch_rows', fetch_rows)
+    monkeypatch.setattr(cache, 'refresh_in_background', lambda key, fn: background.append((key, fn)))
+
+    df = fetcher.get_market_data(['VOO', 'SCHD', 'JEPI', 'QQQ'])
+
+    assert sorted(fetched) == [(['JEPI'], ('fundamentals',)), (['QQQ'], ('quote', 'fundamentals'))]
+    assert df.set_index('Ticker')['Current Price'].to_dict() == {'VOO': 500.0, 'SCHD': 75.0, 'JEPI': 55.0, 'QQQ': 10.0}
+    assert [key for key, _ in background] == ['market:SCHD/quote']
+
+    background[0][1]()
+    assert fetched[-1] == (['SCHD'], ('quote',))
+    assert not cache.load_market_rows(['SCHD'])[1]
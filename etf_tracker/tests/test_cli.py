@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from src import cli, fetcher, prices, dividend_calendar
+
+
+def test_invalid_arguments_exit_with_usage(db):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(['metrics', '--format', 'xml'])
+    assert exc.value.code == cli.EXIT_USAGE
+
+
+def test_columnar_output_to_stdout_is_a_usage_error(db):
+    assert cli.main(['calendar', '--format', 'parquet']) == cli.EXIT_USAGE
+
+
+def test_import_exit_codes(db, tmp_path, capsys):
+    good = tmp_path / 'good.csv'
+    good.write_text('Ticker,Shares,AvgPrice\nVOO,1,400\nSCHD,2,75\n', encoding='utf-8')
+    bad = tmp_path / 'bad.csv'
+    bad.write_text('Ticker,Shares,AvgPrice\nJEPI,many,55\nQQQ,1,450\n', encoding='utf-8')
+
+    assert cli.main(['import', str(good)]) == cli.EXIT_OK
+    capsys.readouterr()
+    assert cli.main(['import', str(bad)]) == cli.EXIT_PARTIAL
+    summary = json.loads(capsys.readouterr().out)
+    assert (summary['rows_written'], summary['errors']) == (1, 1)
+    assert summary['first_errors'][0]['line'] == 2
+
+    assert cli.main(['import', str(tmp_path / 'missing.csv')]) == cli.EXIT_ERROR
+    assert sorted(h[1] for h in db.get_holdings()) == ['QQQ', 'SCHD', 'VOO']
+
+
+def test_sync_reports_partial_failures(db, monkeypatch, capsys):
+    assert cli.main(['sync']) == cli.EXIT_OK
+    assert json.loads(capsys.readouterr().out) == {'tickers': 0}
+
+    monkeypatch.setattr(fetcher, 'refresh_market_data', lambda tickers: [{'Ticker': 'VOO'}])
+    monkeypatch.setattr(fetcher, 'sync_dividend_history', lambda t, full=False: 4)
+    monkeypatch.setattr(prices, 'sync_price_histories', lambda tickers, full=False: {})
+    monkeypatch.setattr(dividend_calendar, 'refresh', lambda holdings: 0)
+
+    assert cli.main(['sync', 'voo']) == cli.EXIT_OK
+    capsys.readouterr()
+    assert cli.main(['sync', 'VOO', 'BAD']) == cli.EXIT_PARTIAL
+    assert json.loads(capsys.readouterr().out)['market_failed'] == ['BAD']
@@ -0,0 +1,59 @@
+import io
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+from src import columnar  # noqa: E402
+
+
+def _file(dataset, df, fmt='parquet'):
+    return io.BytesIO(columnar.to_bytes(dataset, df, fmt, {}))
+
+
+def test_holdings_round_trip(db):
+    df = pd.DataFrame({'Ticker': ['VOO', '069500.KS'], 'Shares': [2.0, 10.0], 'Avg Cost': [400.0, 30000.0],
+                       'Category': ['Equity', None], 'Currency': ['USD', None]})
+
+    assert columnar.import_file(_file('holdings', df, 'arrow')) == ('holdings', 2, [])
+    assert {h[1]: (h[2], h[5]) for h in db.get_holdings()} == {'VOO': (2.0, 'USD'), '069500.KS': (10.0, 'KRW')}
+
+
+def test_failed_holdings_are_reported_by_file_row(db):
+    with db.get_db_connection() as conn:
+        conn.execute("CREATE TRIGGER reject_bad BEFORE INSERT ON holdings WHEN NEW.ticker = 'BAD' "
+                     "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    df = pd.DataFrame({'Ticker': ['VOO', 'SCHD', 'JEPI', 'BAD'], 'Shares': [1.0, 2.0, 3.0, 4.0],
+                       'Avg Cost': [1.0, 1.0, 1.0, 1.0], 'Category': None, 'Currency': 'USD'})
+
+    dataset, written, errors = columnar.import_file(_file('holdings', df), batch_rows=2)
+
+    assert (dataset, written) == ('holdings', 3)
+    assert errors == [(4, 'rejected')]
+
+
+def test_dividend_import_keeps_the_sync_state(db):
+    db.save_dividend_events('VOO', [('2024-03-22', 1.5)], synced_at=1000.0)
+    df = pd.DataFrame({'Ticker': ['VOO', 'VOO', 'SCHD'], 'Date': pd.to_datetime(['2020-03-25', '2025-03-26', '2024-03-20']),
+                       'Dividends': [1.2, 1.8, 0.6]})
+
+    assert columnar.import_file(_file('dividends', df)) == ('dividends', 3, [])
+
+    # The high-water mark and sync time stay, so the next sync still fetches everything newer;
+    # a ticker never synced gets a full fetch
+    assert db.get_dividend_sync_states(['VOO', 'SCHD']) == {'VOO': ('2024-03-22', 1000.0), 'SCHD': (None, 0.0)}
+    assert sorted(d for d, _ in db.get_dividend_events('VOO')) == ['2020-03-25', '2024-03-22', '2025-03-26']
+
+
+def test_invalid_holdings_are_reported_by_file_row(db):
+    df = pd.DataFrame({'Ticker': ['VOO', 'SCHD', None, 'JEPI', 'QQQ', '069500.KS'],
+                       'Shares': [1.0, None, 3.0, 0.0, 2.0, 10.0],
+                       'Avg Cost': [400.0, 75.0, 1.0, 55.0, None, 30000.0],
+                       'Category': None, 'Currency': ['USD', 'USD', 'USD', 'USD', 'USD', ' ']})
+
+    dataset, written, errors = columnar.import_file(_file('holdings', df))
+
+    assert (dataset, written) == ('holdings', 2)
+    assert [row for row, _ in errors] == [2, 3, 4, 5]
+    # A missing cost isn't imported as 0, and a blank currency is inferred from the listing
+    assert {h[1]: (h[3], h[5]) for h in db.get_holdings()} == {'VOO': (400.0, 'USD'), '069500.KS': (30000.0, 'KRW')}
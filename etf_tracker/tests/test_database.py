@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def old_db(db, tmp_path, monkeypatch):
+    """Switches to a new database migrated only up to the given schema version."""
+    def create(version):
+        monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / f'v{version}.db'))
+        with monkeypatch.context() as m:
+            m.setattr(db, 'MIGRATIONS', [step for step in db.MIGRATIONS if step[0] <= version])
+            assert db.migrate() == version
+    return create
+
+
+def _currencies(database):
+    return {h[1]: h[5] for h in database.get_holdings()}
+
+
+def test_upsert_updates_currency(db):
+    db.bulk_upsert_holdings([('069500.KS', 10.0, 30000.0, None, 'USD')])
+    assert _currencies(db) == {'069500.KS': 'USD'}
+
+    count, errors = db.bulk_upsert_holdings([('069500.KS', 12.0, 31000.0, None, 'KRW')])
+
+    assert (count, errors) == (1, [])
+    assert _currencies(db) == {'069500.KS': 'KRW'}
+
+
+def test_connections_are_reused_per_thread_in_wal_mode(db):
+    with db.get_db_connection() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    with db.get_db_connection() as again:
+        assert again is conn
+
+    other = []
+
+    def connect():
+        with db.get_db_connection() as c:
+            other.append(c)
+        db.close_db_connection()
+
+    thread = threading.Thread(target=connect)
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_open_transactions_are_rolled_back_on_exit(db):
+    with pytest.raises(RuntimeError):
+        with db.get_db_connection() as conn:
+            conn.execute("INSERT INTO holdings (ticker, shares, avg_cost) VALUES ('VOO', 1, 400)")
+            raise RuntimeError('failed before commit')
+
+    assert not conn.in_transaction
+    assert db.get_holdings() == []
+
+
+def test_bulk_upsert_inserts_and_updates_in_one_version_bump(db):
+    db.add_holding('VOO', 1.0, 400.0, 'Equity')
+    version = db.get_holdings_version()
+
+    count, errors = db.bulk_upsert_holdings([('VOO', 3.0, 410.0, 'Equity', 'USD'), ('SCHD', 10.0, 75.0, None, 'USD')])
+
+    assert (count, errors) == (2, [])
+    assert sorted((h[1], h[2], h[3]) for h in db.get_holdings()) == [('SCHD', 10.0, 75.0), ('VOO', 3.0, 410.0)]
+    assert db.get_holdings_version() == version + 1
+
+
+def test_bulk_upsert_reports_rejected_rows_and_keeps_the_rest(db):
+    with db.get_db_connection() as conn:
+        conn.execute("CREATE TRIGGER reject_bad BEFORE INSERT ON holdings WHEN NEW.ticker = 'BAD' "
+                     "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+
+    count, errors = db.bulk_upsert_holdings([('VOO', 1.0, 400.0, None, 'USD'), ('BAD', 1.0, 1.0, None, 'USD'),
+                                             ('SCHD', 2.0, 75.0, None, 'USD')])
+
+    assert (count, errors) == (2, [(1, 'rejected')])
+    assert sorted(h[1] for h in db.get_holdings()) == ['SCHD', 'VOO']
+
+
+def test_migration_backfills_listing_currencies(db, old_db):
+    old_db(6)
+    db.add_holding('069500.KS', 10.0, 30000.0, currency='USD')
+    db.add_holding('VOO', 1.0, 400.0, currency='USD')
+    db.add_holding('SXR8.DE', 1.0, 500.0, currency='EUR')
+    db.add_lot(db.DEFAULT_PORTFOLIO_ID, '7203.T', 100.0, 2500.0, '2024-01-02', currency='USD')
+
+    assert db.migrate() == db.MIGRATIONS[-1][0]
+
+    assert _currencies(db) == {'069500.KS': 'KRW', 'VOO': 'USD', 'SXR8.DE': 'EUR'}
+    assert {lot[1]: lot[5] for lot in db.get_lots(db.DEFAULT_PORTFOLIO_ID)} == {'7203.T': 'JPY'}
+
+
+def test_migrating_a_version_1_database(db, old_db):
+    old_db(1)
+    with db.get_db_connection() as conn:
+        conn.executemany('INSERT INTO holdings (ticker, shares, avg_cost) VALUES (?, ?, ?)',
+                         [('069500.KS', 10.0, 30000.0), ('VOO', 1.0, 400.0)])
+        conn.commit()
+
+    assert db.migrate() == db.MIGRATIONS[-1][0]
+
+    assert db.get_schema_version() == db.MIGRATIONS[-1][0]
+    # Every later table exists, and the currency backfill ran on the old rows
+    assert [p[0] for p in db.get_portfolios()] == [db.DEFAULT_PORTFOLIO_ID]
+    assert _currencies(db) == {'069500.KS': 'KRW', 'VOO': 'USD'}
+
+
+def test_lots_aggregate_to_holdings(db):
+    pid = db.DEFAULT_PORTFOLIO_ID
+    db.add_lot(pid, 'VOO', 1.0, 380.0, '2024-01-02')
+    db.add_lot(pid, 'VOO', 3.0, 420.0, '2025-01-02')
+    db.add_lot(pid, 'SCHD', 10.0, 75.0, '2025-02-03', sector='Equity')
+
+    holdings = db.get_holdings(pid)
+
+    assert [(h[1], h[2], h[3], h[4]) for h in holdings] == [('SCHD', 10.0, 75.0, 'Equity'), ('VOO', 4.0, 410.0, None)]
+    assert db.get_holdings() == []
+
+
+def test_holdings_page_sorts_nulls_last_and_breaks_ties_by_ticker(db):
+    db.add_holding('VOO', 2.0, 400.0, 'Equity')
+    db.add_holding('BND', 2.0, 70.0, None)
+    db.add_holding('AGG', 5.0, 95.0, 'Bond')
+    db.add_holding('SCHD', 2.0, 75.0, None)
+
+    def tickers(**kwargs):
+        return [h[1] for h in db.get_holdings_page(**kwargs)[0]]
+
+    assert tickers(sort_by='sector') == ['AGG', 'VOO', 'BND', 'SCHD']
+    assert tickers(sort_by='sector', ascending=False) == ['VOO', 'AGG', 'BND', 'SCHD']
+    assert tickers(sort_by='shares', ascending=False) == ['AGG', 'BND', 'SCHD', 'VOO']
+    assert tickers(sort_by='shares', offset=1, limit=2) == ['SCHD', 'VOO']
+    assert db.get_holdings_page(limit=1)[1] == 4
+    with pytest.raises(ValueError):
+        db.get_holdings_page(sort_by='shares; DROP TABLE holdings')
+
+
+def test_holdings_page_matches_like_wildcards_literally(db):
+    db.add_holding('VOO', 1.0, 400.0, 'US_Equity')
+    db.add_holding('SCHD', 1.0, 75.0, 'US Equity')
+    db.add_holding('QQQ', 1.0, 450.0, '100% Tech')
+    db.add_holding('BND', 1.0, 70.0, 'Bond\\Fund')
+    db.add_holding('BNDX', 1.0, 50.0, 'Bond Fund')
+
+    def tickers(query):
+        rows, total = db.get_holdings_page(query)
+        assert total == len(rows)
+        return [h[1] for h in rows]
+
+    assert tickers('s_e') == ['VOO']
+    assert tickers('0%') == ['QQQ']
+    assert tickers('d\\f') == ['BND']
+    # The query matches the ticker or the sector, case-insensitively
+    assert tickers('bnd') == ['BND', 'BNDX']
+    assert tickers('equity') == ['SCHD', 'VOO']
@@ -0,0 +1,75 @@
+import time
+import datetime
+
+from src import dividend_calendar
+
+TODAY = datetime.datetime(2026, 10, 17)
+
+# Quarterly payer on the 15th, last paid in September
+QUARTERLY = [('2025-03-14', 0.5), ('2025-06-16', 0.5), ('2025-09-15', 0.5), ('2025-12-15', 0.5),
+             ('2026-03-16', 0.5), ('2026-06-15', 0.5), ('2026-09-15', 0.5)]
+
+
+def _holding(ticker, shares, holding_id=1):
+    return (holding_id, ticker, shares, 100.0, 'Equity', 'USD')
+
+
+def _seed(db, ticker, events=QUARTERLY):
+    # A recent sync time keeps ensure_dividend_histories from going to the network
+    db.save_dividend_events(ticker, events, synced_at=time.time())
+
+
+def test_calendar_projects_the_next_payments(db):
+    _seed(db, 'VOO')
+
+    df = dividend_calendar.get_calendar([_holding('VOO', 10.0)], today=TODAY)
+
+    assert list(df.columns) == dividend_calendar.CALENDAR_COLUMNS
+    assert df['Ex Date'].dt.strftime('%Y-%m-%d').tolist()[:2] == ['2026-12-15', '2027-03-15']
+    assert (df['Total Amount'] == 5.0).all()
+    assert df['Projected'].all() and not df['Special'].any()
+    assert df['Month'].is_monotonic_increasing
+
+
+def test_only_changed_tickers_are_rebuilt(db):
+    _seed(db, 'VOO')
+    _seed(db, 'SCHD')
+    holdings = [_holding('VOO', 10.0), _holding('SCHD', 4.0, 2)]
+
+    assert dividend_calendar.refresh(holdings, today=TODAY) == 2
+    assert dividend_calendar.refresh(holdings, today=TODAY) == 0
+    built = dividend_calendar.get_states()
+
+    # Shares of one ticker change
+    assert dividend_calendar.refresh([_holding('VOO', 12.0), _holding('SCHD', 4.0, 2)], today=TODAY) == 1
+    states = dividend_calendar.get_states()
+    assert states['VOO'][0] == 12.0 and states['SCHD'] == built['SCHD']
+
+    # A new dividend event bumps the other ticker's revision
+    _seed(db, 'SCHD', [('2026-10-01', 0.6)])
+    assert dividend_calendar.refresh([_holding('VOO', 12.0), _holding('SCHD', 4.0, 2)], today=TODAY) == 1
+    assert dividend_calendar.get_states()['SCHD'][1] == built['SCHD'][1] + 1
+
+
+def test_lots_of_one_ticker_are_summed_and_sold_tickers_removed(db):
+    _seed(db, 'VOO')
+    _seed(db, 'SCHD')
+    dividend_calendar.refresh([_holding('VOO', 10.0), _holding('voo', 5.0, 2), _holding('SCHD', 4.0, 3)],
+                              today=TODAY)
+
+    assert dividend_calendar.get_states()['VOO'][0] == 15.0
+
+    df = dividend_calendar.get_calendar([_holding('VOO', 15.0)], today=TODAY)
+
+    assert set(df['Ticker']) == {'VOO'}
+    assert list(dividend_calendar.get_states()) == ['VOO']
+
+
+def test_new_month_rebuilds_everything(db):
+    _seed(db, 'VOO')
+    _seed(db, 'SCHD')
+    holdings = [_holding('VOO', 10.0), _holding('SCHD', 4.0, 2)]
+    dividend_calendar.refresh(holdings, today=TODAY)
+
+    assert dividend_calendar.refresh(holdings, today=TODAY + datetime.timedelta(days=3)) == 0
+    assert dividend_calendar.refresh(holdings, today=datetime.datetime(2026, 11, 2)) == 2
@@ -0,0 +1,108 @@
+import asyncio
+from typing import Any, Dict, List
+
+from src import fetch_engine, providers
+
+
+class FakeProvider(providers.MarketDataProvider):
+    """Serves fixed rows; `failures` are raised, in order, before a symbol succeeds."""
+    name = 'fake'
+
+    def __init__(self, failures: Dict[str, List[BaseException]] = None, delay: float = 0.0,
+                 delays: Dict[str, float] = None):
+        super().__init__(max_concurrency=8)
+        self.failures = failures or {}
+        self.delay, self.delays = delay, delays or {}
+        self.calls: Dict[str, int] = {}
+        self.in_flight = self.peak = 0
+
+    async def _quote(self, symbol: str) -> Dict[str, Any]:
+        self.calls[symbol] = self.calls.get(symbol, 0) + 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(symbol, self.delay))
+            if self.failures.get(symbol):
+                raise self.failures[symbol].pop(0)
+            return {'price': 100.0 + len(symbol)}
+        finally:
+            self.in_flight -= 1
+
+    async def _fundamentals(self, symbol: str) -> Dict[str, Any]:
+        return {'yield': 0.02, 'sector': 'Equity', 'name': f'{symbol} ETF'}
+
+    async def _dividends(self, symbol, start, full):
+        raise providers.ProviderError('no dividends')
+
+
+def test_rows_keep_ticker_order_and_failures_are_reported():
+    provider = FakeProvider({'BAD': [providers.ProviderError('unknown ticker')]})
+
+    rows, failed = fetch_engine.fetch_rows(['VOO', 'BAD', 'SCHD'], provider, backoff=0.0)
+
+    assert [r['Ticker'] for r in rows] == ['VOO', 'SCHD']
+    assert rows[0] == {'Ticker': 'VOO', 'Current Price': 103.0, 'Yield': 0.02, 'Sector': 'Equity', 'Name': 'VOO ETF'}
+    assert failed == ['BAD']
+
+
+def test_concurrency_is_bounded_by_max_workers():
+    provider = FakeProvider(delay=0.01)
+
+    rows, failed = fetch_engine.fetch_rows([f'T{i}' for i in range(20)], provider, max_workers=3, groups=('quote',))
+
+    assert len(rows) == 20 and not failed
+    assert provider.peak == 3
+
+
+def test_default_concurrency_is_the_providers():
+    provider = FakeProvider(delay=0.01)
+
+    fetch_engine.fetch_rows([f'T{i}' for i in range(20)], provider, groups=('quote',))
+
+    assert provider.peak == provider.max_concurrency
+
+
+def test_slow_ticker_times_out_without_blocking_the_others():
+    provider = FakeProvider(delays={'SLOW': 1.0})
+
+    rows, failed = fetch_engine.fetch_rows(['VOO', 'SLOW'], provider, groups=('quote',), timeout=0.1)
+
+    assert [r['Ticker'] for r in rows] == ['VOO']
+    assert failed == ['SLOW']
+
+
+def test_transient_errors_are_retried():
+    provider = FakeProvider({'VOO': [ConnectionResetError('reset'), asyncio.TimeoutError()]})
+
+    rows, failed = fetch_engine.fetch_rows(['VOO'], provider, groups=('quote',), backoff=0.0)
+
+    assert [r['Ticker'] for r in rows] == ['VOO'] and not failed
+    assert provider.calls['VOO'] == 3
+
+
+def test_provider_errors_are_not_retried():
+    provider = FakeProvider({'BAD': [providers.ProviderError('unknown ticker')] * 3})
+
+    rows, failed = fetch_engine.fetch_rows(['BAD'], provider, groups=('quote',), backoff=0.0)
+
+    assert failed == ['BAD']
+    assert provider.calls['BAD'] == 1
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_only_rate_limits_and_server_errors_are_transient():
+    assert fetch_engine._is_transient(HTTPError(429))
+    assert fetch_engine._is_transient(HTTPError(503))
+    assert not fetch_engine._is_transient(HTTPError(404))
+    assert not fetch_engine._is_transient(ValueError('bad payload'))
+
+    # A provider error is transient only through its cause (e.g. every fallback was unreachable)
+    try:
+        raise providers.ProviderError('all providers failed') from TimeoutError()
+    except providers.ProviderError as e:
+        assert fetch_engine._is_transient(e)
@@ -0,0 +1,53 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from src import fetcher, providers
+
+
+class DividendProvider(providers.MarketDataProvider):
+    """Serves a fixed dividend history and records the requested ranges."""
+    name = 'dividends'
+
+    def __init__(self, events):
+        super().__init__()
+        self.events = pd.Series([a for _, a in events], index=pd.DatetimeIndex([d for d, _ in events], name='Date'))
+        self.requests = []
+
+    async def _quote(self, symbol):
+        raise providers.ProviderError('no quotes')
+
+    async def _fundamentals(self, symbol):
+        raise providers.ProviderError('no fundamentals')
+
+    async def _dividends(self, symbol, start, full):
+        self.requests.append((symbol, start, full))
+        return self.events if start is None else self.events[self.events.index >= pd.Timestamp(start)]
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = DividendProvider([('2024-03-22', 1.5), ('2024-06-21', 1.6)])
+    monkeypatch.setattr(providers, '_provider', provider)
+    return provider
+
+
+def test_dividend_sync_only_requests_events_after_the_stored_ones(db, provider):
+    assert fetcher.sync_dividend_history('voo') == 2
+
+    provider.events = pd.concat([provider.events, pd.Series([1.7], index=pd.DatetimeIndex(['2024-09-20']))])
+    assert fetcher.sync_dividend_history('VOO') == 1
+
+    assert provider.requests == [('VOO', None, False), ('VOO', datetime.date(2024, 6, 22), False)]
+    assert sorted(db.get_dividend_events('VOO')) == [('2024-03-22', 1.5), ('2024-06-21', 1.6), ('2024-09-20', 1.7)]
+    assert db.get_dividend_sync('VOO')[0] == '2024-09-20'
+
+
+def test_full_dividend_sync_replaces_the_stored_history(db, provider):
+    db.save_dividend_events('VOO', [('2019-12-20', 9.9), ('2024-06-21', 1.6)], synced_at=1000.0)
+
+    assert fetcher.sync_dividend_history('VOO', full=True) == 2
+
+    assert provider.requests == [('VOO', None, True)]
+    assert sorted(db.get_dividend_events('VOO')) == [('2024-03-22', 1.5), ('2024-06-21', 1.6)]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import analytics, fx
+
+DATES = pd.DatetimeIndex(pd.to_datetime(['2026-10-14', '2026-10-15', '2026-10-16']), name='Date')
+
+
+@pytest.fixture
+def rate_matrix(monkeypatch):
+    """Rate store with KRW and EUR rates but none for HKD."""
+    stored = pd.DataFrame({'KRW': [1400.0, 1410.0, 1420.0], 'EUR': [0.9, 0.9, 0.92], 'HKD': np.nan}, index=DATES)
+
+    def get_rate_matrix(currencies, sync=True):
+        return stored.assign(USD=1.0).reindex(columns=fx._currencies(currencies))
+
+    monkeypatch.setattr(fx, 'get_rate_matrix', get_rate_matrix)
+
+
+def test_latest_rates_leave_missing_currencies_nan(rate_matrix):
+    rates = fx.latest_rates(['USD', 'KRW', 'HKD'], 'KRW')
+
+    assert rates['USD'] == 1420.0
+    assert rates['KRW'] == 1.0
+    assert np.isnan(rates['HKD'])
+    assert fx.missing_currencies(rates) == ['HKD']
+
+
+def test_metrics_exclude_holdings_without_a_rate(rate_matrix):
+    holdings = [(1, 'VOO', 2.0, 400.0, 'Equity', 'USD'), (2, '2800.HK', 100.0, 20.0, 'Equity', 'HKD')]
+    market = pd.DataFrame({'Ticker': ['VOO', '2800.HK'], 'Current Price': [500.0, 25.0], 'Yield': [0.01, 0.03],
+                           'Sector': ['Equity', 'Equity'], 'Name': ['VOO', 'Tracker Fund']})
+    rates = fx.latest_rates([h[5] for h in holdings], 'KRW')
+
+    df = analytics.calculate_portfolio_metrics(holdings, market, rates).set_index('Ticker')
+
+    assert df.loc['VOO', 'Market Value'] == 2 * 500.0 * 1420.0
+    assert np.isnan(df.loc['2800.HK', 'Market Value'])
+    assert np.isnan(df.loc['2800.HK', 'Total Gain (%)'])
+    # Totals cover only the converted holdings instead of adding HKD as if it were KRW
+    assert df['Market Value'].sum() == 2 * 500.0 * 1420.0
+    assert df.loc['VOO', 'Weight (%)'] == 100.0
+
+
+def test_convert_price_matrix_drops_columns_without_a_rate(rate_matrix):
+    prices = pd.DataFrame({'VOO': [500.0, 505.0, 510.0], 'SXR8.DE': [550.0, 552.0, 560.0],
+                           '2800.HK': [25.0, 25.5, 26.0]}, index=DATES)
+
+    converted = fx.convert_price_matrix(prices, ['USD', 'EUR', 'HKD'], 'USD')
+
+    assert list(converted.columns) == ['VOO', 'SXR8.DE']
+    assert converted['VOO'].tolist() == [500.0, 505.0, 510.0]
+    np.testing.assert_allclose(converted['SXR8.DE'], [550.0 / 0.9, 552.0 / 0.9, 560.0 / 0.92])
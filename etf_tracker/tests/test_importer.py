@@ -0,0 +1,94 @@
+import io
+
+import pytest
+
+from src import importer
+
+ROWS = 10
+
+
+def _csv(rows=ROWS, bad_line=None):
+    lines = ['Ticker,Name,Shares,AvgPrice']
+    for i in range(rows):
+        shares = 'many' if i + 2 == bad_line else str(i + 1)
+        lines.append(f'T{i:03d},Fund {i},{shares},{10 + i}.5')
+    return '\n'.join(lines).encode('utf-8') + b'\n'
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _interrupt_after_first_chunk(progress):
+    raise Interrupted()
+
+
+def test_resumes_after_an_interrupted_chunk(db):
+    data = _csv()
+    with pytest.raises(Interrupted):
+        importer.import_file(io.BytesIO(data), 'file:holdings.csv', _interrupt_after_first_chunk, chunk_rows=4)
+    assert len(db.get_holdings()) == 4
+
+    chunks = []
+    progress = importer.import_file(io.BytesIO(data), 'file:holdings.csv', chunks.append, chunk_rows=4)
+
+    assert progress.resumed_from == data.index(b'T004')
+    assert len(chunks) == 2  # The committed first chunk isn't read again
+    assert (progress.rows_read, progress.rows_written, progress.error_count) == (ROWS, ROWS, 0)
+    assert sorted(h[1] for h in db.get_holdings()) == [f'T{i:03d}' for i in range(ROWS)]
+    assert {h[1]: h[2] for h in db.get_holdings()}['T009'] == 10.0
+
+
+def test_finished_import_starts_over(db):
+    data = _csv()
+    importer.import_file(io.BytesIO(data), 'file:holdings.csv', chunk_rows=4)
+
+    progress = importer.import_file(io.BytesIO(data), 'file:holdings.csv', chunk_rows=4)
+
+    assert progress.resumed_from == 0
+    assert progress.rows_read == ROWS
+
+
+def test_changed_file_is_not_resumed(db):
+    with pytest.raises(Interrupted):
+        importer.import_file(io.BytesIO(_csv()), 'file:holdings.csv', _interrupt_after_first_chunk, chunk_rows=4)
+
+    progress = importer.import_file(io.BytesIO(_csv(ROWS + 2)), 'file:holdings.csv', chunk_rows=4)
+
+    assert progress.resumed_from == 0
+    assert progress.rows_read == ROWS + 2
+
+
+def test_reports_line_numbers_of_bad_rows(db):
+    progress = importer.import_file(io.BytesIO(_csv(bad_line=7)), chunk_rows=4)
+
+    assert (progress.rows_written, progress.error_count) == (ROWS - 1, 1)
+    assert progress.errors[0][0] == 7
+
+
+def test_line_numbers_count_blank_lines_and_quoted_line_breaks(db):
+    data = ('Ticker,Name,Shares,AvgPrice\n'
+            'VOO,S&P 500,1,400\n'
+            '\n'
+            'SCHD,"Dividend\nEquity",2,75\n'
+            'JEPI,Income,many,55\n').encode('utf-8')
+
+    progress = importer.import_file(io.BytesIO(data), chunk_rows=2)
+
+    assert progress.rows_written == 2
+    assert [line for line, _ in progress.errors] == [6]
+
+
+def test_resumed_import_keeps_counting_lines(db):
+    data = ('Ticker,Name,Shares,AvgPrice\n'
+            '\n'
+            'VOO,"S&P\n500",1,400\n'
+            'SCHD,Dividend,2,75\n'
+            'JEPI,Income,many,55\n').encode('utf-8')
+    with pytest.raises(Interrupted):
+        importer.import_file(io.BytesIO(data), 'file:holdings.csv', _interrupt_after_first_chunk, chunk_rows=1)
+
+    progress = importer.import_file(io.BytesIO(data), 'file:holdings.csv', chunk_rows=1)
+
+    assert progress.resumed_from > 0
+    assert [line for line, _ in progress.errors] == [6]
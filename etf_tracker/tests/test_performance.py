@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import performance
+
+DATES = pd.DatetimeIndex(pd.to_datetime(['2026-10-12', '2026-10-13', '2026-10-14', '2026-10-15']))
+
+
+def _transactions(*rows):
+    """rows: (ticker, type, date, shares, price, fee)"""
+    return pd.DataFrame([(i, t, k, pd.Timestamp(d), s, p, f, 'USD') for i, (t, k, d, s, p, f) in enumerate(rows)],
+                        columns=performance.TRANSACTION_COLUMNS)
+
+
+def test_position_matrix_accumulates_trades_on_trading_days():
+    prices = pd.DataFrame({'VOO': 100.0, 'SCHD': 25.0}, index=DATES)
+    tx = _transactions(('voo', 'BUY', '2026-10-01', 10, 90.0, 0.0),    # Before the window: held from day 0
+                       ('VOO', 'SELL', '2026-10-13', 4, 110.0, 0.0),
+                       ('SCHD', 'BUY', '2026-10-13 15:30', 8, 25.0, 0.0),
+                       ('VOO', 'DIVIDEND', '2026-10-14', 6, 1.0, 0.0),
+                       ('QQQ', 'BUY', '2026-10-14', 1, 400.0, 0.0))   # Not in the price matrix
+
+    shares = performance.position_matrix(tx, prices)
+
+    assert shares['VOO'].tolist() == [10.0, 6.0, 6.0, 6.0]
+    assert shares['SCHD'].tolist() == [0.0, 8.0, 8.0, 8.0]
+
+
+def test_external_flows_are_signed_from_the_portfolio_side():
+    tx = _transactions(('VOO', 'BUY', '2026-10-12', 10, 100.0, 1.0),
+                       ('VOO', 'SELL', '2026-10-13', 4, 110.0, 1.0),
+                       ('VOO', 'DIVIDEND', '2026-10-14', 6, 0.5, 0.0),
+                       ('SCHD', 'DIVIDEND', '2026-10-14', 0, 2.0, 0.0),   # Total amount
+                       ('VOO', 'BUY', '2026-10-17', 1, 100.0, 0.0))      # After the last day
+
+    flows = performance.external_flows(tx, DATES)
+
+    assert flows.tolist() == [1001.0, -439.0, -5.0, 0.0]
+
+
+def test_daily_returns_exclude_flows():
+    value = pd.Series([1000.0, 1100.0, 1600.0, 1200.0], index=DATES)
+    flows = pd.Series([1000.0, 0.0, 400.0, -300.0], index=DATES)
+
+    returns = performance.daily_returns(value, flows)
+
+    np.testing.assert_allclose(returns, [0.0, 0.1, 1200.0 / 1100.0 - 1.0, 1500.0 / 1600.0 - 1.0])
+
+
+def test_drawdown_from_the_running_peak():
+    returns = pd.Series([0.0, 0.1, -0.5, 0.2], index=DATES)
+
+    np.testing.assert_allclose(performance.drawdown(returns), [0.0, 0.0, -0.5, -0.4])
+
+
+def test_xirr_of_a_single_investment():
+    flows = pd.Series([1000.0], index=pd.DatetimeIndex(['2025-01-01']))
+
+    assert performance.xirr(flows, 1100.0, pd.Timestamp('2026-01-01')) == pytest.approx(0.10)
+    assert performance.xirr(pd.Series([0.0], index=flows.index), 1100.0) is None
+
+
+def test_opening_positions_add_to_the_flows_of_the_first_day():
+    prices = pd.DataFrame({'VOO': [100.0, 110.0, 99.0, 110.0]}, index=DATES)
+    tx = _transactions(('VOO', 'BUY', '2026-10-01', 10, 80.0, 0.0),
+                       ('VOO', 'DIVIDEND', '2026-10-05', 10, 1.0, 0.0),   # Before the window: not a flow
+                       ('VOO', 'BUY', '2026-10-12', 5, 98.0, 2.0))
+
+    result = performance.analyze(tx, prices)
+
+    # The position opened earlier is invested at the first close; the day-0 buy at its cost
+    assert result.flows.tolist() == [10 * 100.0 + (5 * 98.0 + 2.0), 0.0, 0.0, 0.0]
+    assert result.value.tolist() == [1500.0, 1650.0, 1485.0, 1650.0]
+    assert result.twr == pytest.approx(0.1)
+    assert result.max_drawdown == pytest.approx(-0.1)
@@ -0,0 +1,77 @@
+import datetime
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import prices, providers
+
+
+def _bars(dates, closes):
+    index = pd.DatetimeIndex(pd.to_datetime(dates), name='Date')
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({'Open': closes - 1, 'High': closes + 1, 'Low': closes - 2, 'Close': closes,
+                         'Adj Close': closes, 'Volume': 1000.0}, index=index)
+
+
+def test_bars_merge_into_yearly_blocks(db):
+    prices.save_bars('voo', _bars(['2024-12-30', '2024-12-31', '2025-01-02'], [100, 101, 102]), synced_at=1.0)
+    # The refetched last day overwrites the stored bar
+    prices.save_bars('VOO', _bars(['2025-01-02', '2025-01-03'], [103, 104]), synced_at=2.0)
+
+    bars = prices.read_bars('VOO')
+
+    assert bars['Close'].tolist() == [100.0, 101.0, 103.0, 104.0]
+    assert bars.index.strftime('%Y-%m-%d').tolist() == ['2024-12-30', '2024-12-31', '2025-01-02', '2025-01-03']
+    assert prices.read_bars('VOO', start='2024-12-31', end='2025-01-02')['Close'].tolist() == [101.0, 103.0]
+    assert prices.get_sync_states(['VOO']) == {'VOO': ('2025-01-03', 2.0)}
+    with db.get_db_connection() as conn:
+        assert conn.execute('SELECT year FROM price_blocks ORDER BY year').fetchall() == [(2024,), (2025,)]
+
+
+def test_price_matrix_aligns_tickers_by_date(db, monkeypatch):
+    monkeypatch.setattr(prices, '_matrices', OrderedDict())  # Versions restart with each test database
+    prices.save_bars('VOO', _bars(['2025-01-02', '2025-01-03'], [500, 505]), synced_at=1.0)
+    prices.save_bars('069500.KS', _bars(['2025-01-03', '2025-01-06'], [30000, 30100]), synced_at=1.0)
+
+    matrix = prices.get_price_matrix(['VOO', '069500.KS', 'NONE'], start='2025-01-01', sync=False)
+
+    assert matrix.index.strftime('%Y-%m-%d').tolist() == ['2025-01-02', '2025-01-03', '2025-01-06']
+    np.testing.assert_array_equal(matrix.to_numpy(), [[500, np.nan, np.nan], [505, 30000, np.nan],
+                                                      [np.nan, 30100, np.nan]])
+    with pytest.raises(ValueError):
+        prices.get_price_matrix(['VOO'], field='dividends', sync=False)
+
+
+class HistoryProvider(providers.MarketDataProvider):
+    name = 'history'
+
+    def __init__(self, bars):
+        super().__init__()
+        self.bars, self.requests = bars, []
+
+    async def _quote(self, symbol):
+        raise providers.ProviderError('no quotes')
+
+    async def _fundamentals(self, symbol):
+        raise providers.ProviderError('no fundamentals')
+
+    async def _dividends(self, symbol, start, full):
+        raise providers.ProviderError('no dividends')
+
+    async def _history(self, symbol, start):
+        self.requests.append((symbol, start))
+        return self.bars if start is None else self.bars[self.bars.index >= pd.Timestamp(start)]
+
+
+def test_sync_restarts_at_the_last_stored_day(db, monkeypatch):
+    provider = HistoryProvider(_bars(['2025-01-02', '2025-01-03'], [500, 505]))
+    monkeypatch.setattr(providers, '_provider', provider)
+
+    assert prices.sync_price_histories(['VOO']) == {'VOO': 2}
+    provider.bars = _bars(['2025-01-02', '2025-01-03', '2025-01-06'], [500, 506, 510])
+    assert prices.sync_price_histories(['VOO']) == {'VOO': 2}
+
+    assert provider.requests == [('VOO', None), ('VOO', datetime.date(2025, 1, 3))]
+    assert prices.read_bars('VOO')['Close'].tolist() == [500.0, 506.0, 510.0]
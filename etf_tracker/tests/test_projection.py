@@ -0,0 +1,73 @@
+import datetime
+
+import pandas as pd
+
+from src import projection
+
+# Quarterly payer whose December payment is a large special on the regular date
+QUARTERLY_WITH_DECEMBER_SPECIAL = [
+    ('2023-03-15', 0.5), ('2023-06-15', 0.5), ('2023-09-15', 0.5), ('2023-12-15', 3.0),
+    ('2024-03-15', 0.5), ('2024-06-14', 0.5), ('2024-09-16', 0.5), ('2024-12-16', 3.0),
+    ('2025-03-14', 0.5), ('2025-06-16', 0.5), ('2025-09-15', 0.5), ('2025-12-15', 3.0),
+    ('2026-03-16', 0.5), ('2026-06-15', 0.5), ('2026-09-15', 0.5),
+]
+
+
+def _schedule(events):
+    dates, amounts = zip(*events)
+    return projection.detect_schedule(pd.Series(pd.to_datetime(list(dates))), pd.Series(amounts))
+
+
+def test_detects_quarterly_schedule_and_december_specials():
+    schedule = _schedule(QUARTERLY_WITH_DECEMBER_SPECIAL)
+
+    assert schedule.frequency == 'quarterly'
+    assert schedule.amount == 0.5
+    assert schedule.day_of_month == 15
+    assert [d for d, _, special in schedule.events if special] == ['2023-12-15', '2024-12-16', '2025-12-15']
+
+
+def test_special_on_regular_date_replaces_the_regular_payment():
+    holdings = pd.DataFrame({'Ticker': ['XYZ'], 'Shares': [10.0]})
+    df = projection.project_dividends(holdings, {'XYZ': _schedule(QUARTERLY_WITH_DECEMBER_SPECIAL)},
+                                      today=datetime.datetime(2026, 10, 17))
+
+    # 2026-12-15 is both a regular quarter and the recurring December special: one row
+    assert not df.duplicated(['Ticker', 'Ex Date']).any()
+    december = df[df['Ex Date'] == pd.Timestamp('2026-12-15')]
+    assert len(december) == 1
+    assert bool(december['Special'].iloc[0])
+    assert december['Amount Per Share'].iloc[0] == 3.0
+    assert december['Total Amount'].iloc[0] == 30.0
+
+    assert df['Month'].value_counts()['2026-12'] == 1
+    assert df['Ex Date'].dt.strftime('%Y-%m-%d').tolist() == ['2026-12-15', '2027-03-15', '2027-06-15', '2027-09-15']
+    assert df['Special'].tolist() == [True, False, False, False]
+
+
+def test_ex_dates_move_off_weekends_within_the_month():
+    months = pd.to_datetime(['2026-02-01', '2026-05-01', '2026-08-01', '2026-11-01']).to_numpy().astype('datetime64[M]')
+    # 2026-02-28 Sat -> Fri 27th; 2026-05-31 Sun -> Fri 29th (Monday is in June);
+    # 2026-08-01 Sat -> Mon 3rd (Friday is in July); 2026-11-15 Sun -> Mon 16th
+    got = projection._ex_dates(months, [31, 31, 1, 15])
+    assert pd.to_datetime(got).strftime('%Y-%m-%d').tolist() == ['2026-02-27', '2026-05-29', '2026-08-03', '2026-11-16']
+
+
+def test_pay_dates_match_business_day_offset():
+    days = pd.date_range('2026-01-01', '2026-12-31')
+    expected = days + pd.offsets.BDay(projection.PAY_LAG_BUSINESS_DAYS)
+    assert (pd.DatetimeIndex(projection.pay_dates(days.to_numpy())) == expected).all()
+
+
+def test_schedule_events_projects_all_tickers_at_once():
+    monthly = [(d.strftime('%Y-%m-%d'), 0.1) for d in pd.date_range('2024-01-01', '2026-09-30', freq='BME')]
+    schedules = {'XYZ': _schedule(QUARTERLY_WITH_DECEMBER_SPECIAL), 'MON': _schedule(monthly),
+                 'OLD': _schedule([('2019-03-15', 0.5), ('2019-06-14', 0.5)]), 'NONE': projection.Schedule()}
+    df = projection.schedule_events(schedules, pd.Timestamp('2026-10-01'), pd.Timestamp('2027-09-30'))
+
+    counts = df.groupby('Ticker').size()
+    assert counts.to_dict() == {'MON': 12, 'XYZ': 4}  # OLD stopped paying, NONE has no history
+    # September's recorded payment is paid in October; everything after it is projected
+    assert df.loc[~df['Projected'], ['Ticker', 'Ex Date']].values.tolist() == [['MON', pd.Timestamp('2026-09-30')]]
+    assert (df.loc[df['Ticker'] == 'MON', 'Ex Date'] + pd.offsets.BDay(1)).dt.month.ne(
+        df.loc[df['Ticker'] == 'MON', 'Ex Date'].dt.month).all()  # month-end payer stays at month end
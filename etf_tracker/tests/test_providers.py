@@ -0,0 +1,124 @@
+import json
+import sys
+import time
+import types
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import providers
+
+
+class FakeTicker:
+    """Stand-in for yfinance.Ticker that counts upstream requests."""
+    requests = []
+    info_data = {'regularMarketPrice': 12.5, 'dividendYield': 3.0, 'sector': 'Equity', 'shortName': 'Fund'}
+    error = None
+    delay = 0.0
+    in_flight = peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, symbol):
+        self.ticker = symbol
+
+    @property
+    def info(self):
+        FakeTicker.requests.append(('info', self.ticker))
+        with FakeTicker.lock:
+            FakeTicker.in_flight += 1
+            FakeTicker.peak = max(FakeTicker.peak, FakeTicker.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            return dict(self.info_data)
+        finally:
+            with FakeTicker.lock:
+                FakeTicker.in_flight -= 1
+
+    @property
+    def fast_info(self):
+        FakeTicker.requests.append(('fast_info', self.ticker))
+        return types.SimpleNamespace(last_price=11.0, previous_close=10.5)
+
+
+@pytest.fixture
+def yfinance(monkeypatch):
+    FakeTicker.requests = []
+    FakeTicker.in_flight = FakeTicker.peak = 0
+    monkeypatch.setattr(FakeTicker, 'error', None)
+    monkeypatch.setattr(FakeTicker, 'delay', 0.0)
+    monkeypatch.setitem(sys.modules, 'yfinance', types.SimpleNamespace(Ticker=FakeTicker))
+    return FakeTicker
+
+
+def test_full_row_is_one_upstream_request(yfinance):
+    row = providers.run(providers.YFinanceProvider(4).get_market_row('VOO'))
+
+    assert row == {'Ticker': 'VOO', 'Current Price': 12.5, 'Yield': 0.03, 'Sector': 'Equity', 'Name': 'Fund'}
+    assert yfinance.requests == [('info', 'VOO')]
+
+
+def test_quote_only_row_uses_fast_info(yfinance):
+    row = providers.run(providers.YFinanceProvider(4).get_market_row('VOO', ('quote',)))
+
+    assert row == {'Ticker': 'VOO', 'Current Price': 11.0}
+    assert yfinance.requests == [('fast_info', 'VOO')]
+
+
+def test_fallback_combines_groups_through_the_first_provider(yfinance):
+    provider = providers.FallbackProvider([providers.YFinanceProvider(4)])
+
+    providers.run(provider.get_market_row('VOO'))
+
+    assert yfinance.requests == [('info', 'VOO')]
+
+
+def test_recording_is_written_once_on_close(yfinance, tmp_path):
+    path = tmp_path / 'cassette.json'
+    recorder = providers.RecordReplayProvider(str(path), providers.YFinanceProvider(4), mode='record')
+
+    for symbol in ('VOO', 'SCHD', 'JEPI'):
+        providers.run(recorder.get_market_row(symbol))
+    assert not path.exists()
+
+    recorder.close()
+    assert sorted(json.loads(path.read_text(encoding='utf-8'))['quote']) == ['JEPI', 'SCHD', 'VOO']
+
+    replay = providers.RecordReplayProvider(str(path))
+    assert providers.run(replay.get_market_row('SCHD'))['Current Price'] == 12.5
+    with pytest.raises(providers.ProviderError):
+        providers.run(replay.get_market_row('QQQ'))
+
+
+def test_upstream_calls_are_bounded_across_event_loops(yfinance, monkeypatch):
+    monkeypatch.setattr(providers, '_upstream_slots', threading.BoundedSemaphore(2))
+    monkeypatch.setattr(FakeTicker, 'delay', 0.02)
+    provider = providers.YFinanceProvider(4)
+
+    # Each thread's run() has its own event loop
+    with ThreadPoolExecutor(4) as pool:
+        rows = list(pool.map(lambda s: providers.run(provider.get_market_row(s)), [f'T{i}' for i in range(8)]))
+
+    assert len(rows) == 8
+    assert yfinance.peak == 2
+
+
+def test_default_provider_falls_back_in_the_configured_order(yfinance, tmp_path, monkeypatch):
+    path = tmp_path / 'cassette.json'
+    recorder = providers.RecordReplayProvider(str(path), providers.YFinanceProvider(4), mode='record')
+    providers.run(recorder.get_market_row('VOO'))
+    recorder.close()
+    monkeypatch.setenv('ETF_PROVIDERS', 'yfinance, replay')
+    monkeypatch.setenv('ETF_REPLAY_FILE', str(path))
+    monkeypatch.setattr(FakeTicker, 'error', ConnectionError('offline'))
+
+    provider = providers._default_provider()
+
+    assert provider.name == 'fallback(yfinance,replay(cassette.json))'
+    assert providers.run(provider.get_market_row('VOO'))['Current Price'] == 12.5
+
+    monkeypatch.setenv('ETF_PROVIDERS', 'yfinance,polygon')
+    with pytest.raises(ValueError):
+        providers._default_provider()
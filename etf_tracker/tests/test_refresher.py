@@ -0,0 +1,40 @@
+import datetime
+import time
+
+from src import refresher, cache, fetcher
+
+
+def test_due_tickers_are_missing_or_expire_before_the_next_refresh(db):
+    for ticker in ('VOO', 'SCHD', 'JEPI'):
+        db.add_holding(ticker, 1.0, 100.0)
+    ttl = cache.FIELD_GROUPS['quote']['ttl']
+    now = time.time()
+    cache.write('quote', {'VOO': {'Current Price': 500.0}}, fetched_at=now)
+    cache.write('quote', {'SCHD': {'Current Price': 75.0}}, fetched_at=now - ttl + 100)
+
+    assert sorted(refresher.due_tickers(300)) == ['JEPI', 'SCHD']
+    assert sorted(refresher.due_tickers(60)) == ['JEPI']
+
+
+def test_refresh_once_fetches_only_due_quotes(db, monkeypatch):
+    db.add_holding('VOO', 1.0, 400.0)
+    db.add_holding('SCHD', 1.0, 75.0)
+    cache.write('quote', {'VOO': {'Current Price': 500.0}})
+    requested = []
+
+    def refresh_market_data(tickers, groups):
+        requested.append((tickers, groups))
+        return [{'Ticker': t, 'Current Price': 1.0} for t in tickers]
+
+    monkeypatch.setattr(fetcher, 'refresh_market_data', refresh_market_data)
+
+    assert refresher.refresh_once(300) == 1
+    assert requested == [(['SCHD'], ('quote',))]
+
+
+def test_market_hours_in_new_york_and_seoul():
+    utc = datetime.timezone.utc
+    assert refresher.is_market_open(datetime.datetime(2026, 10, 14, 15, 0, tzinfo=utc))      # 11:00 New York
+    assert refresher.is_market_open(datetime.datetime(2026, 10, 14, 1, 0, tzinfo=utc))       # 10:00 Seoul
+    assert not refresher.is_market_open(datetime.datetime(2026, 10, 14, 10, 0, tzinfo=utc))  # Both closed
+    assert not refresher.is_market_open(datetime.datetime(2026, 10, 17, 15, 0, tzinfo=utc))  # Saturday
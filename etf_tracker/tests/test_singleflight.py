@@ -0,0 +1,94 @@
+import threading
+import time
+
+from src import singleflight
+
+
+def _start(fn, count):
+    threads = [threading.Thread(target=fn) for _ in range(count)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def test_concurrent_calls_for_a_key_share_one_fetch():
+    group = singleflight.Group('test')
+    entered, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def fetch():
+        calls.append(1)
+        entered.set()
+        release.wait(5)
+        return 'row'
+
+    owner = _start(lambda: results.append(group.do('VOO', fetch)), 1)
+    assert entered.wait(5)
+    followers = _start(lambda: results.append(group.do('VOO', fetch)), 3)
+    while group.stats()['deduplicated'] < 3:
+        time.sleep(0.001)
+    release.set()
+    for t in owner + followers:
+        t.join(5)
+
+    assert results == ['row'] * 4
+    assert len(calls) == 1
+    assert group.stats() == {'calls': 4, 'executed': 1, 'deduplicated': 3, 'in_flight': 0}
+
+    # Nothing is cached once the fetch completed
+    assert group.do('VOO', lambda: 'fresh') == 'fresh'
+
+
+def test_batches_fetch_only_keys_not_in_flight():
+    group = singleflight.Group('test')
+    entered, release = threading.Event(), threading.Event()
+    batches = []
+
+    def fetch(keys):
+        batches.append(sorted(keys))
+        if 'VOO' in keys:
+            entered.set()
+            release.wait(5)
+        return {k: k.lower() for k in keys if k != 'NONE'}
+
+    results = []
+    owner = _start(lambda: results.append(group.do_many(['VOO'], fetch)), 1)
+    assert entered.wait(5)
+    follower = _start(lambda: results.append(group.do_many(['VOO', 'SCHD', 'NONE'], fetch)), 1)
+    while group.stats()['deduplicated'] < 1:
+        time.sleep(0.001)
+    release.set()
+    for t in owner + follower:
+        t.join(5)
+
+    assert batches == [['VOO'], ['NONE', 'SCHD']]
+    assert {'VOO': 'voo', 'SCHD': 'schd', 'NONE': None} in results
+
+
+def test_followers_receive_the_owners_error():
+    group = singleflight.Group('test')
+    entered, release = threading.Event(), threading.Event()
+    errors = []
+
+    def fetch():
+        entered.set()
+        release.wait(5)
+        raise ConnectionError('down')
+
+    def call():
+        try:
+            group.do('VOO', fetch)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = _start(call, 1)
+    assert entered.wait(5)
+    threads += _start(call, 2)
+    while group.stats()['deduplicated'] < 2:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(errors) == 3 and all(e is errors[0] for e in errors)
+    assert group.stats()['in_flight'] == 0
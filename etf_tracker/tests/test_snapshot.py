@@ -0,0 +1,92 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from src import snapshot, fetcher, cache
+
+
+@pytest.fixture
+def market(db, monkeypatch):
+    """Fixed USD quotes instead of the market data pipeline; counts the builds."""
+    def get_market_data(tickers):
+        return pd.DataFrame({'Ticker': tickers, 'Current Price': 100.0, 'Yield': 0.02,
+                             'Sector': 'Equity', 'Name': tickers})
+
+    monkeypatch.setattr(fetcher, 'get_market_data', get_market_data)
+    monkeypatch.setattr(cache, 'get_quotes_version', lambda: 1.0)
+    monkeypatch.setattr(cache, 'get_quotes_as_of', lambda tickers: 1.0)
+    monkeypatch.setattr(snapshot, '_current', {})
+    builds = []
+    build = snapshot.build
+
+    def counting_build(version, base_currency=None):
+        builds.append(version)
+        return build(version, base_currency)
+
+    monkeypatch.setattr(snapshot, 'build', counting_build)
+    return builds
+
+
+def test_snapshot_is_rebuilt_only_when_the_version_changes(db, market):
+    db.add_holding('VOO', 2.0, 400.0)
+    first = snapshot.get_snapshot()
+
+    assert snapshot.get_snapshot() is first
+    assert first.tickers == ['VOO']
+
+    db.add_holding('SCHD', 10.0, 70.0)
+    second = snapshot.get_snapshot()
+
+    assert second is not first and second.version != first.version
+    assert sorted(second.tickers) == ['SCHD', 'VOO']
+
+    snapshot.invalidate()
+    assert snapshot.get_snapshot() is not second
+    assert len(market) == 3
+
+
+def test_concurrent_callers_share_one_build_outside_the_lock(db, market, monkeypatch):
+    db.add_holding('VOO', 2.0, 400.0)
+    started, release = threading.Event(), threading.Event()
+    build = snapshot.build
+
+    def slow_build(version, base_currency=None):
+        if base_currency is None:
+            started.set()
+            release.wait(5)
+        return build(version, base_currency)
+
+    monkeypatch.setattr(snapshot, 'build', slow_build)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(snapshot.get_snapshot())) for _ in range(4)]
+    for t in threads:
+        t.start()
+    assert started.wait(5)
+
+    # Another snapshot can be built while that one is in progress
+    other_result = []
+    other = threading.Thread(target=lambda: other_result.append(snapshot.get_snapshot('usd')))
+    other.start()
+    other.join(5)
+    finished = not other.is_alive()
+    release.set()
+    other.join(5)
+    assert finished
+    for t in threads:
+        t.join(5)
+
+    assert len(results) == 4 and all(r is results[0] for r in results)
+    assert other_result[0] is not results[0]
+    assert len(market) == 2  # The shared build and the explicit USD one
+
+
+def test_holdings_and_cost_rates_come_from_the_lots(db, market):
+    db.add_holding('SCHD', 10.0, 70.0)
+    db.add_lot(db.DEFAULT_PORTFOLIO_ID, 'VOO', 1.0, 380.0, '2024-01-02')
+    db.add_lot(db.DEFAULT_PORTFOLIO_ID, 'VOO', 1.0, 420.0, '2025-01-02')
+
+    snap = snapshot.get_snapshot()
+
+    assert snap.tickers == ['VOO']
+    assert snap.metrics.set_index('Ticker').loc['VOO', 'Cost Basis'] == 800.0
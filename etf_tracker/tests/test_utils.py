@@ -0,0 +1,32 @@
+import io
+
+import pandas as pd
+
+from src import utils, fetcher
+
+
+def test_export_streams_holdings_page_by_page(db, monkeypatch):
+    requested = []
+
+    def get_market_data(tickers):
+        requested.append(list(tickers))
+        return pd.DataFrame({'Ticker': tickers, 'Current Price': 100.0, 'Yield': 0.0125,
+                             'Sector': 'Equity', 'Name': [f'{t} Fund' for t in tickers]})
+
+    monkeypatch.setattr(fetcher, 'get_market_data', get_market_data)
+    for ticker in ['VOO', 'SCHD', 'JEPI', 'QQQ', 'DIA']:
+        db.add_holding(ticker, 2.0, 50.0, 'Equity')
+
+    chunks = list(utils.iter_export_csv(chunk_size=2))
+
+    assert len(chunks) == 4  # Header and three pages
+    assert requested == [['DIA', 'JEPI'], ['QQQ', 'SCHD'], ['VOO']]
+    df = pd.read_csv(io.StringIO(''.join(chunks)))
+    assert list(df.columns) == utils.GS_HEADERS
+    assert df['Ticker'].tolist() == ['DIA', 'JEPI', 'QQQ', 'SCHD', 'VOO']
+    assert df.iloc[0][['Name', 'Shares', 'AvgPrice', 'Yield', 'CurrentPrice']].tolist() == \
+        ['DIA Fund', 2.0, 50.0, '1.25%', 100.0]
+
+
+def test_export_of_no_holdings_is_the_header(db):
+    assert utils.export_to_csv() == ','.join(utils.GS_HEADERS) + '\n'
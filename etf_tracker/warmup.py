@@ -0,0 +1,18 @@
+"""
+Warm-start step for the container: run before `streamlit run app.py`.
+
+Usage (from the repository root):
+    python etf_tracker/warmup.py
+"""
+import os
+import logging
+
+from src import warmup
+
+if __name__ == "__main__":
+    warmup.warm_up()
+    # Always succeed, and don't wait for a prefetch that overran its budget
+    # (executor threads are joined at interpreter exit); the app fetches
+    # whatever is still missing on demand
+    logging.shutdown()
+    os._exit(0)